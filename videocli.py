@@ -0,0 +1,343 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Linha de comando do Video Tools: executa as operações do núcleo (videoengine.py) sem carregar o GTK, imprimindo o
+resultado em JSON na saída padrão e indicando o sucesso do processamento pelo código de saída.
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+
+from threading import Lock
+
+from videoengine import *  # @UnusedWildImport
+
+
+def criar_parser():
+    """
+    Cria o parser dos parâmetros, com um sub-comando para cada operação
+    """
+
+    parser = argparse.ArgumentParser(prog="videotools", description="Programa para edição de arquivos de vídeo (linha de comando)")
+    comandos = parser.add_subparsers(dest="comando")
+
+    # Parâmetros comuns aos comandos que executam jobs do ffmpeg
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--force", action="store_true", help="reprocessa os arquivos mesmo que as saídas estejam atualizadas")
+
+    scan = comandos.add_parser("scan", help="lista os vídeos do diretório e as suas informações")
+    scan.add_argument("diretorio", nargs="?", help="diretório a ser lido (padrão: último diretório de origem da interface gráfica)")
+    scan.set_defaults(executar=comando_scan)
+
+    convert = comandos.add_parser("convert", parents=[comum], help="converte os vídeos para um ou mais formatos")
+    convert.add_argument("--format", action="append", choices=sorted(FORMATOS), help="formato de destino, pode ser repetido (padrão: h265)")
+    convert.add_argument("--segments", action="store_true", help="divide cada vídeo em segmentos convertidos em paralelo")
+    convert.add_argument("arquivos", nargs="+")
+    convert.set_defaults(executar=comando_convert)
+
+    remux = comandos.add_parser("remux", parents=[comum], help="troca o container dos vídeos, recodificando apenas os streams incompatíveis")
+    remux.add_argument("--format", default="mp4", choices=sorted(FORMATOS_REMUX_CLI), help="container de destino (padrão: mp4)")
+    remux.add_argument("arquivos", nargs="+")
+    remux.set_defaults(executar=comando_remux)
+
+    resize = comandos.add_parser("resize", parents=[comum], help="altera a resolução dos vídeos")
+    resize.add_argument("--size", required=True, type=ler_resolucao, help="nova resolução, no formato 800x600")
+    resize.add_argument("arquivos", nargs="+")
+    resize.set_defaults(executar=comando_resize)
+
+    rotate = comandos.add_parser("rotate", parents=[comum], help="rotaciona os vídeos")
+    rotate.add_argument("--rotation", required=True, choices=sorted(ROTACOES_CLI), help="rotação a ser aplicada")
+    rotate.add_argument("--reencode", action="store_true", help="recodifica os vídeos, mesmo que a rotação possa ser aplicada pelos metadados")
+    rotate.add_argument("arquivos", nargs="+")
+    rotate.set_defaults(executar=comando_rotate)
+
+    extract = comandos.add_parser("extract", parents=[comum], help="extrai um intervalo dos vídeos")
+    extract.add_argument("--start", default=0, type=ler_tempo, help="início do intervalo, em HH:MM:SS ou segundos (padrão: 0)")
+    extract.add_argument("--end", type=ler_tempo, help="fim do intervalo, em HH:MM:SS ou segundos (padrão: fim do vídeo)")
+    extract.add_argument("--interval", action="append", type=ler_intervalo,
+                         help="intervalo INICIO-FIM, pode ser repetido para extrair vários intervalos em uma única leitura de cada vídeo")
+    extract.add_argument("--mode", default="fast", choices=sorted(MODOS_EXTRACAO_CLI), help="modo de extração (padrão: fast)")
+    extract.add_argument("arquivos", nargs="+")
+    extract.set_defaults(executar=comando_extract)
+
+    concat = comandos.add_parser("concat", parents=[comum], help="concatena os vídeos na ordem informada")
+    concat.add_argument("--output", required=True, help="arquivo a ser gerado")
+    concat.add_argument("--codec", default="h264", choices=sorted(FORMATOS_CONCATENACAO), help="codec utilizado na recodificação (padrão: h264)")
+    concat.add_argument("--reencode", action="store_true", help="recodifica todos os vídeos, mesmo que sejam compatíveis")
+    concat.add_argument("arquivos", nargs="+")
+    concat.set_defaults(executar=comando_concat)
+
+    return parser
+
+
+def main(argv):
+    """
+    Executa o comando informado, retornando o código de saída
+    """
+
+    parser = criar_parser()
+    if not argv:
+        parser.print_help()
+        return SAIDA_PARAMETROS_INVALIDOS
+
+    opcoes = parser.parse_args(argv)
+    configurar_log()
+    inicializar_configuracoes()
+
+    # A leitura de diretórios utiliza apenas o ffprobe
+    if opcoes.comando != "scan" and not is_ffmpeg_disponivel(get_caminho_ffmpeg()):
+        return falhar(opcoes.comando, "Não foi possível encontrar o ffmpeg: " + get_caminho_ffmpeg(), SAIDA_FFMPEG_AUSENTE)
+
+    try:
+        return opcoes.executar(opcoes)
+    except KeyboardInterrupt:
+        return falhar(opcoes.comando, "Interrompido pelo usuário", SAIDA_INTERROMPIDO)
+    finally:
+        gSettings.flush()
+
+
+def configurar_log():
+    """
+    Grava o log no mesmo arquivo da interface gráfica, mantendo a saída padrão apenas para o resultado
+    """
+
+    logHandler = logging.FileHandler(ARQUIVO_LOG)
+    logHandler.setFormatter(logging.Formatter('%(asctime)-15s %(message)s'))
+    gLogger.addHandler(logHandler)
+    gLogger.setLevel(logging.DEBUG)
+
+
+def comando_scan(opcoes):
+    diretorio = opcoes.diretorio or get_app_settings("dir_origem")
+    if diretorio is None or not os.path.isdir(diretorio):
+        return falhar(opcoes.comando, "Diretório inválido: " + str(diretorio), SAIDA_ARQUIVO_INVALIDO)
+
+    diretorio = os.path.abspath(diretorio)
+    videos = []
+    lock = Lock()
+
+    def adiciona_video(arquivo, stat, info):
+        with lock:
+            videos.append({"arquivo": arquivo, "tamanho": stat.st_size, "descricao": info.get_descricao() if info is not None else None,
+                           "info": info.to_dict() if info is not None else None})
+
+    analisar_diretorio(diretorio, adiciona_video)
+
+    imprimir({"comando": opcoes.comando, "sucesso": True, "diretorio": diretorio, "videos": sorted(videos, key=lambda video: video["arquivo"])})
+    return SAIDA_SUCESSO
+
+
+def comando_convert(opcoes):
+    formatos = [FORMATOS[formato] for formato in (opcoes.format or ["h265"])]
+
+    disponiveis = get_codecs_video() + get_codecs_audio() + CODECS_IMAGEM
+    for formato in formatos:
+        if formato not in disponiveis:
+            return falhar(opcoes.comando, "Formato não suportado pelo ffmpeg configurado: " + formato, SAIDA_PARAMETROS_INVALIDOS)
+
+    modo = MODO_CONVERSAO_NORMAL
+    if opcoes.segments:
+        if len(formatos) != 1 or formatos[0] not in get_codecs_video():
+            return falhar(opcoes.comando, "A conversão em segmentos só é permitida para um único formato de vídeo", SAIDA_PARAMETROS_INVALIDOS)
+        modo = MODO_CONVERSAO_SEGMENTOS
+
+    infos, codigo = obter_infos(opcoes)
+    if infos is None:
+        return codigo
+
+    return executar(opcoes, criar_jobs_conversao(formatos, sorted(infos), infos, modo))
+
+
+def comando_remux(opcoes):
+    infos, codigo = obter_infos(opcoes)
+    if infos is None:
+        return codigo
+
+    return executar(opcoes, criar_jobs_remux(sorted(infos), infos, FORMATOS_REMUX_CLI[opcoes.format]))
+
+
+def comando_resize(opcoes):
+    infos, codigo = obter_infos(opcoes)
+    if infos is None:
+        return codigo
+
+    largura, altura = opcoes.size
+    return executar(opcoes, criar_jobs_redimensionamento(sorted(infos), largura, altura, get_duracoes(infos)))
+
+
+def comando_rotate(opcoes):
+    infos, codigo = obter_infos(opcoes)
+    if infos is None:
+        return codigo
+
+    return executar(opcoes, criar_jobs_rotacao(sorted(infos), ROTACOES[ROTACOES_CLI[opcoes.rotation]], infos, not opcoes.reencode))
+
+
+def comando_extract(opcoes):
+    infos, codigo = obter_infos(opcoes)
+    if infos is None:
+        return codigo
+
+    # Vários intervalos são extraídos de cada vídeo em uma única execução do ffmpeg
+    if opcoes.interval:
+        return executar(opcoes, criar_jobs_extracao_intervalos(sorted(infos), infos, opcoes.interval, MODOS_EXTRACAO_CLI[opcoes.mode]))
+
+    jobs = []
+    for arquivo in sorted(infos):
+        info = infos[arquivo]
+        fim = opcoes.end
+        if fim is None:
+            if info is None or not info.duration:
+                return falhar(opcoes.comando, "Duração desconhecida, informe o fim do intervalo: " + arquivo, SAIDA_PARAMETROS_INVALIDOS)
+            fim = int(info.duration)
+
+        if fim <= opcoes.start:
+            return falhar(opcoes.comando, "O fim do intervalo deve ser posterior ao início", SAIDA_PARAMETROS_INVALIDOS)
+
+        jobs.extend(criar_jobs_extracao(arquivo, info, opcoes.start, fim, MODOS_EXTRACAO_CLI[opcoes.mode]))
+
+    return executar(opcoes, jobs)
+
+
+def comando_concat(opcoes):
+    if len(opcoes.arquivos) < 2:
+        return falhar(opcoes.comando, "É necessário informar pelo menos dois arquivos", SAIDA_PARAMETROS_INVALIDOS)
+
+    codec = FORMATOS[opcoes.codec]
+    if codec not in get_codecs_video():
+        return falhar(opcoes.comando, "Formato não suportado pelo ffmpeg configurado: " + codec, SAIDA_PARAMETROS_INVALIDOS)
+
+    infos, codigo = obter_infos(opcoes)
+    if infos is None:
+        return codigo
+
+    # A ordem dos arquivos é a informada pelo usuário
+    arquivos = [os.path.abspath(arquivo) for arquivo in opcoes.arquivos]
+    modo = MODO_CONCATENACAO_RECODIFICAR if opcoes.reencode else MODO_CONCATENACAO_COPIA
+
+    try:
+        return executar(opcoes, criar_jobs_concatenacao(arquivos, infos, os.path.abspath(opcoes.output), get_codec_info(codec), modo))
+    finally:
+        # Remove o arquivo temporário da lista de arquivos
+        if os.path.isfile(ARQUIVO_VIDEOS_CONCATENA):
+            os.remove(ARQUIVO_VIDEOS_CONCATENA)
+
+
+def obter_infos(opcoes):
+    """
+    Retorna as informações dos arquivos informados e o código de saída, com as informações None se algum arquivo não existir
+    """
+
+    arquivos = [os.path.abspath(arquivo) for arquivo in opcoes.arquivos]
+    inexistentes = [arquivo for arquivo in arquivos if not os.path.isfile(arquivo)]
+    if inexistentes:
+        return None, falhar(opcoes.comando, "Arquivos não encontrados: " + ", ".join(inexistentes), SAIDA_ARQUIVO_INVALIDO)
+
+    return carregar_infos(arquivos), SAIDA_SUCESSO
+
+
+def executar(opcoes, jobs):
+    """
+    Executa os jobs, imprimindo o andamento na saída de erros e o resultado de cada job em JSON na saída padrão
+    """
+
+    for job in jobs:
+        job.forcar = opcoes.force
+
+    def notificar_estado(job):
+        sys.stderr.write(job.get_descricao_estado() + ": " + job.destino + "\n")
+
+    scheduler = executar_jobs(jobs, notificarEstado=notificar_estado)
+    sucesso = scheduler.get_qtd_concluidos() == len(jobs)
+
+    imprimir({"comando": opcoes.comando, "sucesso": sucesso, "concluidos": scheduler.get_qtd_concluidos(), "falhas": scheduler.get_qtd_falhas(),
+              "jobs": [descrever_job(job) for job in jobs]})
+
+    if scheduler.interrompido:
+        return SAIDA_INTERROMPIDO
+    return SAIDA_SUCESSO if sucesso else SAIDA_FALHA_JOBS
+
+
+def descrever_job(job):
+    return {"origem": job.origem, "destino": job.destino, "saidas": job.saidas, "estado": job.get_codigo_estado(),
+            "atualizado": job.atualizado, "tamanho": job.tamanhoDestino, "erro": job.mensagemErro}
+
+
+def falhar(comando, mensagem, codigo):
+    """
+    Imprime o erro em JSON e retorna o código de saída
+    """
+
+    debug("Falha no comando " + str(comando) + ": " + mensagem)
+    imprimir({"comando": comando, "sucesso": False, "erro": mensagem})
+    return codigo
+
+
+def imprimir(resultado):
+    print(json.dumps(resultado, indent=2, sort_keys=True, ensure_ascii=False))
+
+
+def ler_tempo(valor):
+    """
+    Converte um tempo informado no formato HH:MM:SS ou em segundos
+    """
+
+    if re.match("^[0-9]+:[0-9]{2}:[0-9]{2}$", valor):
+        return time_to_seconds(valor)
+    if re.match("^[0-9]+$", valor):
+        return int(valor)
+    raise argparse.ArgumentTypeError("tempo inválido: " + valor)
+
+
+def ler_intervalo(valor):
+    """
+    Converte um intervalo no formato INICIO-FIM, com os tempos em HH:MM:SS ou em segundos
+    """
+
+    partes = valor.split("-")
+    if len(partes) != 2:
+        raise argparse.ArgumentTypeError("intervalo inválido: " + valor)
+
+    inicio, fim = ler_tempo(partes[0].strip()), ler_tempo(partes[1].strip())
+    if fim <= inicio:
+        raise argparse.ArgumentTypeError("o fim do intervalo deve ser posterior ao início: " + valor)
+    return inicio, fim
+
+
+def ler_resolucao(valor):
+    """
+    Converte uma resolução no formato 800x600
+    """
+
+    m = re.match("^([0-9]{2,})x([0-9]{2,})$", valor)
+    if m is None:
+        raise argparse.ArgumentTypeError("resolução inválida: " + valor)
+    return int(m.group(1)), int(m.group(2))
+
+
+# Comandos disponíveis na linha de comando
+COMANDOS = ["scan", "convert", "remux", "resize", "rotate", "extract", "concat"]
+
+# Códigos de saída
+SAIDA_SUCESSO = 0
+SAIDA_FALHA_JOBS = 1
+SAIDA_PARAMETROS_INVALIDOS = 2
+SAIDA_FFMPEG_AUSENTE = 3
+SAIDA_ARQUIVO_INVALIDO = 4
+SAIDA_INTERROMPIDO = 130
+
+# Nomes dos formatos, rotações e modos na linha de comando
+FORMATOS = {"h264": VIDEO_H264, "h265": VIDEO_H265, "vp8": VIDEO_VP8, "vp9": VIDEO_VP9, "aac": AUDIO_AAC, "flac": AUDIO_FLAC,
+            "mp3": AUDIO_MP3, "ogg": AUDIO_OGG, "jpeg": IMAGEM_MINIATURA}
+FORMATOS_CONCATENACAO = ["h264", "h265", "vp8", "vp9"]
+FORMATOS_REMUX_CLI = {"mp4": REMUX_MP4, "mkv": REMUX_MKV}
+ROTACOES_CLI = {"cw": 0, "ccw": 1, "180": 2, "ccw-vflip": 3, "cw-vflip": 4, "hflip": 5, "vflip": 6}
+MODOS_EXTRACAO_CLI = {"fast": MODO_EXTRACAO_RAPIDO, "smart": MODO_EXTRACAO_INTELIGENTE, "precise": MODO_EXTRACAO_PRECISO}
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,3521 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo do Video Tools, sem dependência do GTK: leitura e análise dos vídeos, perfis de conversão e execução dos jobs do
+ffmpeg. Utilizado pela interface gráfica (videotools.py) e pela linha de comando (videocli.py).
+"""
+from __future__ import absolute_import, division, print_function, unicode_literals
+
+import array
+import json
+import time
+import math
+import os
+import re
+import subprocess
+import sys
+import logging
+import multiprocessing
+import bisect
+import shutil
+import hashlib
+
+from lxml import etree as ET
+from threading import Thread, Lock, Timer, Condition, Event
+from collections import deque, OrderedDict
+from distutils import spawn
+
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+try:
+    from os import scandir
+except ImportError:
+    from scandir import scandir  # Python 2: pip install scandir
+
+
+class FfmpegProgress(object):
+    """
+    Interpreta o progresso enviado pelo ffmpeg através do parâmetro -progress, no formato chave=valor.
+    Cada bloco de progresso é finalizado pela chave 'progress'.
+    """
+
+    __slots__ = ("out_time_us", "fps", "speed", "total_size", "bitrate", "finished")
+
+    def __init__(self):
+        self.out_time_us = None
+        self.fps = None
+        self.speed = None
+        self.total_size = None
+        self.bitrate = None
+        self.finished = False
+
+    def feed(self, line):
+        """
+        Processa uma linha do progresso, retornando True ao final de cada bloco
+        """
+
+        chave, _, valor = line.partition("=")
+        valor = valor.rstrip()
+
+        if chave == "out_time_us":
+            self.out_time_us = to_int(valor, self.out_time_us)
+        elif chave == "fps":
+            self.fps = to_float(valor, self.fps)
+        elif chave == "speed":
+            self.speed = to_float(valor.rstrip("x"), self.speed)
+        elif chave == "total_size":
+            self.total_size = to_int(valor, self.total_size)
+        elif chave == "bitrate":
+            self.bitrate = to_float(valor.rstrip("kbits/s"), self.bitrate)
+        elif chave == "progress":
+            self.finished = valor == "end"
+            return True
+
+        return False
+
+
+class FfmpegMessageReader(Thread):
+    """
+    Lê as mensagens do ffmpeg (stderr), mantendo apenas as últimas linhas e a duração do arquivo de origem
+    """
+
+    DURATION = "Duration: "
+
+    def __init__(self, stream):
+        Thread.__init__(self)
+        self.daemon = True
+        self.stream = stream
+        self.duracao = None
+        self.ultimasLinhas = deque(maxlen=10)
+
+    def run(self):
+        for line in iter(self.stream.readline, ''):
+            self.ultimasLinhas.append(line)
+            if self.duracao is None and self.DURATION in line:
+                self.duracao = ffmpeg_time_to_seconds(line[line.find(self.DURATION) + len(self.DURATION):].split(",")[0])
+        self.stream.close()
+
+    def get_ultimas_linhas(self):
+        return "".join(self.ultimasLinhas).strip()
+
+
+class FfmpegJob(object):
+    """
+    Uma execução do ffmpeg, com o seu próprio processo, progresso e estado
+    """
+
+    NA_FILA = 0
+    EXECUTANDO = 1
+    CONCLUIDO = 2
+    FALHA = 3
+    CANCELADO = 4
+
+    DESCRICAO_ESTADOS = ["Na fila", "Executando", "Concluído", "Falha", "Cancelado"]
+    CODIGOS_ESTADOS = ["na_fila", "executando", "concluido", "falha", "cancelado"]
+
+    # Filas de execução: jobs que recodificam o vídeo e jobs limitados pelo disco (cópia de streams e áudio)
+    LANE_CPU = "cpu"
+    LANE_IO = "io"
+
+    def __init__(self, args, origem, destino, duracao, saidas=None):
+        self.args = args
+        self.origem = origem
+        self.destino = destino
+        self.duracao = duracao or 0
+        self.saidas = saidas if saidas is not None else [destino]
+
+        # As saídas são gravadas com nomes temporários e renomeadas apenas ao final do job (exceto padrões como %03d)
+        self.parciais = dict((saida, get_arquivo_parcial(saida)) for saida in self.saidas if "%" not in saida and saida in args)
+        self.lane = classificar_lane(args)
+        self.threads = None
+
+        # Permite executar o job mesmo que as saídas estejam atualizadas
+        self.forcar = False
+        self.atualizado = False
+
+        # Vídeos de origem dos jobs que leem listas ou arquivos intermediários (ex: concatenação), utilizados no lugar
+        # das entradas do ffmpeg para verificar se as saídas estão atualizadas
+        self.origens = None
+
+        # Jobs que devem ser concluídos antes deste e funções executadas ao final do job (ex: remoção de temporários)
+        self.dependencias = []
+        self.aoFinalizar = []
+
+        # Função executada no início do job, na thread do worker, que pode ajustar os parâmetros de acordo com o
+        # resultado dos jobs anteriores ou com a análise do vídeo. Se retornar False, o job não precisa ser executado.
+        self.preparar = None
+        self.finalizado = False
+
+        self.estado = self.NA_FILA
+        self.processo = None
+        self.segundos = 0
+        self.tamanhoDestino = 0
+        self.fps = None
+        self.speed = None
+        self.mensagemErro = None
+
+    def get_descricao_estado(self):
+        return self.DESCRICAO_ESTADOS[self.estado]
+
+    def get_codigo_estado(self):
+        return self.CODIGOS_ESTADOS[self.estado]
+
+    def get_segundos_concluidos(self):
+        if self.estado == self.CONCLUIDO:
+            return self.duracao
+        return min(self.segundos, self.duracao)
+
+    def get_fracao_concluida(self):
+        if self.estado == self.CONCLUIDO:
+            return 1.0
+        return self.get_segundos_concluidos() / self.duracao if self.duracao > 0 else 0.0
+
+    def get_progresso_saidas(self):
+        """
+        Retorna o destino, o estado, a fração concluída e o tamanho de cada saída exibida na tela de progresso
+        """
+
+        return [(self.destino, self.estado, self.get_fracao_concluida(), self.tamanhoDestino)]
+
+    def get_entradas(self):
+        """
+        Retorna os arquivos de entrada (-i) do ffmpeg
+        """
+
+        return [self.args[idx + 1] for idx, arg in enumerate(self.args[:-1]) if arg == "-i"]
+
+    def get_caminho_gravacao(self, saida):
+        """
+        Retorna o arquivo em que a saída é gravada durante a execução do job
+        """
+
+        return self.parciais.get(saida, saida)
+
+    def remover_parciais(self):
+        for parcial in self.parciais.values():
+            if os.path.isfile(parcial):
+                os.remove(parcial)
+
+    def concluir_parciais(self):
+        """
+        Substitui as saídas pelos arquivos gravados durante a execução do job
+        """
+
+        for saida, parcial in self.parciais.items():
+            if os.path.isfile(parcial):
+                substituir_arquivo(parcial, saida)
+
+    def to_dict(self):
+        """
+        Retorna os dados necessários para recriar o job ao retomar um lote interrompido
+        """
+
+        return {"tipo": "ffmpeg", "args": self.args, "origem": self.origem, "destino": self.destino, "duracao": self.duracao, "saidas": self.saidas,
+                "origens": self.origens}
+
+    def get_args(self):
+        """
+        Retorna a linha de comando completa do ffmpeg, com o limite de threads aplicado às entradas e saídas
+        """
+
+        args = [get_caminho_ffmpeg(), "-hide_banner", "-nostats", "-progress", "pipe:1"]
+        for arg in self.args:
+            if self.threads is not None and (arg == "-i" or arg in self.saidas):
+                args.extend(["-threads", str(self.threads)])
+            args.append(self.parciais.get(arg, arg))
+        return args
+
+    def executar(self, notificar):
+        """
+        Executa o ffmpeg, chamando a função de notificação a cada atualização do progresso. Retorna True em caso de sucesso.
+        """
+
+        if self.preparar is not None and self.preparar() is False:
+            debug("Ignorando job sem processamento necessário: " + self.destino)
+            return True
+
+        if self.origem is not None and not os.path.isfile(self.origem):
+            debug("Ignorando arquivo inexistente: " + self.origem)
+            return False
+
+        # As saídas geradas anteriormente com as mesmas entradas e parâmetros não são geradas novamente
+        if not self.forcar and gCacheSaidas.is_atualizado(self):
+            debug("Ignorando job com as saídas atualizadas: " + self.destino)
+            self.atualizado = True
+            self.tamanhoDestino = os.stat(self.destino).st_size
+            return True
+
+        for saida in self.saidas:
+            # Cria o diretório, se não existir
+            directory = os.path.dirname(saida)
+            if directory and not os.path.exists(directory):
+                debug("Criando o diretório " + directory)
+                os.makedirs(directory)
+
+            # Verifica se o vídeo de destino existe. As saídas com nome temporário substituem o destino apenas no final do job.
+            saida = self.get_caminho_gravacao(saida)
+            if os.path.isfile(saida):
+                debug("Removendo arquivo de destino existente: " + saida)
+                os.remove(saida)
+
+        args = self.get_args()
+        debug("Executando aplicação: " + ' '.join(args))
+
+        self.processo = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=1, universal_newlines=True)
+
+        # As mensagens do ffmpeg são lidas em uma thread separada, apenas para obter a duração e os erros
+        mensagens = FfmpegMessageReader(self.processo.stderr)
+        mensagens.start()
+
+        # Itera entre os blocos de progresso recebidos no stdout
+        progresso = FfmpegProgress()
+        ultimaAmostra = 0
+        for line in iter(self.processo.stdout.readline, ''):
+            if not progresso.feed(line):
+                continue
+
+            if not self.duracao and mensagens.duracao:
+                self.duracao = mensagens.duracao
+            if progresso.out_time_us is not None:
+                self.segundos = progresso.out_time_us / 1000000.0
+            self.fps = progresso.fps
+            self.speed = progresso.speed
+
+            # O tamanho do destino é informado pelo ffmpeg, ou consultado no disco em intervalos
+            if progresso.total_size:
+                self.tamanhoDestino = progresso.total_size
+            elif time.time() - ultimaAmostra >= INTERVALO_AMOSTRA_TAMANHO and os.path.isfile(self.get_caminho_gravacao(self.destino)):
+                self.tamanhoDestino = os.stat(self.get_caminho_gravacao(self.destino)).st_size
+                ultimaAmostra = time.time()
+
+            notificar(self)
+
+        # Finaliza o processo do ffmpeg
+        self.processo.stdout.close()
+        exitCode = self.processo.wait()
+        mensagens.join()
+
+        if exitCode != 0:
+            self.mensagemErro = mensagens.get_ultimas_linhas()
+            debug("Mensagem de erro: " + self.mensagemErro)
+            self.remover_parciais()
+            return False
+
+        self.concluir_parciais()
+
+        if self.origem is not None and os.path.isfile(self.origem):
+            debug("Vídeo original: " + self.origem + " (" + to_human_size(os.stat(self.origem).st_size) + ")")
+
+        if os.path.isfile(self.destino):
+            debug("Vídeo processado: " + self.destino + " (" + to_human_size(os.stat(self.destino).st_size) + ")")
+
+        gCacheSaidas.registrar(self)
+        return True
+
+    def finalizar(self):
+        """
+        Executa as funções de finalização do job, apenas uma vez
+        """
+
+        if self.finalizado:
+            return
+        self.finalizado = True
+
+        for funcao in self.aoFinalizar:
+            try:
+                funcao()
+            except Exception as e:
+                debug("Falha ao finalizar o job " + self.destino + " : " + str(e))
+
+    def cancelar(self):
+        if self.processo is not None and self.processo.poll() is None:
+            try:
+                self.processo.kill()
+                debug("O processo do ffmpeg foi interrompido pelo usuário: " + self.destino)
+            except OSError:
+                debug("O processo do ffmpeg foi finalizado com sucesso: " + self.destino)
+
+
+class FfmpegMultiJob(FfmpegJob):
+    """
+    Uma execução do ffmpeg que gera várias saídas (ex: vídeo e áudio) lendo e decodificando a origem uma única vez.
+    Se a execução falhar, cada saída é gerada novamente em uma execução separada, de forma que a falha de uma saída
+    não impeça a geração das demais.
+    """
+
+    def __init__(self, origem, saidas, duracao):
+        args = ["-i", origem]
+        for destino, params in saidas:
+            args = args + params + [destino]
+
+        FfmpegJob.__init__(self, args, origem, saidas[0][0], duracao, [destino for destino, params in saidas])
+        self.parametrosSaidas = saidas
+        self.estadosSaidas = [FfmpegJob.NA_FILA] * len(saidas)
+        self.tamanhosSaidas = [0] * len(saidas)
+        self.jobSaida = None
+
+        # O job é limitado pela CPU se alguma das saídas recodificar o vídeo
+        lanes = [classificar_lane(params) for destino, params in saidas]
+        self.lane = FfmpegJob.LANE_CPU if FfmpegJob.LANE_CPU in lanes else FfmpegJob.LANE_IO
+
+    def get_progresso_saidas(self):
+        progresso = []
+        for idx, destino in enumerate(self.saidas):
+            estado = self.estadosSaidas[idx]
+            if self.estado == FfmpegJob.CANCELADO and estado in (FfmpegJob.NA_FILA, FfmpegJob.EXECUTANDO):
+                estado = FfmpegJob.CANCELADO
+
+            if estado == FfmpegJob.CONCLUIDO:
+                fracao = 1.0
+            elif estado == FfmpegJob.EXECUTANDO:
+                fracao = min(self.segundos / self.duracao, 1.0) if self.duracao > 0 else 0.0
+            else:
+                fracao = 0.0
+            progresso.append((destino, estado, fracao, self.tamanhosSaidas[idx]))
+        return progresso
+
+    def executar(self, notificar):
+        """
+        Executa o ffmpeg com todas as saídas, ou cada saída separadamente em caso de falha. Retorna True se todas as saídas forem geradas.
+        """
+
+        ultimaAmostra = [0]
+
+        def notificarSaidas(job):  # @UnusedVariable
+            # O tamanho de cada saída é consultado no disco em intervalos
+            if time.time() - ultimaAmostra[0] >= INTERVALO_AMOSTRA_TAMANHO:
+                for idx, destino in enumerate(self.saidas):
+                    for arquivo in (self.get_caminho_gravacao(destino), destino):
+                        if os.path.isfile(arquivo):
+                            self.tamanhosSaidas[idx] = os.stat(arquivo).st_size
+                            break
+                ultimaAmostra[0] = time.time()
+            notificar(self)
+
+        self.estadosSaidas = [FfmpegJob.EXECUTANDO] * len(self.saidas)
+        if FfmpegJob.executar(self, notificarSaidas):
+            self.estadosSaidas = [FfmpegJob.CONCLUIDO] * len(self.saidas)
+            ultimaAmostra[0] = 0
+            notificarSaidas(self)
+            return True
+
+        if self.estado == FfmpegJob.CANCELADO:
+            return False
+
+        debug("Falha na geração das saídas em uma única execução, gerando cada saída separadamente: " + self.origem)
+        self.estadosSaidas = [FfmpegJob.NA_FILA] * len(self.saidas)
+        for idx, (destino, params) in enumerate(self.parametrosSaidas):
+            self.segundos = 0
+            self.estadosSaidas[idx] = FfmpegJob.EXECUTANDO
+
+            self.jobSaida = FfmpegJob(["-i", self.origem] + params + [destino], self.origem, destino, self.duracao)
+            self.jobSaida.threads = self.threads
+            self.jobSaida.forcar = self.forcar
+            sucesso = self.jobSaida.executar(lambda job: self.atualizar_saida(job, idx, notificar))
+
+            if self.estado == FfmpegJob.CANCELADO:
+                return False
+
+            self.estadosSaidas[idx] = FfmpegJob.CONCLUIDO if sucesso else FfmpegJob.FALHA
+            self.mensagemErro = self.jobSaida.mensagemErro or self.mensagemErro
+            notificar(self)
+
+        return FfmpegJob.FALHA not in self.estadosSaidas
+
+    def to_dict(self):
+        return {"tipo": "multi", "origem": self.origem, "saidas": self.parametrosSaidas, "duracao": self.duracao}
+
+    def atualizar_saida(self, job, idx, notificar):
+        self.segundos = job.segundos
+        self.fps = job.fps
+        self.speed = job.speed
+        self.tamanhosSaidas[idx] = job.tamanhoDestino
+        notificar(self)
+
+    def cancelar(self):
+        FfmpegJob.cancelar(self)
+        if self.jobSaida is not None:
+            self.jobSaida.cancelar()
+
+
+class MpegtsConcatJob(FfmpegJob):
+    """
+    Concatena arquivos MPEG-TS acrescentando os bytes de cada arquivo ao destino, sem executar o ffmpeg.
+    A cópia é feita pelo sistema operacional (copy_file_range/sendfile), sem passar os dados pelo Python, quando disponível.
+    """
+
+    def __init__(self, arquivos, destino, duracao):
+        FfmpegJob.__init__(self, [], None, destino, duracao)
+        self.parciais = {destino: get_arquivo_parcial(destino)}
+        self.arquivos = arquivos
+        self.lane = FfmpegJob.LANE_IO
+        self.interrompido = False
+
+    def get_args(self):
+        return ["cat"] + self.arquivos
+
+    def to_dict(self):
+        return {"tipo": "mpegts", "arquivos": self.arquivos, "destino": self.destino, "duracao": self.duracao}
+
+    def executar(self, notificar):
+        """
+        Copia os arquivos para o destino, notificando o progresso a cada bloco copiado. Retorna True em caso de sucesso.
+        """
+
+        if self.preparar is not None and self.preparar() is False:
+            debug("Ignorando job sem processamento necessário: " + self.destino)
+            return True
+
+        directory = os.path.dirname(self.destino)
+        if directory and not os.path.exists(directory):
+            debug("Criando o diretório " + directory)
+            os.makedirs(directory)
+
+        debug("Concatenando os bytes dos arquivos: " + ' '.join(self.arquivos))
+
+        total = sum(os.stat(arquivo).st_size for arquivo in self.arquivos)
+        parcial = self.get_caminho_gravacao(self.destino)
+        try:
+            with open(parcial, "wb", 0) as saida:
+                for arquivo in self.arquivos:
+                    if self.interrompido:
+                        break
+
+                    for copiados in anexar_arquivo(arquivo, saida.fileno()):
+                        if self.interrompido:
+                            break
+
+                        self.tamanhoDestino += copiados
+                        self.segundos = self.duracao * self.tamanhoDestino / total if total else 0
+                        notificar(self)
+        except Exception:
+            # O arquivo parcial não é mantido em caso de falha na cópia
+            self.remover_parciais()
+            raise
+
+        if self.interrompido:
+            self.remover_parciais()
+            return False
+
+        substituir_arquivo(parcial, self.destino)
+        debug("Vídeo processado: " + self.destino + " (" + to_human_size(self.tamanhoDestino) + ")")
+        return True
+
+    def cancelar(self):
+        self.interrompido = True
+
+
+class JobScheduler(object):
+    """
+    Executa os jobs do ffmpeg em paralelo, em filas separadas para os jobs limitados por CPU e por disco.
+    Os jobs de CPU recebem um limite de threads, de forma que a soma das threads não ultrapasse a quantidade de CPUs.
+    """
+
+    def __init__(self, jobs, qtdJobsCpu, qtdJobsIo, notificarProgresso, notificarFim, notificarEstado=None):
+        self.jobs = jobs
+        self.notificarEstado = notificarEstado
+        self.qtdWorkers = {FfmpegJob.LANE_CPU: max(1, qtdJobsCpu), FfmpegJob.LANE_IO: max(1, qtdJobsIo)}
+        self.notificarProgresso = notificarProgresso
+        self.notificarFim = notificarFim
+        self.condicao = Condition()
+        self.workersAtivos = 0
+        self.interrompido = False
+
+        # Jobs encerrados cujas funções de finalização ainda estão em execução, fora do lock
+        self.finalizando = set()
+
+        threadsPorJob = max(1, multiprocessing.cpu_count() // self.qtdWorkers[FfmpegJob.LANE_CPU])
+        for job in self.jobs:
+            if job.lane == FfmpegJob.LANE_CPU:
+                job.threads = threadsPorJob
+
+    def iniciar(self):
+        debug("Iniciando o processamento de " + str(len(self.jobs)) + " jobs (" + str(self.qtdWorkers[FfmpegJob.LANE_CPU]) + " de CPU e " +
+              str(self.qtdWorkers[FfmpegJob.LANE_IO]) + " de I/O em paralelo)")
+
+        workers = []
+        for lane, qtd in self.qtdWorkers.items():
+            qtd = min(qtd, len([job for job in self.jobs if job.lane == lane]))
+            workers.extend([lane] * qtd)
+
+        self.workersAtivos = len(workers)
+        if not workers:
+            self.notificarFim()
+
+        for lane in workers:
+            thread = Thread(target=self.worker, args=(lane,))
+            thread.daemon = True
+            thread.start()
+
+    def proximo_job(self, lane):
+        """
+        Retorna o próximo job da fila cujas dependências foram concluídas, aguardando se necessário
+        """
+
+        proximo = None
+        cancelados = []
+        with self.condicao:
+            while not self.interrompido and proximo is None:
+                pendentes = [job for job in self.jobs if job.lane == lane and job.estado == FfmpegJob.NA_FILA]
+                if not pendentes:
+                    break
+
+                alterado = False
+                for job in pendentes:
+                    estados = [dependencia.estado for dependencia in job.dependencias]
+                    if FfmpegJob.FALHA in estados or FfmpegJob.CANCELADO in estados:
+                        # Uma dependência falhou, o job não pode ser executado
+                        debug("Cancelando o job " + job.destino + " devido a falha em um job anterior")
+                        job.estado = FfmpegJob.CANCELADO
+                        self.finalizando.add(job)
+                        cancelados.append(job)
+                        alterado = True
+                    elif all(estado == FfmpegJob.CONCLUIDO for estado in estados) and not self.finalizando.intersection(job.dependencias):
+                        job.estado = FfmpegJob.EXECUTANDO
+                        proximo = job
+                        break
+
+                # Aguarda a conclusão de algum job em execução
+                if alterado:
+                    self.condicao.notify_all()
+                elif proximo is None:
+                    self.condicao.wait()
+
+        for job in cancelados:
+            self.encerrar_job(job)
+        if proximo is not None:
+            self.registrar_estado(proximo)
+        return proximo
+
+    def worker(self, lane):
+        while True:
+            job = self.proximo_job(lane)
+            if job is None:
+                break
+
+            self.notificarProgresso(job)
+            try:
+                sucesso = job.executar(self.notificarProgresso)
+            except Exception as e:
+                debug("Falha ao processar o arquivo de vídeo " + str(job.origem) + " : " + str(e))
+                sucesso = False
+
+            with self.condicao:
+                if job.estado != FfmpegJob.CANCELADO:
+                    job.estado = FfmpegJob.CONCLUIDO if sucesso else FfmpegJob.FALHA
+                self.finalizando.add(job)
+            self.encerrar_job(job)
+            self.notificarProgresso(job)
+
+        with self.condicao:
+            self.workersAtivos -= 1
+            fim = self.workersAtivos == 0
+
+        if fim:
+            debug("Processamento dos jobs finalizado: " + str(self.get_qtd_concluidos()) + " concluídos, " + str(self.get_qtd_falhas()) + " falhas")
+            self.notificarFim()
+
+    def cancelar_job(self, job):
+        encerrar = False
+        with self.condicao:
+            if job.estado == FfmpegJob.NA_FILA:
+                job.estado = FfmpegJob.CANCELADO
+                self.finalizando.add(job)
+                encerrar = True
+            elif job.estado == FfmpegJob.EXECUTANDO:
+                # O job será finalizado pelo worker ao término do processo
+                job.estado = FfmpegJob.CANCELADO
+            self.condicao.notify_all()
+        if encerrar:
+            self.encerrar_job(job)
+        job.cancelar()
+        self.notificarProgresso(job)
+
+    def cancelar(self):
+        """
+        Interrompe todos os jobs em execução e descarta os jobs da fila
+        """
+
+        with self.condicao:
+            self.interrompido = True
+            self.condicao.notify_all()
+        for job in self.jobs:
+            if job.estado in (FfmpegJob.NA_FILA, FfmpegJob.EXECUTANDO):
+                self.cancelar_job(job)
+
+    def encerrar_job(self, job):
+        """
+        Executa as funções de finalização e registra o estado final do job fora do lock, liberando em seguida os jobs
+        que dependem dele
+        """
+
+        job.finalizar()
+        self.registrar_estado(job)
+        with self.condicao:
+            self.finalizando.discard(job)
+            self.condicao.notify_all()
+
+    def registrar_estado(self, job):
+        if self.notificarEstado is not None:
+            self.notificarEstado(job)
+
+    def get_qtd_concluidos(self):
+        return len([job for job in self.jobs if job.estado == FfmpegJob.CONCLUIDO])
+
+    def get_qtd_falhas(self):
+        return len([job for job in self.jobs if job.estado == FfmpegJob.FALHA])
+
+
+class AppSettings(object):
+    """
+    Configurações da aplicação, lidas uma única vez do arquivo XML no primeiro acesso e mantidas em memória.
+    Se o arquivo não existir, são utilizadas as configurações padrão. As alterações são agrupadas e gravadas no arquivo
+    em background.
+    """
+
+    def __init__(self, arquivoXml):
+        self.arquivoXml = arquivoXml
+        self.lock = Lock()
+        self.timerGravacao = None
+        self.extensoesVideo = None
+        self.root = None
+        self.valores = None
+
+    def carregar(self):
+        with self.lock:
+            if self.root is not None:
+                return
+
+            if os.path.isfile(self.arquivoXml):
+                self.root = ET.parse(self.arquivoXml, ET.XMLParser(remove_comments=False, strip_cdata=False)).getroot()
+            else:
+                self.root = ET.Element('config')
+                for xmlTag, value in get_configuracoes_padrao():
+                    ET.SubElement(self.root, xmlTag).text = value
+
+            self.valores = {}
+            for node in self.root:
+                if isinstance(node.tag, str):
+                    self.valores[node.tag] = node.text
+
+    def get(self, xmlTag):
+        if self.valores is None:
+            self.carregar()
+        return self.valores.get(xmlTag)
+
+    def set(self, xmlTag, value):
+        self.carregar()
+        with self.lock:
+            # Remove o nó se já existir
+            node = self.root.find("./" + xmlTag)
+            if node is not None:
+                self.root.remove(node)
+            self.valores.pop(xmlTag, None)
+
+            # Se o valor não for nulo, adicionar o novo nó
+            if value is not None and value.strip():
+                ET.SubElement(self.root, xmlTag).text = value
+                self.valores[xmlTag] = value
+
+            if xmlTag == "extensoes_video":
+                self.extensoesVideo = None
+
+            # Agrupa as alterações, gravando o arquivo apenas após o intervalo
+            if self.timerGravacao is None:
+                self.timerGravacao = Timer(INTERVALO_GRAVACAO_SETTINGS, self.flush)
+                self.timerGravacao.daemon = True
+                self.timerGravacao.start()
+
+    def flush(self):
+        """
+        Grava as alterações pendentes no arquivo XML
+        """
+
+        with self.lock:
+            if self.timerGravacao is not None:
+                self.timerGravacao.cancel()
+                self.timerGravacao = None
+            if self.root is not None:
+                indent_and_save_xml(self.root, self.arquivoXml)
+
+    def get_extensoes_video(self):
+        if self.extensoesVideo is None:
+            extensoes = self.get("extensoes_video") or ""
+            self.extensoesVideo = frozenset("." + ext.strip().lower() for ext in extensoes.split('|') if ext.strip())
+        return self.extensoesVideo
+
+
+class VideoFilterChain(object):
+    """
+    Cadeia de filtros de vídeo aplicados em uma única conversão, sempre na ordem: recorte, rotação e redimensionamento
+    """
+
+    def __init__(self):
+        self.recorte = None
+        self.rotacao = None
+        self.escala = None
+
+    def recortar(self, largura, altura, x, y):
+        self.recorte = (largura, altura, x, y)
+
+    def rotacionar(self, descricao):
+        for rotacao in ROTACOES:
+            if rotacao[0] == descricao:
+                self.rotacao = rotacao
+
+    def redimensionar(self, largura, altura):
+        self.escala = (largura, altura)
+
+    def is_vazio(self):
+        return self.recorte is None and self.rotacao is None and self.escala is None
+
+    def get_filtro(self):
+        """
+        Retorna o valor do parâmetro -vf do ffmpeg
+        """
+
+        filtros = []
+        if self.recorte is not None:
+            filtros.append("crop=%d:%d:%d:%d" % self.recorte)
+        if self.rotacao is not None:
+            filtros.append(self.rotacao[1])
+        if self.escala is not None:
+            filtros.append("scale=w=%d:h=%d" % self.escala)
+        return ",".join(filtros)
+
+    def validar(self, largura, altura):
+        """
+        Verifica se as transformações podem ser aplicadas a um vídeo com a resolução informada.
+        Retorna a mensagem de erro, ou None se a cadeia for válida.
+        """
+
+        if not largura or not altura:
+            return "Resolução do vídeo desconhecida"
+
+        if self.recorte is not None:
+            w, h, x, y = self.recorte
+            if w <= 0 or h <= 0 or x < 0 or y < 0:
+                return "A região deve possuir largura e altura maiores que zero"
+            if x + w > largura or y + h > altura:
+                return "A região %dx%d na posição %d,%d ultrapassa a resolução do vídeo (%dx%d)" % (w, h, x, y, largura, altura)
+            largura, altura = w, h
+
+        if self.rotacao is not None and self.rotacao[2]:
+            largura, altura = altura, largura
+
+        if self.escala is not None:
+            w, h = self.escala
+            if (w <= 0 and w not in (-1, -2)) or (h <= 0 and h not in (-1, -2)) or (w < 0 and h < 0):
+                return "Resolução inválida: %dx%d" % (w, h)
+
+            # Os codecs mais comuns (yuv420p) exigem dimensões pares
+            if (w > 0 and w % 2) or (h > 0 and h % 2):
+                return "A resolução final deve possuir largura e altura pares: %dx%d" % (w, h)
+        elif largura % 2 or altura % 2:
+            return "A resolução final deve possuir largura e altura pares: %dx%d" % (largura, altura)
+
+        return None
+
+
+class VideoInfo(object):
+    """
+    Informações de um arquivo de vídeo, obtidas através do ffprobe
+    """
+
+    __slots__ = ("duration", "width", "height", "fps", "frame_rate", "video_codec", "pix_fmt", "time_base", "rotation", "audio_codec", "sample_rate",
+                 "channels", "bitrate", "video_streams", "audio_streams", "audio_codecs", "subtitle_codecs")
+
+    def __init__(self):
+        for atributo in self.__slots__:
+            setattr(self, atributo, None)
+        self.duration = 0.0
+        self.video_streams = 0
+        self.audio_streams = 0
+        self.audio_codecs = []
+        self.subtitle_codecs = []
+
+    @classmethod
+    def from_ffprobe(cls, dados):
+        """
+        Cria as informações do vídeo a partir do JSON retornado pelo ffprobe
+        """
+
+        info = cls()
+        formato = dados.get("format", {})
+        info.duration = to_float(formato.get("duration"), 0.0)
+        info.bitrate = to_int(formato.get("bit_rate"))
+
+        for stream in dados.get("streams", []):
+            if stream.get("codec_type") == "video":
+                info.video_streams += 1
+                if info.video_codec is None:
+                    info.video_codec = stream.get("codec_name")
+                    info.pix_fmt = stream.get("pix_fmt")
+                    info.time_base = stream.get("time_base")
+                    info.width = to_int(stream.get("width"))
+                    info.height = to_int(stream.get("height"))
+                    info.fps = fraction_to_float(stream.get("avg_frame_rate")) or fraction_to_float(stream.get("r_frame_rate"))
+                    if fraction_to_float(stream.get("r_frame_rate")):
+                        info.frame_rate = stream.get("r_frame_rate")
+                    info.rotation = get_rotacao_stream(stream)
+            elif stream.get("codec_type") == "audio":
+                info.audio_streams += 1
+                info.audio_codecs.append(stream.get("codec_name"))
+                if info.audio_codec is None:
+                    info.audio_codec = stream.get("codec_name")
+                    info.sample_rate = to_int(stream.get("sample_rate"))
+                    info.channels = to_int(stream.get("channels"))
+            elif stream.get("codec_type") == "subtitle":
+                info.subtitle_codecs.append(stream.get("codec_name"))
+
+        return info
+
+    @classmethod
+    def from_dict(cls, dados):
+        """
+        Recria as informações do vídeo a partir do cache. Retorna None para arquivos que não puderam ser analisados.
+        """
+
+        if not dados:
+            return None
+
+        info = cls()
+        for atributo in cls.__slots__:
+            if atributo in dados:
+                setattr(info, atributo, dados[atributo])
+        return info
+
+    def to_dict(self):
+        return dict((atributo, getattr(self, atributo)) for atributo in self.__slots__)
+
+    def get_parametros_streams(self):
+        """
+        Retorna os parâmetros dos streams que precisam ser iguais para que os vídeos possam ser concatenados sem recodificação
+        """
+
+        return (self.video_codec, self.width, self.height, self.pix_fmt, round(self.fps or 0, 3), self.time_base,
+                self.audio_codec, self.sample_rate, self.channels)
+
+    def get_resolucao(self):
+        if self.width and self.height:
+            return str(self.width) + "x" + str(self.height)
+        return None
+
+    def get_descricao(self):
+        """
+        Texto exibido na coluna de detalhes da grid
+        """
+
+        partes = ["Duration: " + seconds_to_time(self.duration)]
+        if self.video_codec:
+            partes.append("Video: " + self.video_codec)
+            if self.get_resolucao():
+                partes.append(self.get_resolucao())
+            if self.fps:
+                partes.append(('%.2f' % self.fps).rstrip('0').rstrip('.') + " fps")
+        if self.audio_codec:
+            partes.append("Audio: " + self.audio_codec)
+            if self.sample_rate:
+                partes.append(str(self.sample_rate) + " Hz")
+        return " ".join(partes)
+
+
+class FfmpegCapabilities(object):
+    """
+    Capacidades do ffmpeg configurado (versão, opções de compilação, encoders e filtros). A detecção executa o ffmpeg
+    algumas vezes, por isso o resultado é armazenado em disco e reutilizado enquanto o caminho, a data de modificação e
+    o tamanho do executável forem os mesmos.
+    """
+
+    VERSAO_CACHE = 2
+
+    def __init__(self, arquivoCache):
+        self.arquivoCache = arquivoCache
+        self.lock = Lock()
+        self.dados = None
+        self.lidoDoCache = False
+        self.tempoDeteccao = None
+
+    def get(self):
+        """
+        Retorna as capacidades, aguardando a detecção caso esteja em andamento
+        """
+
+        with self.lock:
+            if self.dados is None:
+                inicio = time.time()
+                self.dados = self.carregar()
+                self.lidoDoCache = self.dados is not None
+                if self.dados is None:
+                    self.dados = self.detectar()
+                self.tempoDeteccao = time.time() - inicio
+            return self.dados
+
+    def iniciar_deteccao(self, aoConcluir=None):
+        """
+        Detecta as capacidades em background, executando a função informada ao final
+        """
+
+        def detectar():
+            self.get()
+            if aoConcluir is not None:
+                aoConcluir()
+
+        thread = Thread(target=detectar)
+        thread.daemon = True
+        thread.start()
+
+    def get_chave(self):
+        return get_identificacao_executavel(get_caminho_ffmpeg())
+
+    def carregar(self):
+        if not os.path.isfile(self.arquivoCache):
+            return None
+
+        try:
+            with open(self.arquivoCache, "r") as arquivo:
+                dados = json.load(arquivo)
+        except (IOError, OSError, ValueError) as e:
+            debug("Falha ao carregar o cache das capacidades do ffmpeg: " + str(e))
+            return None
+
+        if dados.get("versao") != self.VERSAO_CACHE or dados.get("chave") != self.get_chave():
+            debug("O ffmpeg foi alterado, as capacidades serão detectadas novamente")
+            return None
+
+        return dados
+
+    def detectar(self):
+        chave = self.get_chave()
+        debug("Detectando as capacidades do ffmpeg " + get_caminho_ffmpeg())
+
+        versao = executar_ffmpeg_info(["-version"])
+        dados = {"versao": self.VERSAO_CACHE, "chave": chave, "ffmpeg": None,
+                 "features": re.findall("--enable-[^\\s]+|disable-[^\\s]+", versao),
+                 "encoders": listar_recursos_ffmpeg("-encoders"), "filtros": listar_recursos_ffmpeg("-filters"),
+                 "opcoes": listar_recursos_ffmpeg("-h")}
+
+        for line in versao.splitlines():
+            if line.startswith("ffmpeg version "):
+                dados["ffmpeg"] = line.split()[2]
+
+        debug("ffmpeg " + str(dados["ffmpeg"]) + ": " + str(len(dados["encoders"])) + " encoders e " + str(len(dados["filtros"])) + " filtros")
+
+        # Falhas na execução do ffmpeg não são armazenadas
+        if chave is not None and dados["ffmpeg"] is not None:
+            salvar_arquivo_atomico(self.arquivoCache, json.dumps(dados))
+        return dados
+
+
+class MetadataCache(object):
+    """
+    Cache em disco das informações dos vídeos, evitando executar o ffmpeg para arquivos que não foram alterados.
+    Cada entrada é válida apenas enquanto o caminho, tamanho, data de modificação e o executável do ffprobe forem os mesmos.
+    """
+
+    VERSAO_CACHE = 8
+
+    def __init__(self, arquivoCache):
+        self.arquivoCache = arquivoCache
+        self.entradas = None
+        self.alterado = False
+        self.acertos = 0
+        self.falhas = 0
+        self.lock = Lock()
+
+    def get_entradas(self):
+        # O arquivo é lido apenas no primeiro acesso, sem atrasar a inicialização da aplicação
+        if self.entradas is None:
+            self.carregar()
+        return self.entradas
+
+    def carregar(self):
+        self.entradas = {}
+        if not os.path.isfile(self.arquivoCache):
+            return
+
+        try:
+            with open(self.arquivoCache, "r") as arquivo:
+                dados = json.load(arquivo)
+            if dados.get("versao") == self.VERSAO_CACHE:
+                self.entradas = dados.get("arquivos", {})
+        except (IOError, OSError, ValueError) as e:
+            debug("Falha ao carregar o cache de metadados, o cache será recriado: " + str(e))
+
+        debug("Cache de metadados carregado: " + str(len(self.entradas)) + " arquivos")
+
+    def salvar(self):
+        with self.lock:
+            if not self.alterado:
+                return
+
+            dados = json.dumps({"versao": self.VERSAO_CACHE, "arquivos": self.entradas})
+            self.alterado = False
+
+        salvar_arquivo_atomico(self.arquivoCache, dados)
+
+    def get(self, arquivo, tamanho, mtime, ffprobe):
+        with self.lock:
+            entrada = self.get_entradas().get(arquivo)
+            if entrada is not None and entrada[0] == tamanho and entrada[1] == mtime and entrada[2] == ffprobe:
+                self.acertos += 1
+                return entrada[3]
+
+            self.falhas += 1
+            return None
+
+    def put(self, arquivo, tamanho, mtime, ffprobe, info):
+        with self.lock:
+            self.get_entradas()[arquivo] = [tamanho, mtime, ffprobe, info]
+            self.alterado = True
+
+    def invalidar(self, arquivo=None):
+        """
+        Remove a entrada de um arquivo, ou todo o cache se o arquivo não for informado
+        """
+
+        with self.lock:
+            if arquivo is None:
+                self.entradas = {}
+                self.alterado = True
+            elif self.get_entradas().pop(arquivo, None) is not None:
+                self.alterado = True
+
+    def remover_inexistentes(self, diretorio, arquivosEncontrados):
+        """
+        Remove as entradas de arquivos do diretório que não foram encontrados na última leitura
+        """
+
+        prefixo = os.path.join(diretorio, "")
+        with self.lock:
+            removidos = [arquivo for arquivo in self.get_entradas() if arquivo.startswith(prefixo) and arquivo not in arquivosEncontrados]
+            for arquivo in removidos:
+                del self.entradas[arquivo]
+            if removidos:
+                self.alterado = True
+
+        if removidos:
+            debug("Removidas " + str(len(removidos)) + " entradas do cache de metadados")
+
+    def reset_contadores(self):
+        self.acertos = 0
+        self.falhas = 0
+
+
+class OutputCache(object):
+    """
+    Registro das saídas geradas pelos jobs, permitindo ignorar os jobs cujas saídas estão atualizadas (como o make).
+    Cada saída é considerada atualizada enquanto as entradas, os parâmetros do ffmpeg e as próprias saídas não forem alterados.
+    """
+
+    VERSAO_CACHE = 1
+
+    def __init__(self, arquivoCache):
+        self.arquivoCache = arquivoCache
+        self.entradas = None
+        self.alterado = False
+        self.lock = Lock()
+
+    def get_entradas(self):
+        # O arquivo é lido apenas no primeiro acesso, sem atrasar a inicialização da aplicação
+        if self.entradas is None:
+            self.carregar()
+        return self.entradas
+
+    def carregar(self):
+        self.entradas = {}
+        if not os.path.isfile(self.arquivoCache):
+            return
+
+        try:
+            with open(self.arquivoCache, "r") as arquivo:
+                dados = json.load(arquivo)
+            if dados.get("versao") == self.VERSAO_CACHE:
+                self.entradas = dados.get("saidas", {})
+        except (IOError, OSError, ValueError) as e:
+            debug("Falha ao carregar o registro das saídas, o registro será recriado: " + str(e))
+
+    def salvar(self):
+        with self.lock:
+            if self.entradas is None:
+                return
+
+            # Descarta as saídas removidas (ex: arquivos temporários)
+            for destino in [destino for destino in self.entradas if not os.path.isfile(destino)]:
+                del self.entradas[destino]
+                self.alterado = True
+
+            if not self.alterado:
+                return
+
+            dados = json.dumps({"versao": self.VERSAO_CACHE, "saidas": self.entradas})
+            self.alterado = False
+
+        salvar_arquivo_atomico(self.arquivoCache, dados)
+
+    def get_assinatura(self, job):
+        """
+        Retorna os parâmetros e a identificação das entradas (ou dos vídeos de origem) do job, ou None se alguma entrada
+        não for um arquivo
+        """
+
+        entradas = job.origens if job.origens is not None else job.get_entradas()
+        if not entradas or not all(os.path.isfile(entrada) for entrada in entradas):
+            return None
+        return {"args": list(job.args), "entradas": [get_fingerprint(entrada) for entrada in entradas]}
+
+    def get_estado_saidas(self, job):
+        return [[os.stat(saida).st_size, os.stat(saida).st_mtime] if os.path.isfile(saida) else None for saida in job.saidas]
+
+    def is_atualizado(self, job):
+        assinatura = self.get_assinatura(job)
+        with self.lock:
+            registro = self.get_entradas().get(job.destino)
+        if assinatura is None or registro is None:
+            return False
+
+        saidas = self.get_estado_saidas(job)
+        return None not in saidas and registro["args"] == assinatura["args"] and registro["entradas"] == assinatura["entradas"] and \
+            registro["saidas"] == saidas
+
+    def registrar(self, job):
+        # As saídas com padrões (ex: segmento_%03d.mkv) não podem ser verificadas
+        assinatura = self.get_assinatura(job)
+        if assinatura is None or any("%" in saida for saida in job.saidas):
+            return
+
+        assinatura["saidas"] = self.get_estado_saidas(job)
+        with self.lock:
+            self.get_entradas()[job.destino] = assinatura
+            self.alterado = True
+
+
+class JobJournal(object):
+    """
+    Registro em disco do lote de jobs em execução, permitindo retomar o lote caso a aplicação seja interrompida.
+    O arquivo possui uma linha JSON com os jobs do lote, seguida de uma linha para cada mudança de estado de um job,
+    e é removido quando o lote é finalizado.
+    """
+
+    def __init__(self, arquivo):
+        self.arquivo = arquivo
+        self.jobs = []
+        self.lock = Lock()
+
+    def iniciar_lote(self, titulo, jobs):
+        # Os jobs que dependem de outros jobs, ou dos quais outros jobs dependem, utilizam arquivos temporários e não são
+        # retomados, assim como os jobs cujos parâmetros são definidos durante a execução
+        dependencias = set()
+        for job in jobs:
+            dependencias.update(id(dependencia) for dependencia in job.dependencias)
+
+        registros = []
+        for job in jobs:
+            retomavel = not job.dependencias and not job.aoFinalizar and job.preparar is None and id(job) not in dependencias
+            registros.append({"saidas": list(job.parciais.values()), "job": job.to_dict() if retomavel else None})
+
+        with self.lock:
+            self.jobs = list(jobs)
+            salvar_arquivo_atomico(self.arquivo, json.dumps({"titulo": titulo, "jobs": registros}) + "\n")
+
+    def registrar(self, job):
+        with self.lock:
+            if job not in self.jobs:
+                return
+
+            with open(self.arquivo, "a") as arquivo:
+                arquivo.write(json.dumps({"job": self.jobs.index(job), "estado": job.estado}) + "\n")
+                arquivo.flush()
+                os.fsync(arquivo.fileno())
+
+    def finalizar_lote(self):
+        with self.lock:
+            self.jobs = []
+            if os.path.isfile(self.arquivo):
+                os.remove(self.arquivo)
+
+    def get_lote_pendente(self):
+        """
+        Retorna o título, os dados dos jobs que não foram concluídos e os arquivos temporários do lote interrompido,
+        ou None se não houver lote interrompido
+        """
+
+        if not os.path.isfile(self.arquivo):
+            return None
+
+        lote = None
+        estados = {}
+        with open(self.arquivo, "r") as arquivo:
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    # A última linha pode ter sido gravada parcialmente
+                    continue
+
+                if lote is None:
+                    lote = registro
+                else:
+                    estados[registro["job"]] = registro["estado"]
+
+        if lote is None:
+            return None
+
+        pendentes = [registro for idx, registro in enumerate(lote["jobs"]) if estados.get(idx) != FfmpegJob.CONCLUIDO]
+        return {"titulo": lote["titulo"],
+                "jobs": [registro["job"] for registro in pendentes if registro["job"] is not None],
+                "naoRetomaveis": len([registro for registro in pendentes if registro["job"] is None]),
+                "parciais": [parcial for registro in pendentes for parcial in registro["saidas"]]}
+
+
+class KeyframeIndex(object):
+    """
+    Índice dos keyframes do primeiro stream de vídeo de um arquivo, com os tempos (em segundos, a partir do início do
+    arquivo) e as posições em bytes dos keyframes em ordem crescente de tempo. Os valores são armazenados em arrays de
+    doubles, compactos em memória e em disco, e as consultas são feitas por busca binária.
+    """
+
+    __slots__ = ("tempos", "posicoes")
+
+    def __init__(self, tempos=None, posicoes=None):
+        self.tempos = tempos if tempos is not None else array.array("d")
+        self.posicoes = posicoes if posicoes is not None else array.array("d")
+
+    def __len__(self):
+        return len(self.tempos)
+
+    def get_anterior(self, tempo):
+        """
+        Retorna o índice do último keyframe até o tempo informado, ou -1 se não houver
+        """
+
+        return bisect.bisect_right(self.tempos, tempo) - 1
+
+    def get_proximo(self, tempo):
+        """
+        Retorna o índice do primeiro keyframe a partir do tempo informado, ou a quantidade de keyframes se não houver
+        """
+
+        return bisect.bisect_left(self.tempos, tempo)
+
+    def get_keyframe_anterior(self, tempo):
+        """
+        Retorna o tempo do último keyframe até o tempo informado, ou None se não houver
+        """
+
+        pos = self.get_anterior(tempo)
+        return self.tempos[pos] if pos >= 0 else None
+
+    def get_keyframe_proximo(self, tempo):
+        """
+        Retorna o tempo do primeiro keyframe a partir do tempo informado, ou None se não houver
+        """
+
+        pos = self.get_proximo(tempo)
+        return self.tempos[pos] if pos < len(self.tempos) else None
+
+    def get_posicao(self, tempo):
+        """
+        Retorna a posição (em bytes) do último keyframe até o tempo informado, ou None se não houver ou se for desconhecida
+        """
+
+        pos = self.get_anterior(tempo)
+        if pos < 0 or self.posicoes[pos] < 0:
+            return None
+        return int(self.posicoes[pos])
+
+    def to_bytes(self):
+        # Cabeçalho com a versão e a quantidade de keyframes, seguido dos tempos e das posições
+        cabecalho = array.array("d", [KeyframeIndexCache.VERSAO_CACHE, len(self.tempos)])
+        return b"".join(valores.tobytes() if hasattr(valores, "tobytes") else valores.tostring() for valores in (cabecalho, self.tempos, self.posicoes))
+
+    @classmethod
+    def from_file(cls, arquivo):
+        """
+        Lê o índice gravado por to_bytes, retornando None se o arquivo for de outra versão ou estiver incompleto
+        """
+
+        cabecalho = array.array("d")
+        cabecalho.fromfile(arquivo, 2)
+        if cabecalho[0] != KeyframeIndexCache.VERSAO_CACHE:
+            return None
+
+        indice = cls()
+        indice.tempos.fromfile(arquivo, int(cabecalho[1]))
+        indice.posicoes.fromfile(arquivo, int(cabecalho[1]))
+        return indice
+
+
+class KeyframeIndexCache(object):
+    """
+    Cache dos índices de keyframes, com um arquivo por vídeo identificado pela fingerprint do arquivo (caminho, tamanho e
+    data de modificação), limitado pelo tamanho total em disco, e os índices utilizados recentemente mantidos em memória
+    """
+
+    VERSAO_CACHE = 1
+
+    def __init__(self, diretorio, tamanhoMaximo, tamanhoMemoria):
+        self.arquivos = FileCache(diretorio, ".kfi", tamanhoMaximo)
+        self.tamanhoMemoria = tamanhoMemoria
+        self.indices = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, arquivo):
+        """
+        Retorna o índice dos keyframes do arquivo, lido do cache ou gerado pelo ffprobe. Um índice vazio é retornado se o
+        arquivo não puder ser analisado.
+        """
+
+        try:
+            fingerprint = get_fingerprint(arquivo)
+        except OSError as e:
+            debug("Falha ao acessar o arquivo " + arquivo + " : " + str(e))
+            return KeyframeIndex()
+
+        with self.lock:
+            indice = self.indices.pop(fingerprint, None)
+            if indice is not None:
+                self.indices[fingerprint] = indice
+                return indice
+
+        caminho = self.arquivos.get(fingerprint)
+        indice = self.carregar(caminho) if caminho is not None else None
+        if indice is None:
+            indice = ler_indice_keyframes(arquivo)
+            if indice is None:
+                return KeyframeIndex()
+            if self.salvar(self.arquivos.get_caminho(fingerprint), indice):
+                self.arquivos.registrar(fingerprint)
+
+        with self.lock:
+            self.indices[fingerprint] = indice
+            while len(self.indices) > self.tamanhoMemoria:
+                self.indices.popitem(last=False)
+        return indice
+
+    def carregar(self, caminho):
+        try:
+            with open(caminho, "rb") as arquivo:
+                return KeyframeIndex.from_file(arquivo)
+        except (IOError, OSError, EOFError, ValueError) as e:
+            debug("Falha ao carregar o índice de keyframes " + caminho + ", o índice será recriado: " + str(e))
+            return None
+
+    def salvar(self, caminho, indice):
+        try:
+            if not os.path.isdir(self.arquivos.diretorio):
+                os.makedirs(self.arquivos.diretorio)
+            salvar_arquivo_atomico(caminho, indice.to_bytes())
+            return True
+        except (IOError, OSError) as e:
+            debug("Falha ao gravar o índice de keyframes " + caminho + " : " + str(e))
+            return False
+
+
+class FileCache(object):
+    """
+    Cache em disco com um arquivo por entrada (ex: miniaturas, índices de keyframes), identificado por uma chave como a
+    fingerprint do vídeo. Quando o tamanho total ultrapassa o limite, os arquivos utilizados há mais tempo são removidos;
+    a data de modificação de cada arquivo é atualizada a cada uso, preservando a ordem de uso entre as execuções.
+    Os arquivos fixados (ex: utilizados por jobs na fila) não são removidos.
+    """
+
+    def __init__(self, diretorio, extensao, tamanhoMaximo):
+        self.diretorio = diretorio
+        self.extensao = extensao
+        self.tamanhoMaximo = tamanhoMaximo
+        self.entradas = None
+        self.tamanhoTotal = 0
+        self.fixados = {}
+        self.lock = Lock()
+
+    def get_entradas(self):
+        # O diretório é lido apenas no primeiro acesso, com os arquivos ordenados do utilizado há mais tempo para o mais recente
+        if self.entradas is None:
+            self.entradas = OrderedDict()
+            self.tamanhoTotal = 0
+            if os.path.isdir(self.diretorio):
+                arquivos = []
+                for nome in os.listdir(self.diretorio):
+                    if nome.endswith(self.extensao) and not nome.startswith("."):
+                        try:
+                            stat = os.stat(os.path.join(self.diretorio, nome))
+                        except OSError:
+                            continue
+                        arquivos.append((stat.st_mtime, nome, stat.st_size))
+
+                for mtime, nome, tamanho in sorted(arquivos):  # @UnusedVariable
+                    self.entradas[nome] = tamanho
+                    self.tamanhoTotal += tamanho
+        return self.entradas
+
+    def get_caminho(self, chave):
+        return os.path.join(self.diretorio, chave + self.extensao)
+
+    def get(self, chave):
+        """
+        Retorna o caminho do arquivo, ou None se ele não estiver no cache
+        """
+
+        nome = chave + self.extensao
+        with self.lock:
+            tamanho = self.get_entradas().pop(nome, None)
+            if tamanho is None:
+                return None
+            self.entradas[nome] = tamanho
+
+        caminho = self.get_caminho(chave)
+        try:
+            os.utime(caminho, None)
+        except OSError:
+            # O arquivo foi removido do diretório
+            with self.lock:
+                if self.entradas.pop(nome, None) is not None:
+                    self.tamanhoTotal -= tamanho
+            return None
+        return caminho
+
+    def registrar(self, chave):
+        """
+        Registra o arquivo gravado em get_caminho, removendo os arquivos mais antigos se o limite for ultrapassado
+        """
+
+        nome = chave + self.extensao
+        tamanho = os.stat(self.get_caminho(chave)).st_size
+        removidos = []
+        with self.lock:
+            anterior = self.get_entradas().pop(nome, None)
+            if anterior is not None:
+                self.tamanhoTotal -= anterior
+            self.entradas[nome] = tamanho
+            self.tamanhoTotal += tamanho
+
+            for antigo in list(self.entradas):
+                if self.tamanhoTotal <= self.tamanhoMaximo:
+                    break
+                if antigo == nome or antigo in self.fixados:
+                    continue
+                self.tamanhoTotal -= self.entradas.pop(antigo)
+                removidos.append(antigo)
+
+        for antigo in removidos:
+            try:
+                os.remove(os.path.join(self.diretorio, antigo))
+            except OSError as e:
+                debug("Falha ao remover o arquivo do cache " + antigo + " : " + str(e))
+
+    def fixar(self, chave):
+        """
+        Impede a remoção do arquivo até que seja liberado, contando as fixações de cada arquivo
+        """
+
+        nome = chave + self.extensao
+        with self.lock:
+            self.fixados[nome] = self.fixados.get(nome, 0) + 1
+
+    def liberar(self, chave):
+        nome = chave + self.extensao
+        with self.lock:
+            if self.fixados.get(nome, 0) > 1:
+                self.fixados[nome] -= 1
+            else:
+                self.fixados.pop(nome, None)
+
+
+class ThumbnailGenerator(object):
+    """
+    Gera as miniaturas dos vídeos em background, com um pool de threads. Cada solicitação substitui a fila pelos vídeos
+    informados (ex: os vídeos visíveis na tela), descartando os vídeos que deixaram de ser exibidos. A função notificar
+    recebe o arquivo e o caminho da miniatura (ou None em caso de falha), e é executada nas threads do pool.
+    """
+
+    def __init__(self, cache, qtdThreads, tamanhoFila, notificar):
+        self.cache = cache
+        self.qtdThreads = qtdThreads
+        self.tamanhoFila = tamanhoFila
+        self.notificar = notificar
+        self.fila = deque()
+        self.duracoes = {}
+        self.executando = set()
+        self.condicao = Condition()
+        self.threads = []
+
+    def solicitar(self, itens):
+        """
+        Substitui a fila pelos arquivos informados, como tuplas de arquivo e duração, gerados na ordem informada
+        """
+
+        with self.condicao:
+            self.fila.clear()
+            self.duracoes.clear()
+            for arquivo, duracao in itens[:self.tamanhoFila]:
+                if arquivo not in self.executando and arquivo not in self.duracoes:
+                    self.fila.append(arquivo)
+                    self.duracoes[arquivo] = duracao
+
+            if not self.threads:
+                # O diretório é criado uma única vez, antes das threads, evitando a concorrência na criação
+                try:
+                    if not os.path.isdir(self.cache.diretorio):
+                        os.makedirs(self.cache.diretorio)
+                except OSError as e:
+                    debug("Falha ao criar o diretório de miniaturas " + self.cache.diretorio + " : " + str(e))
+                for _ in range(self.qtdThreads):
+                    thread = Thread(target=self.executar)
+                    thread.daemon = True
+                    thread.start()
+                    self.threads.append(thread)
+
+            self.condicao.notify_all()
+
+    def limpar(self):
+        with self.condicao:
+            self.fila.clear()
+            self.duracoes.clear()
+
+    def executar(self):
+        while True:
+            with self.condicao:
+                while not self.fila:
+                    self.condicao.wait()
+                arquivo = self.fila.popleft()
+                duracao = self.duracoes.pop(arquivo)
+                self.executando.add(arquivo)
+
+            try:
+                caminho = self.gerar(arquivo, duracao)
+            except Exception as e:
+                debug("Falha ao gerar a miniatura do arquivo " + arquivo + " : " + str(e))
+                caminho = None
+            self.notificar(arquivo, caminho)
+
+            with self.condicao:
+                self.executando.discard(arquivo)
+
+    def gerar(self, arquivo, duracao):
+        try:
+            fingerprint = get_fingerprint(arquivo)
+        except OSError:
+            return None
+
+        caminho = self.cache.get(fingerprint)
+        if caminho is not None:
+            return caminho
+
+        caminho = self.cache.get_caminho(fingerprint)
+        if not gerar_miniatura(arquivo, duracao, caminho):
+            return None
+
+        self.cache.registrar(fingerprint)
+        return caminho
+
+
+def seconds_to_time(secs):
+    """
+    Converte segundos para o formato HH:MM:SS
+    """
+
+    return time.strftime('%H:%M:%S', time.gmtime(secs))
+
+
+def time_to_seconds(time):
+    """
+    Converte do formato HH:MM:SS para segundos
+    """
+
+    ftr = [3600, 60, 1]
+    try:
+        return sum([a * b for a, b in zip(ftr, map(int, time.split(':')))])
+    except ValueError:
+        return 0
+
+
+def ffmpeg_time_to_seconds(valor):
+    """
+    Converte um tempo do ffmpeg no formato HH:MM:SS.ss para segundos, retornando None se não for possível
+    """
+
+    partes = valor.strip().split(":")
+    if len(partes) != 3:
+        return None
+
+    try:
+        return int(partes[0]) * 3600 + int(partes[1]) * 60 + float(partes[2])
+    except ValueError:
+        return None
+
+
+def get_caminho_ffmpeg():
+    """
+    Retorna o caminho onde of FFMPEG está configurado
+    """
+
+    app = get_app_settings("caminho_ffmpeg")
+    return app if app is not None else "ffmpeg"
+
+
+def get_caminho_ffprobe():
+    """
+    Retorna o caminho do ffprobe, por padrão localizado no mesmo diretório do ffmpeg
+    """
+
+    app = get_app_settings("caminho_ffprobe")
+    if app is not None:
+        return app
+
+    ffmpeg = get_caminho_ffmpeg()
+    nome = os.path.basename(ffmpeg).replace("ffmpeg", "ffprobe")
+    return os.path.join(os.path.dirname(ffmpeg), nome) if os.path.dirname(ffmpeg) else nome
+
+
+def get_video_info(arquivo):
+    """
+    Analisa o arquivo de vídeo com o ffprobe, retornando as informações do vídeo ou None em caso de falha
+    """
+
+    args = [get_caminho_ffprobe(), "-v", "error", "-print_format", "json", "-show_format", "-show_streams", arquivo]
+
+    # O processo é local, pois várias análises são executadas em paralelo
+    processo = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    saida, erro = processo.communicate()
+
+    if processo.returncode != 0:
+        debug("Falha ao analisar o arquivo " + arquivo + " : " + erro.strip())
+        return None
+
+    try:
+        return VideoInfo.from_ffprobe(json.loads(saida))
+    except ValueError as e:
+        debug("Falha ao interpretar as informações do arquivo " + arquivo + " : " + str(e))
+        return None
+
+
+def to_int(valor, padrao=None):
+    """
+    Converte um valor do ffprobe para inteiro, retornando o valor padrão se não for possível
+    """
+
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return padrao
+
+
+def to_float(valor, padrao=None):
+    """
+    Converte um valor do ffprobe para float, retornando o valor padrão se não for possível
+    """
+
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return padrao
+
+
+def fraction_to_float(valor):
+    """
+    Converte uma fração do ffprobe (ex: 30000/1001) para float
+    """
+
+    if not valor or "/" not in valor:
+        return to_float(valor)
+
+    numerador, denominador = valor.split("/", 1)
+    if to_float(denominador, 0) == 0:
+        return None
+    return to_float(numerador, 0.0) / to_float(denominador)
+
+
+
+def indent_xml(elem, level=0):
+    """
+    Formata um arquivo XML
+    """
+
+    i = "\n" + level * "\t"
+    if len(elem):
+        if not elem.text or not elem.text.strip():
+            elem.text = i + "\t"
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+        for elem in elem:
+            indent_xml(elem, level + 1)
+        if not elem.tail or not elem.tail.strip():
+            elem.tail = i
+    else:
+        if level and (not elem.tail or not elem.tail.strip()):
+            elem.tail = i
+
+
+def set_app_settings(xmlTag, value):
+    """
+    Salva uma configuração da aplicação
+    """
+
+    debug("Salvando configuração da aplicação: " + xmlTag + " = " + str(value))
+    gSettings.set(xmlTag, value)
+
+
+def get_app_settings(xmlTag):
+    """
+    Recupera uma configuração da aplicação
+    """
+
+    return gSettings.get(xmlTag)
+
+
+def get_configuracoes_padrao():
+    """
+    Retorna as configurações padrão da aplicação, utilizadas quando o arquivo de configurações não existe
+    """
+
+    return [("dir_origem", os.path.expanduser('~')),
+            ("extensoes_video", "wmv|avi|mpg|3gp|mov|m4v|mts|mp4|webm"),
+            ("caminho_ffmpeg", "ffmpeg")]
+
+
+def inicializar_configuracoes():
+    """
+    Carrega as configurações da aplicação, criando o arquivo com as configurações padrão se não existir.
+    Chamada na inicialização da interface gráfica e da linha de comando; a importação do módulo não grava arquivos.
+    """
+
+    gSettings.carregar()
+    if not os.path.isfile(ARQUIVO_XML_SETTINGS):
+        try:
+            gSettings.flush()
+        except (IOError, OSError) as e:
+            debug("Falha ao criar o arquivo de configurações " + ARQUIVO_XML_SETTINGS + " : " + str(e))
+
+
+def indent_and_save_xml(rootNode, arquivoXml):
+    """
+    Formata e salva um arquivo XML
+    """
+
+    debug("Salvando o arquivo XML: " + arquivoXml)
+    indent_xml(rootNode)
+    prettyXml = ET.tostring(rootNode, encoding="UTF-8", method="xml", xml_declaration=True)
+    salvar_arquivo_atomico(arquivoXml, prettyXml)
+
+
+def debug(msg=''):
+    """
+    Loga uma mensagem
+    """
+
+    try:
+        linha = str(msg).strip()
+    except (UnicodeEncodeError):
+        linha = msg.encode("utf-8").strip()
+
+    gLogger.debug(linha)
+
+
+def to_human_size(nbytes):
+    """
+    Converte uma quantidade de bytes em formato de fácil visualização
+    """
+
+    human = nbytes
+    rank = 0
+    if nbytes != 0:
+        rank = int((math.log10(nbytes)) / 3)
+        rank = min(rank, len(UNIDADES) - 1)
+        human = nbytes / (1024.0 ** rank)
+    f = ('%.2f' % human).rstrip('0').rstrip('.')
+    return '%s %s' % (f, UNIDADES[rank])
+
+
+def get_codec_info(codec, info=None):
+    # Recupera os parâmtros do ffmpeg para conversão, separados entre os parâmetros do vídeo e do áudio.
+    # Se as informações do arquivo forem informadas, os parâmetros são ajustados para o arquivo.
+    resp = None
+    if VIDEO_H265 == codec:
+        resp = {"video":["-c:v", "libx265"], "audio":["-acodec", "aac", "-strict", "-2"], "sufixo":"_H265.mp4"}
+    elif VIDEO_H264 == codec:
+        resp = {"video":["-c:v", "libx264"], "audio":["-acodec", "aac", "-strict", "-2"], "sufixo":"_H264.mp4"}
+    elif VIDEO_VP8 == codec:
+        resp = {"video":["-c:v", "libvpx", "-b:v", "1M"], "audio":["-c:a", "libvorbis"], "sufixo":"_VP8.webm"}
+    elif VIDEO_VP9 == codec:
+        resp = {"video":["-c:v", "libvpx-vp9", "-b:v", "2M"], "audio":["-c:a", "libopus"], "sufixo":"_VP9.webm"}
+    elif AUDIO_MP3 == codec:
+        resp = {"video":["-vn"], "audio":["-f", "mp3", "-ab", "192000"], "sufixo":"_MP3.mp3"}
+    elif AUDIO_FLAC == codec:
+        resp = {"video":["-vn"], "audio":["-acodec", "flac"], "sufixo":"_FLAC.flac"}
+    elif AUDIO_AAC == codec:
+        resp = {"video":["-vn"], "audio":["-acodec", "aac", "-strict", "-2"], "sufixo":"AAC.m4a"}
+    elif AUDIO_OGG == codec:
+        resp = {"video":["-vn"], "audio":["-acodec", "libvorbis"], "sufixo":"_Vorbis.ogg"}
+    elif IMAGEM_MINIATURA == codec:
+        resp = {"video":["-vf", "thumbnail", "-frames:v", "1"], "audio":["-an"], "sufixo":"_thumb.jpg"}
+
+    # A extração de áudio copia o primeiro stream de áudio sem recodificação quando ele já está no codec de destino
+    if resp is not None and info is not None and info.audio_codec is not None and info.audio_codec == CODECS_AUDIO_ORIGEM.get(codec):
+        resp["audio"] = ["-map", "0:a:0", "-c:a", "copy"]
+
+    if resp is not None:
+        resp["params"] = resp["video"] + resp["audio"]
+    return resp
+
+
+def get_codecs_video():
+    """
+    Retorna os codecs de vídeo cujos encoders estão disponíveis no ffmpeg configurado
+    """
+
+    return [codec for codec in (VIDEO_H264, VIDEO_H265, VIDEO_VP8, VIDEO_VP9) if is_encoder_disponivel(ENCODERS_CODECS[codec])]
+
+
+def get_codecs_audio():
+    """
+    Retorna os codecs de áudio cujos encoders estão disponíveis no ffmpeg configurado
+    """
+
+    return [codec for codec in (AUDIO_AAC, AUDIO_FLAC, AUDIO_MP3, AUDIO_OGG) if is_encoder_disponivel(ENCODERS_CODECS[codec])]
+
+
+def get_ffmpeg_features():
+    """
+    Retorna as opções de compilação (--enable-*) do ffmpeg configurado
+    """
+
+    return gCapacidadesFfmpeg.get()["features"]
+
+
+def get_identificacao_executavel(executavel):
+    """
+    Identificação de um executável (ex: ffmpeg, ffprobe): caminho, data de modificação e tamanho
+    """
+
+    caminho = spawn.find_executable(executavel)
+    if caminho is None:
+        return None
+
+    caminho = os.path.realpath(caminho)
+    stat = os.stat(caminho)
+    return [caminho, stat.st_mtime, stat.st_size]
+
+
+def get_ffmpeg_version():
+    """
+    Retorna a versão do ffmpeg configurado
+    """
+
+    return gCapacidadesFfmpeg.get()["ffmpeg"]
+
+
+def is_encoder_disponivel(encoder):
+    return encoder in gCapacidadesFfmpeg.get()["encoders"]
+
+
+def is_filtro_disponivel(filtro):
+    return filtro in gCapacidadesFfmpeg.get()["filtros"]
+
+
+def is_opcao_disponivel(opcao):
+    return opcao in gCapacidadesFfmpeg.get()["opcoes"]
+
+
+def executar_ffmpeg_info(args):
+    """
+    Executa o ffmpeg com os parâmetros informados, retornando a saída ou vazio em caso de falha
+    """
+
+    try:
+        processo = subprocess.Popen([get_caminho_ffmpeg()] + args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    except OSError as e:
+        debug("Falha ao executar o ffmpeg: " + str(e))
+        return ""
+
+    saida, _ = processo.communicate()
+    return saida
+
+
+def listar_recursos_ffmpeg(opcao):
+    """
+    Retorna os nomes dos encoders (-encoders) ou filtros (-filters) compilados no ffmpeg, incluindo os nativos, ou
+    os parâmetros aceitos pelo ffmpeg (-h)
+    """
+
+    if opcao == "-h":
+        return re.findall("^(-[A-Za-z0-9_]+)", executar_ffmpeg_info(["-hide_banner", "-h", "long"]), re.MULTILINE)
+
+    nomes = []
+    for line in executar_ffmpeg_info(["-hide_banner", opcao]).splitlines():
+        partes = line.split()
+        if len(partes) < 3 or partes[1] == "=":
+            continue
+
+        if opcao == "-encoders" and re.match("^[VAS][.A-Z]{5}$", partes[0]):
+            nomes.append(partes[1])
+        elif opcao == "-filters" and re.match("^[.A-Z]{3}$", partes[0]) and "->" in partes[2]:
+            nomes.append(partes[1])
+
+    return nomes
+
+
+def is_ffmpeg_disponivel(caminho):
+    """
+    Verifica se o executável do ffmpeg pode ser encontrado
+    """
+
+    return spawn.find_executable(caminho) is not None
+
+
+def get_qtd_jobs_paralelos():
+    """
+    Retorna a quantidade de jobs do ffmpeg que recodificam vídeos executados em paralelo
+    """
+
+    try:
+        return max(1, int(get_app_settings("jobs_paralelos")))
+    except (TypeError, ValueError):
+        return max(1, multiprocessing.cpu_count() // THREADS_POR_JOB_PADRAO)
+
+
+def get_qtd_jobs_io():
+    """
+    Retorna a quantidade de jobs do ffmpeg limitados pelo disco (cópia de streams e áudio) executados em paralelo
+    """
+
+    try:
+        return max(1, int(get_app_settings("jobs_paralelos_io")))
+    except (TypeError, ValueError):
+        return JOBS_IO_PADRAO
+
+
+def classificar_lane(args):
+    """
+    Classifica os parâmetros do ffmpeg: jobs sem vídeo ou que apenas copiam o vídeo são limitados pelo disco
+    """
+
+    if "-vn" in args:
+        return FfmpegJob.LANE_IO
+
+    for idx, arg in enumerate(args[:-1]):
+        if (arg in ("-c", "-c:v", "-codec", "-codec:v", "-vcodec") or arg.startswith("-c:v:")) and args[idx + 1] == "copy":
+            return FfmpegJob.LANE_IO
+
+    return FfmpegJob.LANE_CPU
+
+
+def get_duracoes(infos):
+    """
+    Retorna a duração (em segundos) de cada arquivo, ou zero se for desconhecida
+    """
+
+    return dict((arquivo, (info.duration or 0) if info is not None else 0) for arquivo, info in infos.items())
+
+
+def get_arquivo_destino(arquivo, sufixoArquivo):
+    """
+    Retorna o nome do arquivo de destino, no mesmo diretório do arquivo e com o sufixo especificado.
+    A variável ${EXTENSAO} do sufixo é substituída pela extensão do arquivo.
+    """
+
+    nome = os.path.basename(arquivo)
+    extensao = nome[nome.rfind(".") + 1:]
+
+    # Utilizar a extensão apenas se o sufixo não foi especificado
+    if sufixoArquivo is None:
+        sufixoArquivo = extensao
+
+    novoArquivo = os.path.dirname(arquivo) + os.sep + nome[:nome.rfind(".")] + sufixoArquivo
+    return novoArquivo.replace("${EXTENSAO}", extensao)
+
+
+def criar_jobs(params, arquivos, sufixoArquivo, arquivoDestino, duracoes):
+    """
+    Cria um job do ffmpeg para cada arquivo, substituindo as variáveis ${ORIGEM}, ${DESTINO} e ${EXTENSAO} dos parâmetros.
+    Se o arquivo de destino for especificado, é criado um único job com todos os arquivos (ex: concatenação).
+    """
+
+    if arquivoDestino is not None:
+        arquivos = [arquivoDestino]
+
+    jobs = []
+    for arquivo in arquivos:
+        # Extrai a extensão do video
+        nome = os.path.basename(arquivo)
+        extensao = nome[nome.rfind(".") + 1:]
+
+        # Cria o nome do arquivo de destino
+        novoArquivo = get_arquivo_destino(arquivo, sufixoArquivo)
+        if arquivoDestino is not None:
+            novoArquivo = arquivoDestino
+
+        # Substitui as variáveis nos parâmetros
+        args = [param.replace("${ORIGEM}", arquivo).replace("${DESTINO}", novoArquivo).replace("${EXTENSAO}", extensao) for param in params]
+
+        if arquivoDestino is not None:
+            jobs.append(FfmpegJob(args, None, novoArquivo, sum(duracoes.values())))
+        else:
+            jobs.append(FfmpegJob(args, arquivo, novoArquivo, duracoes.get(arquivo)))
+
+    return jobs
+
+
+def criar_jobs_conversao(nomesCodecs, arquivos, infos, modo=None):
+    """
+    Cria os jobs para converter os arquivos para os formatos informados, com os parâmetros ajustados às informações de
+    cada arquivo. Vários formatos são gerados por um único processo do ffmpeg para cada vídeo, e no modo de segmentos os
+    vídeos são divididos em segmentos convertidos em paralelo.
+    """
+
+    duracoes = get_duracoes(infos)
+    if len(nomesCodecs) > 1:
+        return criar_jobs_multiplas_saidas(nomesCodecs, arquivos, infos)
+
+    jobs = []
+    for arquivo in arquivos:
+        codec = get_codec_info(nomesCodecs[0], infos.get(arquivo))
+        params = ["-i", "${ORIGEM}"]
+        params.extend(codec["params"])
+        params.append("${DESTINO}")
+
+        jobsArquivo = None
+        if modo == MODO_CONVERSAO_SEGMENTOS:
+            jobsArquivo = criar_jobs_segmentados(arquivo, duracoes.get(arquivo, 0), codec, codec["sufixo"], max(2, get_qtd_jobs_paralelos()))
+        if jobsArquivo is None:
+            jobsArquivo = criar_jobs(params, [arquivo], codec["sufixo"], None, duracoes)
+        jobs.extend(jobsArquivo)
+    return jobs
+
+
+def get_streams_remux(info, formato):
+    """
+    Retorna os streams do vídeo que serão gravados no container (ver CONTAINERS_REMUX), como tuplas com o tipo do
+    stream ("v", "a" ou "s"), o índice do stream no arquivo de origem, o codec e os parâmetros do encoder. Os streams
+    compatíveis com o container são copiados ("copy"), os incompatíveis são recodificados e as legendas em imagem que
+    não podem ser gravadas no container são descartadas (encoder None). Retorna None se os streams forem desconhecidos.
+    """
+
+    if info is None:
+        return None
+
+    container = CONTAINERS_REMUX[formato]
+    codecs = [("v", [info.video_codec] if info.video_codec else []), ("a", info.audio_codecs or []), ("s", info.subtitle_codecs or [])]
+
+    streams = []
+    for tipo, codecsTipo in codecs:
+        compativeis = container["codecs"][tipo]
+        for indice, codec in enumerate(codecsTipo):
+            if compativeis is None or codec in compativeis:
+                encoder = ["copy"]
+            elif tipo == "s" and codec not in CODECS_LEGENDA_TEXTO:
+                encoder = None
+            else:
+                encoder = container["encoders"][tipo]
+            streams.append((tipo, indice, codec, encoder))
+    return streams
+
+
+def get_descricao_remux(info, formato):
+    """
+    Texto com o tratamento de cada stream do vídeo na troca do container
+    """
+
+    streams = get_streams_remux(info, formato)
+    if streams is None:
+        return "Streams desconhecidos, todos serão copiados"
+
+    partes = []
+    for tipo, indice, codec, encoder in streams:  # @UnusedVariable
+        descricao = TIPOS_STREAM_REMUX[tipo] + " " + str(codec)
+        if encoder is None:
+            descricao += ": descartado"
+        elif encoder[0] == "copy":
+            descricao += ": cópia"
+        else:
+            descricao += " -> " + encoder[0]
+        partes.append(descricao)
+    return ", ".join(partes)
+
+
+def criar_jobs_remux(arquivos, infos, formato):
+    """
+    Cria os jobs para trocar o container dos vídeos (ver CONTAINERS_REMUX) copiando os streams, e recodificando apenas
+    os streams que não são suportados pelo container (ex: áudio PCM em MP4)
+    """
+
+    container = CONTAINERS_REMUX[formato]
+    duracoes = get_duracoes(infos)
+    jobs = []
+    for arquivo in arquivos:
+        params = ["-i", "${ORIGEM}"]
+        streams = get_streams_remux(infos.get(arquivo), formato)
+
+        if streams is None:
+            # Sem as informações do ffprobe, os streams são copiados e uma incompatibilidade é reportada pelo ffmpeg
+            params.extend(["-map", "0:v:0?", "-map", "0:a?", "-c", "copy"])
+        else:
+            # Os índices dos streams no arquivo de destino desconsideram os streams descartados
+            destinos = {"v": 0, "a": 0, "s": 0}
+            for tipo, indice, codec, encoder in streams:
+                if encoder is None:
+                    debug("Legenda " + str(codec) + " não suportada pelo container, será descartada: " + arquivo)
+                    continue
+
+                params.extend(["-map", "0:" + tipo + ":" + str(indice), "-c:" + tipo + ":" + str(destinos[tipo])])
+                params.extend(encoder)
+                if tipo == "v" and encoder[0] == "copy":
+                    params.extend(container["copia_video"].get(codec, []))
+                destinos[tipo] += 1
+
+        params.extend(container["params"])
+        params.append("${DESTINO}")
+        jobs.extend(criar_jobs(params, [arquivo], container["sufixo"], None, duracoes))
+    return jobs
+
+
+def criar_jobs_redimensionamento(arquivos, largura, altura, duracoes):
+    """
+    Cria os jobs para alterar a resolução dos vídeos
+    """
+
+    params = ["-i", "${ORIGEM}", "-vf", "scale=w=" + str(largura) + ":h=" + str(altura), "-q:a", "0", "-q:v", "0", "-strict", "-2", "${DESTINO}"]
+    return criar_jobs(params, arquivos, "_resized.${EXTENSAO}", None, duracoes)
+
+
+def get_modo_rotacao(arquivo, rotacao, metadados=True):
+    """
+    Retorna o modo utilizado para aplicar a rotação (ver ROTACOES) ao arquivo. As rotações de 90 e 180 graus de
+    arquivos MP4, MOV e MKV podem ser aplicadas apenas alterando os metadados de rotação, sem recodificar o vídeo.
+    """
+
+    extensao = os.path.splitext(arquivo)[1].lower()
+    if metadados and rotacao[3] is not None:
+        if is_opcao_disponivel("-display_rotation") and extensao in EXTENSOES_ROTACAO_METADADOS:
+            return MODO_ROTACAO_METADADOS
+
+        # Versões antigas do ffmpeg gravam a rotação apenas nos arquivos MP4 e MOV
+        if extensao in EXTENSOES_ROTACAO_METADADO_ROTATE:
+            return MODO_ROTACAO_METADADOS
+
+    return MODO_ROTACAO_RECODIFICAR
+
+
+def get_rotacao_stream(stream):
+    """
+    Retorna a rotação (em graus, no sentido anti-horário) com que o stream de vídeo é exibido, ou None se não houver
+    """
+
+    for dados in stream.get("side_data_list", []):
+        if dados.get("rotation") is not None:
+            return to_int(dados.get("rotation"))
+
+    rotate = to_int(stream.get("tags", {}).get("rotate"))
+    return -rotate if rotate is not None else None
+
+
+def criar_jobs_rotacao(arquivos, rotacao, infos, metadados=True):
+    """
+    Cria os jobs para aplicar a rotação (ver ROTACOES) aos vídeos. Quando possível, e se os metadados forem permitidos,
+    apenas a rotação de exibição do vídeo é alterada, copiando os streams; caso contrário o vídeo é recodificado.
+    """
+
+    duracoes = get_duracoes(infos)
+    jobs = []
+    for arquivo in arquivos:
+        if get_modo_rotacao(arquivo, rotacao, metadados) == MODO_ROTACAO_METADADOS:
+            # A nova rotação é somada à rotação de exibição atual do vídeo (ex: vídeos de celulares)
+            info = infos.get(arquivo)
+            angulo = (((info.rotation or 0) if info is not None else 0) + rotacao[3] + 180) % 360 - 180
+
+            if is_opcao_disponivel("-display_rotation"):
+                params = ["-display_rotation:v:0", str(angulo), "-i", "${ORIGEM}", "-c", "copy", "${DESTINO}"]
+            else:
+                params = ["-i", "${ORIGEM}", "-c", "copy", "-metadata:s:v:0", "rotate=" + str(-angulo % 360), "${DESTINO}"]
+        else:
+            params = ["-i", "${ORIGEM}", "-vf", rotacao[1], "-q:a", "0", "-q:v", "0", "-strict", "-2", "${DESTINO}"]
+
+        jobs.extend(criar_jobs(params, [arquivo], "_rotated.${EXTENSAO}", None, duracoes))
+    return jobs
+
+
+def criar_jobs_extracao(arquivo, info, inicio, fim, modo):
+    """
+    Cria os jobs para extrair o intervalo (em segundos) do vídeo. O corte inteligente recodifica apenas o início e o
+    fim do intervalo; se não for possível utilizá-lo, o intervalo é recodificado.
+    """
+
+    if modo == MODO_EXTRACAO_INTELIGENTE:
+        jobs = criar_jobs_corte_inteligente(arquivo, info, inicio, fim, get_arquivo_destino(arquivo, "_section.${EXTENSAO}"))
+        if jobs is not None:
+            return jobs
+
+        debug("Não foi possível utilizar o corte inteligente, o intervalo será recodificado")
+        modo = MODO_EXTRACAO_PRECISO
+
+    # O -ss antes do -i posiciona a leitura no arquivo, evitando decodificar todo o trecho anterior
+    ini = seconds_to_time(inicio)
+    temp = seconds_to_time(fim - inicio)
+    if modo == MODO_EXTRACAO_RAPIDO:
+        params = ["-ss", ini, "-i", "${ORIGEM}", "-t", temp, "-c", "copy", "-avoid_negative_ts", "make_zero", "${DESTINO}"]
+    else:
+        params = ["-ss", ini, "-i", "${ORIGEM}", "-t", temp, "-strict", "-2", "${DESTINO}"]
+
+    return criar_jobs(params, [arquivo], "_section.${EXTENSAO}", None, {arquivo: fim - inicio})
+
+
+def criar_jobs_extracao_intervalos(arquivos, infos, intervalos, modo):
+    """
+    Cria os jobs para extrair vários intervalos (tuplas de início e fim, em segundos) de cada vídeo. Todos os intervalos
+    de um arquivo são gerados por uma única execução do ffmpeg, com uma saída para cada intervalo, lendo a origem uma
+    única vez; no modo rápido o início de cada intervalo é alinhado ao keyframe anterior para copiar os streams. No corte
+    inteligente, cada intervalo é extraído separadamente, e os intervalos que não o suportam são recodificados.
+    """
+
+    jobs = []
+    for arquivo in arquivos:
+        info = infos.get(arquivo)
+        pendentes = []
+        for idx, (inicio, fim) in enumerate(intervalos):
+            # Os vídeos mais curtos que o intervalo são ignorados
+            if info is not None and info.duration and inicio >= info.duration:
+                debug("Intervalo " + seconds_to_time(inicio) + "-" + seconds_to_time(fim) + " posterior ao fim do vídeo: " + arquivo)
+                continue
+            pendentes.append((get_arquivo_destino(arquivo, "_section_%02d.${EXTENSAO}" % (idx + 1)), inicio, fim))
+
+        # Um único intervalo é extraído com os mesmos nomes e jobs da extração simples
+        if len(intervalos) == 1:
+            if pendentes:
+                jobs.extend(criar_jobs_extracao(arquivo, info, intervalos[0][0], intervalos[0][1], modo))
+            continue
+
+        modoSaidas = modo
+        if modo == MODO_EXTRACAO_INTELIGENTE:
+            modoSaidas = MODO_EXTRACAO_PRECISO
+            recodificar = []
+            for destino, inicio, fim in pendentes:
+                jobsIntervalo = criar_jobs_corte_inteligente(arquivo, info, inicio, fim, destino)
+                if jobsIntervalo is None:
+                    recodificar.append((destino, inicio, fim))
+                else:
+                    jobs.extend(jobsIntervalo)
+            pendentes = recodificar
+
+        if not pendentes:
+            continue
+
+        saidas = []
+        for destino, inicio, fim in pendentes:
+            if modoSaidas == MODO_EXTRACAO_RAPIDO:
+                params = ["-ss", "%.6f" % inicio, "-to", "%.6f" % fim, "-c", "copy", "-avoid_negative_ts", "make_zero"]
+            else:
+                params = ["-ss", "%.6f" % inicio, "-to", "%.6f" % fim, "-strict", "-2"]
+            saidas.append((destino, params))
+
+        job = FfmpegMultiJob(arquivo, saidas, max(fim for destino, inicio, fim in pendentes))
+        if modoSaidas == MODO_EXTRACAO_RAPIDO:
+            inicios = [inicio for destino, inicio, fim in pendentes]
+            job.preparar = lambda job=job, inicios=inicios: alinhar_inicios_keyframes(job, inicios)
+        jobs.append(job)
+    return jobs
+
+
+def alinhar_inicios_keyframes(job, inicios):
+    """
+    Posiciona o início (em segundos) de cada saída do job no keyframe anterior, já que a cópia do vídeo inicia no primeiro keyframe
+    após o -ss. É executada no início do job, pois a leitura do índice de keyframes pode ser demorada.
+    """
+
+    indice = gIndiceKeyframes.get(job.origem)
+    args = ["-i", job.origem]
+    for (destino, params), inicio in zip(job.parametrosSaidas, inicios):
+        keyframe = indice.get_keyframe_anterior(inicio)
+        params[params.index("-ss") + 1] = "%.6f" % (max(keyframe - 0.001, 0) if keyframe is not None else inicio)
+        args = args + params + [destino]
+    job.args = args
+
+
+def criar_jobs_concatenacao(arquivos, infos, destino, codec, modo):
+    """
+    Cria os jobs para concatenar os arquivos na ordem informada. No modo de cópia, os vídeos compatíveis não são
+    recodificados; se não for possível, todos os vídeos são recodificados com o codec informado utilizando a lista
+    ARQUIVO_VIDEOS_CONCATENA, que deve ser removida pelo chamador ao final do processamento.
+    """
+
+    if modo == MODO_CONCATENACAO_COPIA:
+        # Arquivos MPEG-TS contínuos (ex: um vídeo dividido pela câmera) são unidos pela cópia dos bytes
+        jobs = criar_jobs_concatenacao_mpegts(arquivos, infos, destino)
+        if jobs is None:
+            jobs = criar_jobs_concatenacao_copia(arquivos, infos, destino)
+        if jobs is not None:
+            return jobs
+
+        debug("Os vídeos não podem ser concatenados sem recodificação, todos os vídeos serão recodificados")
+
+    with open(ARQUIVO_VIDEOS_CONCATENA, "w") as lista:
+        for arquivo in arquivos:
+            lista.write(escape_concat(arquivo))
+
+    params = ["-f", "concat", "-safe", "0", "-i", ARQUIVO_VIDEOS_CONCATENA]
+    params.extend(codec["params"])
+    params.append("${DESTINO}")
+
+    jobs = criar_jobs(params, None, None, destino, get_duracoes(infos))
+    for job in jobs:
+        job.origens = list(arquivos)
+    return jobs
+
+
+def ler_indice_keyframes(arquivo):
+    """
+    Gera o índice dos keyframes do primeiro stream de vídeo, com os tempos (em segundos, a partir do início do arquivo)
+    e as posições em bytes. Apenas os pacotes são lidos pelo ffprobe, sem decodificar o vídeo. Retorna None em caso de falha.
+    """
+
+    args = [get_caminho_ffprobe(), "-v", "error", "-select_streams", "v:0", "-show_entries", "format=start_time:packet=pts_time,dts_time,pos,flags",
+            "-of", "compact", arquivo]
+    try:
+        processo = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    except OSError as e:
+        debug("Falha ao executar o ffprobe: " + str(e))
+        return None
+
+    saida, erro = processo.communicate()
+
+    if processo.returncode != 0:
+        debug("Falha ao listar os keyframes do arquivo " + arquivo + " : " + erro.strip())
+        return None
+
+    inicio = 0.0
+    keyframes = []
+    for line in saida.splitlines():
+        campos = line.split("|")
+        valores = dict(campo.split("=", 1) for campo in campos[1:] if "=" in campo)
+        if campos[0] == "packet" and valores.get("flags", "").startswith("K"):
+            tempo = to_float(valores.get("pts_time"))
+            if tempo is None:
+                tempo = to_float(valores.get("dts_time"))
+            if tempo is not None:
+                keyframes.append((tempo, to_int(valores.get("pos"), -1)))
+        elif campos[0] == "format":
+            inicio = to_float(valores.get("start_time"), 0.0)
+
+    keyframes.sort()
+    return KeyframeIndex(array.array("d", [tempo - inicio for tempo, posicao in keyframes]), array.array("d", [posicao for tempo, posicao in keyframes]))
+
+
+def calcular_cortes(indice, duracao, qtdSegmentos):
+    """
+    Seleciona os keyframes (ver KeyframeIndex) mais próximos da divisão do vídeo em segmentos de mesma duração
+    """
+
+    cortes = []
+    for i in range(1, qtdSegmentos):
+        alvo = duracao * i / qtdSegmentos
+        candidatos = [tempo for tempo in (indice.get_keyframe_anterior(alvo), indice.get_keyframe_proximo(alvo)) if tempo is not None]
+        if not candidatos:
+            continue
+
+        keyframe = min(candidatos, key=lambda tempo: abs(tempo - alvo))
+        if 0 < keyframe < duracao and (not cortes or keyframe > cortes[-1]):
+            cortes.append(keyframe)
+
+    return cortes
+
+
+def get_diretorio_temporario(destino):
+    """
+    Retorna o diretório oculto dos arquivos intermediários de uma operação em várias etapas, ao lado do destino. O nome é
+    derivado do destino, mantendo os mesmos parâmetros dos jobs a cada execução.
+    """
+
+    destino = os.path.abspath(destino)
+    return os.path.join(os.path.dirname(destino), ".videotools_" + hashlib.sha1(destino.encode("utf-8")).hexdigest()[:16])
+
+
+def configurar_etapas(etapas, final, temporario):
+    """
+    Configura os jobs de uma operação em várias etapas (ex: divisão em segmentos), cujos arquivos intermediários são
+    gravados no diretório temporário. O diretório é criado pelo primeiro job executado, e não ao criar os jobs, e é
+    removido ao final do job final. As etapas são ignoradas se a saída do job final, que deve informar os vídeos de
+    origem da operação, estiver atualizada.
+    """
+
+    criado = []
+    lock = Lock()
+
+    def criar_diretorio():
+        # Os jobs podem ser executados em paralelo; os arquivos de uma execução interrompida são removidos
+        with lock:
+            if not criado:
+                shutil.rmtree(temporario, True)
+                os.makedirs(temporario)
+                criado.append(temporario)
+
+    def is_final_atualizado():
+        return not final.forcar and gCacheSaidas.is_atualizado(final)
+
+    def preparar_etapa(etapa, preparar):
+        if is_final_atualizado():
+            etapa.atualizado = True
+            return False
+        criar_diretorio()
+        return preparar() if preparar is not None else None
+
+    def preparar_final(preparar):
+        # Com a saída atualizada, o job final é ignorado sem gerar os arquivos intermediários (ex: listas)
+        if is_final_atualizado():
+            return None
+        criar_diretorio()
+        return preparar() if preparar is not None else None
+
+    for etapa in etapas:
+        etapa.preparar = lambda etapa=etapa, preparar=etapa.preparar: preparar_etapa(etapa, preparar)
+    final.preparar = lambda preparar=final.preparar: preparar_final(preparar)
+    final.aoFinalizar.append(lambda: shutil.rmtree(temporario, True))
+
+
+def salvar_lista_concat(arquivoLista, arquivos):
+    """
+    Grava a lista dos arquivos utilizada pelo concat demuxer
+    """
+
+    with open(arquivoLista, "w") as lista:
+        lista.write("".join(escape_concat(arquivo) for arquivo in arquivos))
+
+
+def escape_concat(arquivo):
+    """
+    Formata o arquivo para uma linha da lista do concat demuxer
+    """
+
+    return "file '" + arquivo.replace("'", "'\\''") + "'\n"
+
+
+def criar_jobs_multiplas_saidas(nomesCodecs, arquivos, infos):
+    """
+    Cria um job para cada arquivo, gerando todos os formatos em uma única execução do ffmpeg
+    """
+
+    duracoes = get_duracoes(infos)
+    jobs = []
+    for arquivo in arquivos:
+        codecs = [get_codec_info(nome, infos.get(arquivo)) for nome in nomesCodecs]
+        saidas = [(get_arquivo_destino(arquivo, codec["sufixo"]), codec["params"]) for codec in codecs]
+        jobs.append(FfmpegMultiJob(arquivo, saidas, duracoes.get(arquivo)))
+    return jobs
+
+
+def criar_jobs_segmentados(arquivo, duracao, codec, sufixoArquivo, qtdSegmentos):
+    """
+    Cria os jobs para converter um vídeo dividido em segmentos convertidos em paralelo. O vídeo é dividido nos keyframes
+    sem recodificação, cada segmento é convertido em um job, e os segmentos são unidos com o concat demuxer junto com o
+    áudio original, convertido em uma única passagem. Os pontos de divisão são calculados e os segmentos gerados são
+    listados durante a execução dos jobs, sem analisar o vídeo ao criar os jobs. Retorna None se a duração for desconhecida.
+    """
+
+    if not duracao:
+        debug("Não foi possível dividir o arquivo " + arquivo + " em segmentos: duração desconhecida")
+        return None
+
+    destino = get_arquivo_destino(arquivo, sufixoArquivo)
+    temporario = get_diretorio_temporario(destino)
+
+    # Divide o vídeo nos keyframes, sem recodificação. Os tempos ficam logo antes dos keyframes, garantindo o corte neles.
+    padrao = os.path.join(temporario, "segmento_%03d.mkv")
+    divisao = FfmpegJob(["-i", arquivo, "-map", "0:v:0", "-c", "copy", "-f", "segment", "-segment_times", "", "-segment_format", "matroska",
+                         "-reset_timestamps", "1", padrao], arquivo, padrao, duracao)
+
+    def preparar_divisao():
+        cortes = calcular_cortes(gIndiceKeyframes.get(arquivo), duracao, qtdSegmentos)
+        debug("Dividindo o arquivo " + arquivo + " em " + str(len(cortes) + 1) + " segmentos: " + str(cortes))
+
+        # Sem keyframes para a divisão, o vídeo é convertido em um único segmento
+        tempos = ",".join("%.6f" % (corte - 0.001) for corte in cortes) or "%.6f" % (duracao + 1)
+        divisao.args[divisao.args.index("-segment_times") + 1] = tempos
+
+    divisao.preparar = preparar_divisao
+    jobs = [divisao]
+
+    # Converte cada segmento, apenas o vídeo. O segment muxer pode gerar menos segmentos que o previsto (ex: dois cortes
+    # no mesmo GOP), e os jobs dos segmentos inexistentes são ignorados.
+    convertidos = []
+    for idx in range(qtdSegmentos):
+        segmento = os.path.join(temporario, "segmento_%03d.mkv" % idx)
+        convertido = os.path.join(temporario, "convertido_%03d.mkv" % idx)
+        job = FfmpegJob(["-i", segmento, "-map", "0:v"] + codec["video"] + ["-an", convertido], segmento, convertido, duracao / qtdSegmentos)
+        job.dependencias = [divisao]
+        job.preparar = lambda segmento=segmento: os.path.isfile(segmento)
+        jobs.append(job)
+        convertidos.append(convertido)
+
+    # Une os segmentos convertidos sem recodificação, convertendo o áudio do arquivo original
+    arquivoLista = os.path.join(temporario, "segmentos.txt")
+    uniao = FfmpegJob(["-f", "concat", "-safe", "0", "-i", arquivoLista, "-i", arquivo, "-map", "0:v", "-map", "1:a?", "-c:v", "copy"] +
+                      codec["audio"] + [destino], arquivo, destino, duracao)
+
+    uniao.preparar = lambda: salvar_lista_concat(arquivoLista, [convertido for convertido in convertidos if os.path.isfile(convertido)])
+    uniao.origens = [arquivo]
+    uniao.dependencias = jobs[1:]
+    configurar_etapas(jobs, uniao, temporario)
+    jobs.append(uniao)
+
+    return jobs
+
+
+def criar_jobs_corte_inteligente(arquivo, info, inicio, fim, destino):
+    """
+    Cria os jobs para extrair um intervalo do vídeo recodificando apenas os trechos entre o início do intervalo e o primeiro
+    keyframe, e entre o último keyframe e o fim do intervalo. O trecho intermediário é copiado sem recodificação.
+    Os keyframes são consultados durante a execução dos jobs, e se o intervalo não contiver keyframes suficientes todo
+    o intervalo é recodificado. Retorna None se o codec do vídeo não for suportado.
+    """
+
+    encoder = ENCODERS_VIDEO_COMPATIVEIS.get(info.video_codec) if info is not None else None
+    if encoder is None or info.video_codec not in CODECS_VIDEO_MPEGTS:
+        debug("Codec não suportado pelo corte inteligente: " + str(info.video_codec if info is not None else None))
+        return None
+
+    temporario = get_diretorio_temporario(destino)
+    recodificar = encoder + (["-pix_fmt", info.pix_fmt] if info.pix_fmt else [])
+    plano = []
+    lockPlano = Lock()
+
+    def get_trechos():
+        # O plano é calculado pelo primeiro trecho executado, e os trechos podem ser executados em paralelo
+        with lockPlano:
+            if not plano:
+                indice = gIndiceKeyframes.get(arquivo)
+                primeiroKeyframe = indice.get_keyframe_proximo(inicio)
+                ultimoKeyframe = indice.get_keyframe_anterior(fim)
+                if primeiroKeyframe is None or ultimoKeyframe is None or primeiroKeyframe >= ultimoKeyframe:
+                    debug("Keyframes insuficientes para o corte inteligente de " + arquivo + ", o intervalo será recodificado")
+                    plano.extend([(inicio, fim), None, None])
+                else:
+                    debug("Corte inteligente de " + arquivo + ": recodificando " + str(inicio) + "-" + str(primeiroKeyframe) + " e " +
+                          str(ultimoKeyframe) + "-" + str(fim) + ", copiando " + str(primeiroKeyframe) + "-" + str(ultimoKeyframe))
+                    plano.extend([(inicio, primeiroKeyframe), (primeiroKeyframe, ultimoKeyframe - 0.001), (ultimoKeyframe, fim)])
+            return plano
+
+    def preparar_trecho(job, idx):
+        trecho = get_trechos()[idx]
+        if trecho is None or trecho[1] - trecho[0] <= 0:
+            return False
+
+        job.duracao = trecho[1] - trecho[0]
+        job.args[job.args.index("-ss") + 1] = "%.6f" % trecho[0]
+        job.args[job.args.index("-t") + 1] = "%.6f" % job.duracao
+
+    # Os trechos são gerados em MPEG-TS, que mantém os parâmetros do codec em cada trecho
+    jobs = []
+    trechos = []
+    for idx, codec in enumerate([recodificar, ["-c:v", "copy"], recodificar]):
+        trecho = os.path.join(temporario, "trecho_%d.ts" % idx)
+        job = FfmpegJob(["-ss", "0", "-i", arquivo, "-t", "0", "-map", "0:v:0"] + codec + ["-an", trecho], arquivo, trecho, (fim - inicio) / 3.0)
+        job.preparar = lambda job=job, idx=idx: preparar_trecho(job, idx)
+        jobs.append(job)
+        trechos.append(trecho)
+
+    # Une os trechos gerados e copia o áudio do intervalo
+    arquivoLista = os.path.join(temporario, "trechos.txt")
+    uniao = FfmpegJob(["-f", "concat", "-safe", "0", "-i", arquivoLista, "-ss", "%.6f" % inicio, "-t", "%.6f" % (fim - inicio), "-i", arquivo,
+                       "-map", "0:v", "-map", "1:a?", "-c", "copy", destino], arquivo, destino, fim - inicio)
+
+    uniao.preparar = lambda: salvar_lista_concat(arquivoLista, [trecho for trecho in trechos if os.path.isfile(trecho)])
+    uniao.origens = [arquivo]
+    uniao.dependencias = list(jobs)
+    configurar_etapas(jobs, uniao, temporario)
+    jobs.append(uniao)
+
+    return jobs
+
+
+def criar_jobs_concatenacao_copia(arquivos, infos, destino):
+    """
+    Cria os jobs para concatenar os arquivos sem recodificação.
+    Se todos os arquivos possuírem os mesmos parâmetros de streams, os arquivos são unidos diretamente pelo concat demuxer.
+    Caso contrário, apenas os arquivos diferentes da maioria são recodificados com os parâmetros da maioria, e todos os arquivos
+    são unidos através de arquivos intermediários.
+    Retorna None se os arquivos não puderem ser concatenados sem recodificação de todos os vídeos.
+    """
+
+    if not arquivos or any(infos.get(arquivo) is None for arquivo in arquivos):
+        return None
+
+    parametros = [infos[arquivo].get_parametros_streams() for arquivo in arquivos]
+    referencia = max(parametros, key=parametros.count)
+    info = infos[arquivos[parametros.index(referencia)]]
+    duracao = sum(infos[arquivo].duration or 0 for arquivo in arquivos)
+
+    temporario = get_diretorio_temporario(destino)
+    arquivoLista = os.path.join(temporario, "arquivos.txt")
+
+    # Todos os arquivos compatíveis
+    if parametros.count(referencia) == len(arquivos):
+        debug("Concatenando " + str(len(arquivos)) + " arquivos compatíveis sem recodificação")
+        job = FfmpegJob(["-f", "concat", "-safe", "0", "-i", arquivoLista, "-c", "copy", destino], None, destino, duracao)
+        job.preparar = lambda: salvar_lista_concat(arquivoLista, arquivos)
+        job.origens = list(arquivos)
+        configurar_etapas([], job, temporario)
+        return [job]
+
+    encoderVideo = ENCODERS_VIDEO_COMPATIVEIS.get(info.video_codec)
+    encoderAudio = ENCODERS_AUDIO_COMPATIVEIS.get(info.audio_codec)
+    if encoderVideo is None or (info.audio_codec is not None and encoderAudio is None):
+        return None
+
+    # Os parâmetros do vídeo de referência são necessários para recodificar os demais arquivos
+    if not info.width or not info.height or not info.fps or not info.pix_fmt:
+        debug("Parâmetros de vídeo desconhecidos no arquivo de referência, todos os vídeos serão recodificados")
+        return None
+
+    # Os arquivos intermediários utilizam MPEG-TS quando possível, que mantém os parâmetros do codec em cada arquivo
+    formato, extensao = ("mpegts", "ts") if info.video_codec in CODECS_VIDEO_MPEGTS else ("matroska", "mkv")
+
+    # A taxa de quadros utiliza a fração do ffprobe (ex: 30000/1001), mantendo a mesma base de tempo dos arquivos copiados
+    recodificar = ["-map", "0:v:0", "-vf", "scale=%d:%d,fps=%s" % (info.width, info.height, info.frame_rate or info.fps), "-pix_fmt", info.pix_fmt] + encoderVideo
+    recodificarAudio = []
+    silencio = []
+    if info.audio_codec is not None:
+        recodificarAudio = list(encoderAudio)
+        if info.sample_rate:
+            recodificarAudio = recodificarAudio + ["-ar", str(info.sample_rate)]
+            silencio.append("r=%d" % info.sample_rate)
+        if info.channels:
+            recodificarAudio = recodificarAudio + ["-ac", str(info.channels)]
+            silencio.append("cl=" + {1: "mono", 2: "stereo"}.get(info.channels, "%dc" % info.channels))
+
+    jobs = []
+    intermediarios = []
+    for idx, arquivo in enumerate(arquivos):
+        intermediario = os.path.join(temporario, "arquivo_%d.%s" % (idx, extensao))
+        if parametros[idx] == referencia:
+            args = ["-i", arquivo, "-map", "0:v:0", "-map", "0:a:0?", "-c", "copy", "-f", formato, intermediario]
+        else:
+            debug("O arquivo " + arquivo + " será recodificado para permitir a concatenação")
+            args = ["-i", arquivo] + recodificar
+            if info.audio_codec is not None and infos[arquivo].audio_codec is None:
+                # Os arquivos sem áudio recebem um áudio silencioso, mantendo os mesmos streams em todos os arquivos
+                args = ["-i", arquivo, "-f", "lavfi", "-i", "anullsrc" + ("=" + ":".join(silencio) if silencio else "")] + recodificar
+                args = args + ["-map", "1:a:0", "-shortest"] + recodificarAudio
+            elif info.audio_codec is not None:
+                args = args + ["-map", "0:a:0"] + recodificarAudio
+            args = args + ["-f", formato, intermediario]
+
+        jobs.append(FfmpegJob(args, arquivo, intermediario, infos[arquivo].duration))
+        intermediarios.append(intermediario)
+
+    uniao = FfmpegJob(["-f", "concat", "-safe", "0", "-i", arquivoLista, "-c", "copy", destino], None, destino, duracao)
+    uniao.preparar = lambda: salvar_lista_concat(arquivoLista, intermediarios)
+    uniao.origens = list(arquivos)
+    uniao.dependencias = list(jobs)
+    configurar_etapas(jobs, uniao, temporario)
+    jobs.append(uniao)
+
+    return jobs
+
+
+def criar_jobs_concatenacao_mpegts(arquivos, infos, destino):
+    """
+    Cria os jobs para concatenar arquivos MPEG-TS (ex: arquivos .mts de câmeras AVCHD) através da cópia dos bytes.
+    Os arquivos devem possuir o mesmo tamanho de pacote e os mesmos PIDs, e os timestamps de cada arquivo devem continuar
+    os timestamps do arquivo anterior. Se o destino não for MPEG-TS, o arquivo unido é convertido sem recodificação.
+    Retorna None se os arquivos não puderem ser concatenados dessa forma.
+    """
+
+    if len(arquivos) < 2 or any(os.path.splitext(arquivo)[1].lower() not in EXTENSOES_MPEGTS for arquivo in arquivos):
+        return None
+
+    anterior = None
+    for arquivo in arquivos:
+        atual = analisar_mpegts(arquivo)
+        if atual is None:
+            debug("Não foi possível analisar o arquivo MPEG-TS " + arquivo)
+            return None
+
+        if anterior is not None:
+            if atual["tamanhoPacote"] != anterior["tamanhoPacote"] or atual["streams"] != anterior["streams"]:
+                debug("O arquivo " + arquivo + " possui streams diferentes do arquivo anterior")
+                return None
+
+            # Diferença entre os timestamps, considerando o limite de 33 bits do PTS
+            diferenca = (atual["primeiroPts"] - anterior["ultimoPts"]) % (1 << 33)
+            if diferenca >= (1 << 32):
+                diferenca -= 1 << 33
+            if abs(diferenca) > TOLERANCIA_PTS_MPEGTS * 90000:
+                debug("Os timestamps do arquivo " + arquivo + " não continuam o arquivo anterior (diferença de " + str(diferenca / 90000.0) + "s)")
+                return None
+        anterior = atual
+
+    duracao = sum(infos[arquivo].duration or 0 for arquivo in arquivos if infos.get(arquivo) is not None)
+
+    if os.path.splitext(destino)[1].lower() in EXTENSOES_MPEGTS:
+        return [MpegtsConcatJob(arquivos, destino, duracao)]
+
+    temporario = get_diretorio_temporario(destino)
+    intermediario = os.path.join(temporario, "concatenado.ts")
+    uniao = MpegtsConcatJob(arquivos, intermediario, duracao)
+
+    conversao = FfmpegJob(["-i", intermediario, "-map", "0:v", "-map", "0:a?", "-c", "copy", destino], intermediario, destino, duracao)
+    conversao.origens = list(arquivos)
+    conversao.dependencias = [uniao]
+    configurar_etapas([uniao], conversao, temporario)
+
+    return [uniao, conversao]
+
+
+def analisar_mpegts(arquivo):
+    """
+    Lê o início e o fim de um arquivo MPEG-TS, retornando o tamanho dos pacotes, os streams (PID e tipo) do programa e
+    o primeiro e o último PTS do stream de vídeo. Retorna None se o arquivo não for um MPEG-TS válido.
+    """
+
+    tamanhoArquivo = os.stat(arquivo).st_size
+    with open(arquivo, "rb") as entrada:
+        inicio = bytearray(entrada.read(TAMANHO_ANALISE_MPEGTS))
+
+        # Pacotes de 188 bytes (.ts) ou de 192 bytes, com um timestamp de 4 bytes antes de cada pacote (.mts/.m2ts)
+        tamanhoPacote = None
+        for tamanho, deslocamento in ((188, 0), (192, 4)):
+            if tamanhoArquivo % tamanho == 0 and len(inicio) >= tamanho * 3 and \
+                    all(inicio[deslocamento + tamanho * idx] == 0x47 for idx in range(3)):
+                tamanhoPacote = tamanho
+                break
+        if tamanhoPacote is None:
+            return None
+
+        pidPmt = None
+        streams = None
+        pidVideo = None
+        primeiroPts = None
+        for pid, pusi, payload in listar_pacotes_mpegts(inicio, tamanhoPacote):
+            if not pusi:
+                continue
+
+            if pid == 0 and pidPmt is None:
+                # PAT: utiliza o PMT do primeiro programa (o programa 0 indica o PID da NIT)
+                secao = payload[payload[0] + 1:] if payload else payload
+                if len(secao) < 12 or secao[0] != 0x00:
+                    continue
+                fimSecao = min(len(secao), 3 + (((secao[1] & 0x0f) << 8) | secao[2]) - 4)
+                for pos in range(8, fimSecao - 3, 4):
+                    if (secao[pos] << 8) | secao[pos + 1]:
+                        pidPmt = ((secao[pos + 2] & 0x1f) << 8) | secao[pos + 3]
+                        break
+            elif pid == pidPmt and streams is None:
+                # PMT: lista os PIDs e os tipos dos streams
+                secao = payload[payload[0] + 1:] if payload else payload
+                if len(secao) < 12 or secao[0] != 0x02:
+                    continue
+                fimSecao = min(len(secao), 3 + (((secao[1] & 0x0f) << 8) | secao[2]) - 4)
+                pos = 12 + (((secao[10] & 0x0f) << 8) | secao[11])
+                streams = []
+                while pos + 5 <= fimSecao:
+                    tipo = secao[pos]
+                    pidStream = ((secao[pos + 1] & 0x1f) << 8) | secao[pos + 2]
+                    streams.append((pidStream, tipo))
+                    if pidVideo is None and tipo in TIPOS_STREAM_VIDEO_MPEGTS:
+                        pidVideo = pidStream
+                    pos += 5 + (((secao[pos + 3] & 0x0f) << 8) | secao[pos + 4])
+                streams = frozenset(streams)
+            elif pid == pidVideo and primeiroPts is None:
+                primeiroPts = ler_pts(payload)
+
+            if primeiroPts is not None:
+                break
+
+        if pidVideo is None or primeiroPts is None:
+            return None
+
+        # Maior PTS entre os últimos pacotes do vídeo, já que os quadros B são gravados fora da ordem de exibição
+        qtdPacotes = min(tamanhoArquivo, TAMANHO_ANALISE_MPEGTS) // tamanhoPacote
+        entrada.seek(tamanhoArquivo - qtdPacotes * tamanhoPacote)
+        fim = bytearray(entrada.read(qtdPacotes * tamanhoPacote))
+
+    ultimoPts = None
+    for pid, pusi, payload in listar_pacotes_mpegts(fim, tamanhoPacote):
+        if pid == pidVideo and pusi:
+            pts = ler_pts(payload)
+            if pts is not None and (ultimoPts is None or (pts - ultimoPts) % (1 << 33) < (1 << 32)):
+                ultimoPts = pts
+
+    if ultimoPts is None:
+        return None
+
+    return {"tamanhoPacote": tamanhoPacote, "streams": streams, "primeiroPts": primeiroPts, "ultimoPts": ultimoPts}
+
+
+def listar_pacotes_mpegts(dados, tamanhoPacote):
+    """
+    Retorna o PID, o indicador de início de unidade (PUSI) e o payload de cada pacote MPEG-TS dos dados
+    """
+
+    deslocamento = tamanhoPacote - 188
+    for pos in range(deslocamento, len(dados) - 187, tamanhoPacote):
+        if dados[pos] != 0x47:
+            continue
+
+        pid = ((dados[pos + 1] & 0x1f) << 8) | dados[pos + 2]
+        pusi = (dados[pos + 1] & 0x40) != 0
+        controle = (dados[pos + 3] >> 4) & 0x03
+        if not controle & 0x01:
+            continue
+
+        inicio = pos + 4
+        if controle & 0x02:
+            inicio += 1 + dados[pos + 4]
+        if inicio < pos + 188:
+            yield pid, pusi, dados[inicio:pos + 188]
+
+
+def ler_pts(payload):
+    """
+    Retorna o PTS do cabeçalho PES contido no payload, ou None se o payload não iniciar um PES com PTS
+    """
+
+    if len(payload) < 14 or payload[0] != 0 or payload[1] != 0 or payload[2] != 1 or not payload[7] & 0x80:
+        return None
+
+    return (((payload[9] >> 1) & 0x07) << 30) | (payload[10] << 22) | ((payload[11] >> 1) << 15) | (payload[12] << 7) | (payload[13] >> 1)
+
+
+def anexar_arquivo(arquivo, descritorSaida):
+    """
+    Acrescenta o conteúdo do arquivo ao descritor de saída, retornando a quantidade de bytes copiados a cada bloco.
+    Utiliza copy_file_range ou sendfile quando disponíveis, evitando a cópia dos dados pelo Python.
+    """
+
+    copiarBlocos = getattr(os, "copy_file_range", None)
+    enviarArquivo = getattr(os, "sendfile", None)
+
+    with open(arquivo, "rb", 0) as entrada:
+        descritorEntrada = entrada.fileno()
+        tamanho = os.fstat(descritorEntrada).st_size
+        copiados = 0
+        while copiados < tamanho:
+            bloco = min(TAMANHO_BLOCO_COPIA, tamanho - copiados)
+            qtd = None
+
+            try:
+                if copiarBlocos is not None:
+                    qtd = copiarBlocos(descritorEntrada, descritorSaida, bloco, copiados)
+                elif enviarArquivo is not None:
+                    qtd = enviarArquivo(descritorSaida, descritorEntrada, copiados, bloco)
+            except OSError as e:
+                # Sistema de arquivos ou sistema operacional sem suporte, utiliza a cópia convencional
+                debug("Cópia pelo sistema operacional indisponível, utilizando a cópia convencional: " + str(e))
+                copiarBlocos = enviarArquivo = None
+                qtd = None
+
+            if qtd is None:
+                entrada.seek(copiados)
+                dados = entrada.read(bloco)
+                qtd = len(dados)
+                while dados:
+                    dados = dados[os.write(descritorSaida, dados):]
+
+            if qtd == 0:
+                raise IOError("Fim inesperado do arquivo " + arquivo)
+
+            copiados += qtd
+            yield qtd
+
+
+def criar_jobs_estabilizacao(arquivos, intensidade, zoom, duracoes):
+    """
+    Cria os jobs de estabilização em duas etapas para cada arquivo: o cálculo dos vetores de movimento (vidstabdetect) e
+    a estabilização do vídeo (vidstabtransform), que depende apenas dos vetores do mesmo arquivo.
+    Os vetores são armazenados por arquivo e intensidade, e a primeira etapa é ignorada se os vetores já foram calculados;
+    a verificação é feita na execução do job, e os vetores ficam fixados no cache até o fim da estabilização.
+    """
+
+    if not os.path.isdir(DIR_CACHE_VETORES):
+        os.makedirs(DIR_CACHE_VETORES)
+
+    jobs = []
+    for arquivo in arquivos:
+        if not os.path.isfile(arquivo):
+            debug("Ignorando arquivo inexistente: " + arquivo)
+            continue
+
+        duracao = duracoes.get(arquivo)
+        destino = get_arquivo_destino(arquivo, "_stab.${EXTENSAO}")
+        chave = get_fingerprint(arquivo) + "_" + str(intensidade)
+        vetores = gCacheVetores.get_caminho(chave)
+
+        estabilizacao = FfmpegJob(["-i", arquivo, "-vf", "vidstabtransform=input=" + escape_filtro(vetores) + ":zoom=" + str(zoom) +
+                                   ":smoothing=30,unsharp=5:5:0.8:3:3:0.4", "-strict", "-2", destino], arquivo, destino, duracao)
+
+        # Os vetores são gerados em um arquivo temporário, renomeado apenas se a análise for concluída
+        temporario = vetores + ".tmp"
+        deteccao = FfmpegJob(["-i", arquivo, "-vf", "vidstabdetect=stepsize=6:shakiness=" + str(intensidade) + ":result=" +
+                              escape_filtro(temporario), "-f", "null", "-"], arquivo, temporario, duracao)
+        deteccao.preparar = lambda job=deteccao, chave=chave: preparar_vetores(job, chave)
+        deteccao.aoFinalizar.append(lambda job=deteccao, chave=chave: concluir_vetores(job, chave))
+        estabilizacao.dependencias = [deteccao]
+        estabilizacao.aoFinalizar.append(lambda chave=chave: gCacheVetores.liberar(chave))
+
+        jobs.append(deteccao)
+        jobs.append(estabilizacao)
+
+    return jobs
+
+
+def preparar_vetores(job, chave):
+    """
+    Fixa os vetores de estabilização no cache até o fim da estabilização, ignorando o cálculo se já estiverem no cache
+    """
+
+    gCacheVetores.fixar(chave)
+    if gCacheVetores.get(chave) is not None:
+        debug("Utilizando os vetores de estabilização calculados anteriormente para o arquivo " + job.origem)
+        job.atualizado = True
+        return False
+
+
+def concluir_vetores(job, chave):
+    """
+    Move os vetores de estabilização calculados pelo job para o cache, ou remove o arquivo temporário em caso de falha
+    """
+
+    if not os.path.isfile(job.destino):
+        return
+
+    if job.estado == FfmpegJob.CONCLUIDO:
+        os.rename(job.destino, gCacheVetores.get_caminho(chave))
+        gCacheVetores.registrar(chave)
+    else:
+        os.remove(job.destino)
+
+
+def criar_job_registro(registro):
+    """
+    Recria um job a partir dos dados registrados no journal
+    """
+
+    if registro["tipo"] == "multi":
+        return FfmpegMultiJob(registro["origem"], [(destino, params) for destino, params in registro["saidas"]], registro["duracao"])
+    if registro["tipo"] == "mpegts":
+        return MpegtsConcatJob(registro["arquivos"], registro["destino"], registro["duracao"])
+    job = FfmpegJob(registro["args"], registro["origem"], registro["destino"], registro["duracao"], registro["saidas"])
+    job.origens = registro.get("origens")
+    return job
+
+
+def get_arquivo_parcial(arquivo):
+    """
+    Retorna o nome temporário (oculto, com a mesma extensão) utilizado durante a gravação do arquivo
+    """
+
+    diretorio, nome = os.path.split(arquivo)
+    base, extensao = os.path.splitext(nome)
+    return os.path.join(diretorio, "." + base + SUFIXO_ARQUIVO_PARCIAL + extensao)
+
+
+def substituir_arquivo(origem, destino):
+    """
+    Renomeia o arquivo, substituindo o destino de forma atômica quando suportado pelo sistema
+    """
+
+    if hasattr(os, "replace"):
+        os.replace(origem, destino)
+    else:
+        if IS_WINDOWS and os.path.isfile(destino):
+            os.remove(destino)
+        os.rename(origem, destino)
+
+
+def get_fingerprint(arquivo):
+    """
+    Retorna uma identificação do conteúdo do arquivo, baseada no caminho, tamanho e data de modificação
+    """
+
+    stat = os.stat(arquivo)
+    chave = os.path.abspath(arquivo) + "|" + str(stat.st_size) + "|" + repr(stat.st_mtime)
+    return hashlib.sha1(chave.encode("utf-8")).hexdigest()
+
+
+def escape_filtro(valor):
+    """
+    Escapa um valor (ex: caminho de arquivo) utilizado como opção de um filtro do ffmpeg
+    """
+
+    return valor.replace("\\", "/").replace("'", "\\\\\\'").replace(":", "\\\\:")
+
+
+def get_atualizacoes_progresso():
+    """
+    Retorna a quantidade máxima de atualizações por segundo das telas de progresso
+    """
+
+    try:
+        return max(1, int(get_app_settings("atualizacoes_progresso")))
+    except (TypeError, ValueError):
+        return ATUALIZACOES_PROGRESSO_PADRAO
+
+
+def get_qtd_threads_analise():
+    """
+    Retorna a quantidade de threads utilizadas para analisar os vídeos, por padrão a quantidade de CPUs
+    """
+
+    try:
+        return max(1, int(get_app_settings("threads_analise")))
+    except (TypeError, ValueError):
+        return multiprocessing.cpu_count()
+
+
+def get_extensoes_video():
+    """
+    Retorna o conjunto de extensões de vídeo configuradas (em minúsculo e com o ponto)
+    """
+
+    return gSettings.get_extensoes_video()
+
+
+def listar_videos(diretorio, extensoes, qtdThreads, cancelado=None):
+    """
+    Percorre a árvore do diretório com os sub-diretórios lidos em paralelo, retornando os pares (arquivo, stat) dos vídeos
+    conforme são encontrados. O stat é obtido do próprio DirEntry, evitando consultas adicionais ao sistema de arquivos.
+    """
+
+    FIM = object()
+    diretorios = queue.Queue()
+    saida = queue.Queue(TAMANHO_FILA_LEITURA_DIRETORIO)
+    pendentes = [1]
+    lock = Lock()
+    interrompido = []
+
+    def coloca(item):
+        # Evita que as threads fiquem bloqueadas caso o consumidor tenha parado de ler os arquivos
+        while not interrompido:
+            try:
+                saida.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def worker():
+        while True:
+            atual = diretorios.get()
+            if atual is FIM:
+                return
+
+            try:
+                for entry in scandir(atual):
+                    if interrompido or (cancelado is not None and cancelado()):
+                        break
+
+                    if entry.is_dir() and not entry.is_symlink():
+                        with lock:
+                            pendentes[0] += 1
+                        diretorios.put(entry.path)
+                    # Assim como o glob, ignora os arquivos ocultos, mas percorre os diretórios ocultos
+                    elif not entry.name.startswith('.') and os.path.splitext(entry.name)[1].lower() in extensoes:
+                        coloca((entry.path, entry.stat()))
+            except OSError as e:
+                debug("Falha ao ler o diretório " + atual + " : " + str(e))
+
+            with lock:
+                pendentes[0] -= 1
+                if pendentes[0] == 0:
+                    coloca(FIM)
+                    for _ in range(qtdThreads):
+                        diretorios.put(FIM)
+
+    diretorios.put(diretorio)
+    for _ in range(qtdThreads):
+        thread = Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+
+    try:
+        while True:
+            item = saida.get()
+            if item is FIM:
+                return
+            yield item
+    finally:
+        interrompido.append(True)
+
+
+def executar_em_paralelo(funcao, itens, qtdThreads, cancelado=None):
+    """
+    Executa a função para cada item em um pool de threads, retornando os pares (item, resultado) conforme são concluídos
+    """
+
+    FIM = object()
+    entrada = queue.Queue(qtdThreads * 2)
+    saida = queue.Queue()
+
+    def worker():
+        while True:
+            item = entrada.get()
+            if item is FIM:
+                saida.put(FIM)
+                return
+
+            try:
+                resultado = funcao(item)
+            except Exception as e:
+                debug("Falha ao processar o item " + str(item) + " : " + str(e))
+                resultado = None
+            saida.put((item, resultado))
+
+    def alimentador():
+        for item in itens:
+            if cancelado is not None and cancelado():
+                break
+            entrada.put(item)
+
+        for _ in range(qtdThreads):
+            entrada.put(FIM)
+
+    for target in [alimentador] + [worker] * qtdThreads:
+        thread = Thread(target=target)
+        thread.daemon = True
+        thread.start()
+
+    finalizados = 0
+    while finalizados < qtdThreads:
+        resp = saida.get()
+        if resp is FIM:
+            finalizados += 1
+        else:
+            yield resp
+
+
+def analisar_diretorio(diretorio, notificar, cancelado=None):
+    """
+    Lê os vídeos do diretório, analisando em paralelo apenas os arquivos que não estão no cache de metadados.
+    A função notificar(arquivo, stat, info) é chamada por várias threads para cada vídeo, com info None para os arquivos
+    que não puderam ser analisados. Retorna False se a leitura foi interrompida.
+    """
+
+    # As entradas do cache utilizam caminhos absolutos, e o executável do ffprobe é identificado uma única vez por leitura
+    diretorio = os.path.abspath(diretorio)
+    ffprobe = get_identificacao_executavel(get_caminho_ffprobe())
+    gCacheMetadados.reset_contadores()
+    encontrados = set()
+    tamanhoTotal = [0]
+
+    def arquivos_pendentes():
+        # Percorre o diretório, retornando apenas os vídeos que não estão no cache
+        for arquivo, stat in listar_videos(diretorio, get_extensoes_video(), QTD_THREADS_LEITURA_DIRETORIO, cancelado):
+            encontrados.add(arquivo)
+            tamanhoTotal[0] += stat.st_size
+            if stat.st_size > 0:
+                dados = gCacheMetadados.get(arquivo, stat.st_size, stat.st_mtime, ffprobe)
+                if dados is None:
+                    yield (arquivo, stat)
+                else:
+                    notificar(arquivo, stat, VideoInfo.from_dict(dados))
+
+    # Analisa os arquivos que não estão no cache utilizando o pool de threads, conforme são encontrados
+    qtdThreads = get_qtd_threads_analise()
+    debug("Lendo o diretório " + diretorio + " e analisando os vídeos utilizando " + str(qtdThreads) + " threads")
+
+    for (arquivo, stat), info in executar_em_paralelo(lambda item: get_video_info(item[0]), arquivos_pendentes(), qtdThreads, cancelado):
+        # Arquivos que não puderam ser analisados também são armazenados, evitando novas análises
+        gCacheMetadados.put(arquivo, stat.st_size, stat.st_mtime, ffprobe, {} if info is None else info.to_dict())
+        notificar(arquivo, stat, info)
+
+    if cancelado is not None and cancelado():
+        debug("Leitura do diretório " + diretorio + " interrompida")
+        return False
+
+    debug("Vídeos no diretório de origem: " + str(len(encontrados)) + " (" + to_human_size(tamanhoTotal[0]) + ")")
+
+    # Remove do cache os arquivos apagados e persiste as novas entradas
+    gCacheMetadados.remover_inexistentes(diretorio, encontrados)
+    gCacheMetadados.salvar()
+    debug("Cache de metadados: " + str(gCacheMetadados.acertos) + " acertos, " + str(gCacheMetadados.falhas) + " falhas")
+    return True
+
+
+def carregar_infos(arquivos):
+    """
+    Retorna as informações de cada arquivo, utilizando o cache de metadados e analisando em paralelo os demais arquivos.
+    Arquivos inexistentes ou que não puderam ser analisados retornam None.
+    """
+
+    ffprobe = get_identificacao_executavel(get_caminho_ffprobe())
+    infos = {}
+    pendentes = []
+    for arquivo in arquivos:
+        if not os.path.isfile(arquivo):
+            infos[arquivo] = None
+            continue
+
+        stat = os.stat(arquivo)
+        dados = gCacheMetadados.get(os.path.abspath(arquivo), stat.st_size, stat.st_mtime, ffprobe)
+        if dados is None:
+            pendentes.append((arquivo, stat))
+        else:
+            infos[arquivo] = VideoInfo.from_dict(dados)
+
+    for (arquivo, stat), info in executar_em_paralelo(lambda item: get_video_info(item[0]), pendentes, get_qtd_threads_analise()):
+        gCacheMetadados.put(os.path.abspath(arquivo), stat.st_size, stat.st_mtime, ffprobe, {} if info is None else info.to_dict())
+        infos[arquivo] = info
+
+    if pendentes:
+        gCacheMetadados.salvar()
+    return infos
+
+
+def executar_jobs(jobs, notificarProgresso=None, notificarEstado=None):
+    """
+    Executa os jobs aguardando a sua conclusão, para uso fora da interface gráfica. Uma interrupção do usuário (Ctrl+C)
+    cancela os jobs em execução. Retorna o scheduler, com a quantidade de jobs concluídos e de falhas.
+    """
+
+    fim = Event()
+    scheduler = JobScheduler(jobs, get_qtd_jobs_paralelos(), get_qtd_jobs_io(), notificarProgresso or (lambda job: None), fim.set, notificarEstado)
+    scheduler.iniciar()
+
+    # A espera com timeout permite receber o KeyboardInterrupt no Python 2
+    try:
+        while not fim.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        debug("Processamento interrompido pelo usuário")
+        scheduler.cancelar()
+        fim.wait()
+
+    gCacheSaidas.salvar()
+    return scheduler
+
+
+def gerar_miniatura(arquivo, duracao, destino):
+    """
+    Grava no destino uma miniatura JPEG do vídeo, obtida do keyframe anterior a uma posição próxima do início do vídeo.
+    Apenas os keyframes são decodificados. Retorna True se a miniatura foi gerada.
+    """
+
+    temporario = get_arquivo_parcial(destino)
+    posicao = min((duracao or 0) * FRACAO_POSICAO_MINIATURA, POSICAO_MAXIMA_MINIATURA)
+    for inicio in ([posicao, 0] if posicao > 0 else [0]):
+        args = [get_caminho_ffmpeg(), "-v", "error", "-y", "-skip_frame", "nokey", "-noaccurate_seek", "-ss", "%.3f" % inicio, "-i", arquivo,
+                "-map", "0:v:0", "-frames:v", "1", "-vf", "scale=" + str(LARGURA_MINIATURA) + ":" + str(ALTURA_MINIATURA) +
+                ":force_original_aspect_ratio=decrease", "-q:v", "5", "-threads", "1", "-f", "image2", temporario]
+        try:
+            processo = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+        except OSError as e:
+            debug("Falha ao executar o ffmpeg: " + str(e))
+            return False
+
+        _, erro = processo.communicate()
+        if processo.returncode == 0 and os.path.isfile(temporario) and os.stat(temporario).st_size > 0:
+            substituir_arquivo(temporario, destino)
+            return True
+
+        # Alguns vídeos não possuem keyframes após a posição, e a miniatura é obtida do início do vídeo
+        if os.path.isfile(temporario):
+            os.remove(temporario)
+        if erro.strip():
+            debug("Falha ao gerar a miniatura do arquivo " + arquivo + " : " + erro.strip())
+
+    return False
+
+
+def salvar_arquivo_atomico(caminho, conteudo):
+    """
+    Grava o conteúdo em um arquivo temporário e o renomeia para o destino, evitando arquivos corrompidos
+    """
+
+    temporario = caminho + ".tmp"
+    with open(temporario, "wb" if isinstance(conteudo, bytes) else "w") as arquivo:
+        arquivo.write(conteudo)
+
+    if hasattr(os, "replace"):
+        os.replace(temporario, caminho)
+    else:
+        if os.path.isfile(caminho):
+            os.remove(caminho)
+        os.rename(temporario, caminho)
+
+# Constantes da aplicação
+
+
+# Versão da aplicação
+VERSAO_APLICACAO = "v1.0"
+
+
+# Constantes da aplicação
+UNIDADES = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
+DIR_APPLICATION = os.path.dirname(os.path.realpath(__file__))
+ARQUIVO_XML_SETTINGS = DIR_APPLICATION + os.sep + "settings.xml"
+ARQUIVO_LOG = DIR_APPLICATION + os.sep + "application.log"
+ARQUIVO_VIDEOS_CONCATENA = DIR_APPLICATION + os.sep + "videos_concatena.txt"
+ARQUIVO_CACHE_METADADOS = DIR_APPLICATION + os.sep + "metadata_cache.json"
+ARQUIVO_JOURNAL = DIR_APPLICATION + os.sep + "jobs_journal.jsonl"
+ARQUIVO_CACHE_SAIDAS = DIR_APPLICATION + os.sep + "outputs_cache.json"
+ARQUIVO_CACHE_FFMPEG = DIR_APPLICATION + os.sep + "ffmpeg_cache.json"
+DIR_CACHE_VETORES = DIR_APPLICATION + os.sep + "vidstab_cache"
+DIR_CACHE_KEYFRAMES = DIR_APPLICATION + os.sep + "keyframes_cache"
+DIR_CACHE_MINIATURAS = DIR_APPLICATION + os.sep + "thumbnails_cache"
+
+# Tamanho máximo (em bytes) do cache em disco dos índices de keyframes, e quantidade de índices mantidos em memória
+TAMANHO_CACHE_KEYFRAMES = 100 * 1024 * 1024
+TAMANHO_MEMORIA_INDICES_KEYFRAMES = 64
+
+# Tamanho máximo (em bytes) do cache dos vetores de estabilização
+TAMANHO_CACHE_VETORES = 500 * 1024 * 1024
+
+# Miniaturas dos vídeos: tamanho máximo (em pixels), posição do quadro (fração da duração, limitada em segundos) e
+# tamanho máximo (em bytes) do cache em disco
+LARGURA_MINIATURA = 96
+ALTURA_MINIATURA = 54
+FRACAO_POSICAO_MINIATURA = 0.1
+POSICAO_MAXIMA_MINIATURA = 60
+TAMANHO_CACHE_MINIATURAS = 200 * 1024 * 1024
+
+# Quantidade padrão de threads por job de CPU (utilizada para calcular a quantidade de jobs em paralelo) e de jobs de I/O
+THREADS_POR_JOB_PADRAO = 4
+JOBS_IO_PADRAO = 2
+
+# Intervalo (em segundos) para agrupar as alterações das configurações antes de gravar o arquivo
+INTERVALO_GRAVACAO_SETTINGS = 1.0
+
+# Quantidade padrão de atualizações por segundo das telas de progresso e intervalo (em segundos) para consultar o
+# tamanho do arquivo de destino quando o ffmpeg não o informar
+ATUALIZACOES_PROGRESSO_PADRAO = 4
+INTERVALO_AMOSTRA_TAMANHO = 1.0
+
+# Sufixo dos arquivos gravados pelos jobs antes de serem renomeados para o nome final
+SUFIXO_ARQUIVO_PARCIAL = ".parcial"
+
+# Quantidade de threads e tamanho da fila de arquivos utilizados na leitura dos diretórios
+QTD_THREADS_LEITURA_DIRETORIO = 4
+TAMANHO_FILA_LEITURA_DIRETORIO = 1000
+
+# its win32, maybe there is win64 too?
+IS_WINDOWS = sys.platform.startswith('win')
+
+# Variáveis globais da aplicação
+# Nota: por convenção, as variáveis globais são camelCase e iniciam com um 'g'
+
+
+# Logger da aplicação, cujos handlers são configurados pela interface gráfica ou pela linha de comando
+gLogger = logging.getLogger('-')
+
+# Força UTF-8 por padrão
+if sys.version_info < (3, 0):
+    reload(sys)
+    sys.setdefaultencoding("utf-8")
+
+# Configurações da aplicação, lidas no primeiro acesso e gravadas pela primeira vez em inicializar_configuracoes
+gSettings = AppSettings(ARQUIVO_XML_SETTINGS)
+
+# Capacidades do ffmpeg (versão, encoders e filtros) e cache das informações dos vídeos
+gCapacidadesFfmpeg = FfmpegCapabilities(ARQUIVO_CACHE_FFMPEG)
+gCacheMetadados = MetadataCache(ARQUIVO_CACHE_METADADOS)
+gCacheSaidas = OutputCache(ARQUIVO_CACHE_SAIDAS)
+gJournal = JobJournal(ARQUIVO_JOURNAL)
+gIndiceKeyframes = KeyframeIndexCache(DIR_CACHE_KEYFRAMES, TAMANHO_CACHE_KEYFRAMES, TAMANHO_MEMORIA_INDICES_KEYFRAMES)
+gCacheMiniaturas = FileCache(DIR_CACHE_MINIATURAS, ".jpg", TAMANHO_CACHE_MINIATURAS)
+gCacheVetores = FileCache(DIR_CACHE_VETORES, ".trf", TAMANHO_CACHE_VETORES)
+
+# Codecs de Video
+VIDEO_H265 = "Video H265"
+VIDEO_H264 = "Video H264"
+VIDEO_VP8 = "Video VP8"
+VIDEO_VP9 = "Video VP9"
+
+# Modos de conversão de vídeos
+MODO_CONVERSAO_NORMAL = "Converter cada arquivo em um único processo"
+MODO_CONVERSAO_SEGMENTOS = "Dividir cada arquivo em segmentos convertidos em paralelo"
+
+# Rotações: descrição, filtro do ffmpeg, se a largura e a altura do vídeo são invertidas e o ângulo (no sentido
+# anti-horário) equivalente nos metadados de rotação, ou None se a rotação não puder ser aplicada pelos metadados
+ROTACOES = [("90 Graus sentido horário", "transpose=1", True, -90),
+            ("90 Graus sentido anti-horário", "transpose=2", True, 90),
+            ("180 Graus", "transpose=2,transpose=2", False, 180),
+            ("90 Graus sentido anti-horário com flip vertical", "transpose=0", True, None),
+            ("90 Graus sentido horário com flip vertical", "transpose=3", True, None),
+            ("Flip horizontal", "hflip", False, None),
+            ("Flip vertical", "vflip", False, None)]
+
+# Modos de rotação dos vídeos
+MODO_ROTACAO_METADADOS = "Sem recodificação (metadados de rotação)"
+MODO_ROTACAO_RECODIFICAR = "Recodificar o vídeo"
+
+# Extensões dos arquivos cuja rotação pode ser gravada nos metadados (display matrix), e nas versões antigas do ffmpeg
+# (metadado rotate)
+EXTENSOES_ROTACAO_METADADOS = (".mp4", ".m4v", ".mov", ".mkv")
+EXTENSOES_ROTACAO_METADADO_ROTATE = (".mp4", ".m4v", ".mov")
+
+# Modos de extração de intervalos
+MODO_EXTRACAO_RAPIDO = "Copiar a partir do keyframe mais próximo (rápido)"
+MODO_EXTRACAO_INTELIGENTE = "Corte inteligente (recodifica apenas as bordas)"
+MODO_EXTRACAO_PRECISO = "Recodificar todo o intervalo"
+MODOS_EXTRACAO = [MODO_EXTRACAO_RAPIDO, MODO_EXTRACAO_INTELIGENTE, MODO_EXTRACAO_PRECISO]
+
+# Encoders utilizados para recodificar trechos compatíveis com o vídeo original, de acordo com o codec
+ENCODERS_VIDEO_COMPATIVEIS = {"h264": ["-c:v", "libx264", "-crf", "18"], "hevc": ["-c:v", "libx265", "-crf", "20"],
+                              "vp8": ["-c:v", "libvpx", "-crf", "10", "-b:v", "0"], "vp9": ["-c:v", "libvpx-vp9", "-crf", "30", "-b:v", "0"]}
+ENCODERS_AUDIO_COMPATIVEIS = {"aac": ["-c:a", "aac"], "mp3": ["-c:a", "libmp3lame"], "opus": ["-c:a", "libopus"], "vorbis": ["-c:a", "libvorbis"]}
+
+# Containers da troca de formato sem recodificação (remux): sufixo do arquivo gerado, codecs ffprobe compatíveis com o
+# container para cada tipo de stream (None aceita todos), encoders dos streams incompatíveis, parâmetros da cópia de
+# cada codec de vídeo e parâmetros do container. No MP4, o índice (moov) é gravado no início do arquivo (faststart),
+# permitindo iniciar a reprodução na web antes do fim do download, e o H265 é identificado como hvc1 para os players da Apple.
+REMUX_MP4 = "MP4 (reprodução na web)"
+REMUX_MKV = "Matroska (MKV)"
+FORMATOS_REMUX = [REMUX_MP4, REMUX_MKV]
+CONTAINERS_REMUX = {
+    REMUX_MP4: {"sufixo": "_remux.mp4",
+                "codecs": {"v": ("h264", "hevc", "av1", "vp9", "mpeg4", "mpeg2video", "mpeg1video"),
+                           "a": ("aac", "mp3", "ac3", "eac3", "alac", "opus", "flac", "mp2"),
+                           "s": ("mov_text",)},
+                "encoders": {"v": ["libx264", "-crf", "18", "-pix_fmt", "yuv420p"], "a": ["aac"], "s": ["mov_text"]},
+                "copia_video": {"hevc": ["-tag:v", "hvc1"]},
+                "params": ["-movflags", "+faststart"]},
+    REMUX_MKV: {"sufixo": "_remux.mkv",
+                "codecs": {"v": None, "a": None, "s": ("subrip", "ass", "ssa", "webvtt", "hdmv_pgs_subtitle", "dvd_subtitle", "dvb_subtitle")},
+                "encoders": {"v": ["libx264", "-crf", "18"], "a": ["flac"], "s": ["srt"]},
+                "copia_video": {},
+                "params": []}}
+
+# Codecs de legendas em texto, que podem ser convertidas para o formato de legenda de outro container
+CODECS_LEGENDA_TEXTO = ("subrip", "ass", "ssa", "webvtt", "mov_text", "text")
+
+# Descrição dos tipos de stream na troca de container
+TIPOS_STREAM_REMUX = {"v": "Vídeo", "a": "Áudio", "s": "Legenda"}
+
+# Codecs de vídeo que podem ser armazenados em arquivos intermediários MPEG-TS
+CODECS_VIDEO_MPEGTS = ("h264", "hevc", "mpeg2video")
+
+# Extensões dos arquivos MPEG-TS, que podem ser concatenados pela cópia dos bytes
+EXTENSOES_MPEGTS = (".ts", ".mts", ".m2ts")
+
+# Tipos de stream de vídeo do MPEG-TS (MPEG-1, MPEG-2, MPEG-4, H264, H265 e VC-1)
+TIPOS_STREAM_VIDEO_MPEGTS = (0x01, 0x02, 0x10, 0x1b, 0x24, 0xea)
+
+# Quantidade de bytes lidos no início e no fim dos arquivos MPEG-TS para a verificação dos streams e timestamps
+TAMANHO_ANALISE_MPEGTS = 1024 * 1024
+
+# Diferença máxima (em segundos) entre o último PTS de um arquivo MPEG-TS e o primeiro PTS do arquivo seguinte
+TOLERANCIA_PTS_MPEGTS = 1.0
+
+# Tamanho dos blocos da cópia de arquivos
+TAMANHO_BLOCO_COPIA = 8 * 1024 * 1024
+
+# Modos de concatenação
+MODO_CONCATENACAO_COPIA = "Copiar sem recodificar os vídeos compatíveis"
+MODO_CONCATENACAO_RECODIFICAR = "Recodificar todos os vídeos"
+MODOS_CONCATENACAO = [MODO_CONCATENACAO_COPIA, MODO_CONCATENACAO_RECODIFICAR]
+
+# Codecs de Audio
+AUDIO_MP3 = "Extrair audio - MP3"
+AUDIO_AAC = "Extrair audio - AAC"
+AUDIO_FLAC = "Extrair audio - FLAC"
+AUDIO_OGG = "Extrair audio - Ogg Vorbis"
+
+# Imagens
+IMAGEM_MINIATURA = "Miniatura - JPEG"
+CODECS_IMAGEM = [IMAGEM_MINIATURA]
+
+# Codec do áudio de origem (nome do ffprobe) que pode ser copiado sem recodificação em cada extração de áudio
+CODECS_AUDIO_ORIGEM = {AUDIO_AAC: "aac", AUDIO_FLAC: "flac", AUDIO_MP3: "mp3", AUDIO_OGG: "vorbis"}
+
+# Encoder do ffmpeg necessário para cada codec
+ENCODERS_CODECS = {VIDEO_H264: "libx264", VIDEO_H265: "libx265", VIDEO_VP8: "libvpx", VIDEO_VP9: "libvpx-vp9", AUDIO_AAC: "aac",
+                   AUDIO_FLAC: "flac", AUDIO_MP3: "libmp3lame", AUDIO_OGG: "libvorbis", IMAGEM_MINIATURA: "mjpeg"}
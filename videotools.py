@@ -2,25 +2,32 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import, division, print_function, unicode_literals
 
-import datetime
-import time
-import math
 import os
 import re
-import subprocess
-import getopt
 import sys
+import time
+import getopt
 import logging
 
+# Início da fase atual da inicialização, utilizado para medir o tempo de cada fase (--startup-timing)
+gInicioFase = time.time()
+
+import videocli
+
+# Os comandos da linha de comando são executados sem carregar o GTK
+if len(sys.argv) > 1 and sys.argv[1] in videocli.COMANDOS:
+    sys.exit(videocli.main(sys.argv[1:]))
+
 import gi
 gi.require_version('Gtk', '3.0')
 gi.require_version('Gdk', '3.0')
-from gi.repository import Gdk, Gtk, GObject, GLib
+gi.require_version('GdkPixbuf', '2.0')
+from gi.repository import Gdk, GdkPixbuf, Gtk, GObject, GLib
+
+from threading import Thread, Lock
+from collections import OrderedDict
 
-from lxml import etree as ET
-from threading import Thread
-from glob import glob
-from distutils import spawn
+from videoengine import *  # @UnusedWildImport
 
 
 class VideoProgressDialog(Gtk.Dialog):
@@ -28,46 +35,33 @@ class VideoProgressDialog(Gtk.Dialog):
     Dialog utilizada para exibir o progresso da conversão de vídeos
     """
 
-    mustStop = False
     failed = False
-    parametrosFfmpeg = []
-    sufixoArquivo = None
-    arquivoDestino = None
     segundosTotal = 0
-    segundosConcluidos = 0
 
-    def __init__(self, parent, arquivos, titulo, params, sufixoArquivo, arquivoDestino, segundosTotal):
+    def __init__(self, parent, titulo, jobs):
         Gtk.Dialog.__init__(self, titulo, parent, 0,
                             (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL))
 
-        self.set_size_request(250, 150)
+        self.set_size_request(600, 350)
         self.set_border_width(10)
-        
-        self.lista_arquivos = arquivos
-        self.parametrosFfmpeg = params
-        self.sufixoArquivo = sufixoArquivo
-        self.arquivoDestino = arquivoDestino
-        self.segundosTotal = segundosTotal
+
+        self.jobs = jobs
+        self.segundosTotal = sum(job.duracao for job in jobs)
 
         # Container principal
         grid = Gtk.Grid()
-        grid.set_column_homogeneous(True)
-        grid.set_row_homogeneous(True)
         grid.set_column_spacing(4)
         grid.set_row_spacing(6)
 
-        # Força entrar no loop se o arquivo de destino foi especificado
-        if self.arquivoDestino is not None:
-            self.lista_arquivos = [self.arquivoDestino]
-
+        # Um mesmo vídeo pode ser processado por vários jobs
+        arquivos = set(job.origem for job in self.jobs if job.origem is not None and os.path.isfile(job.origem))
         totalBytes = 0
-        for arquivo in self.lista_arquivos:
-            if os.path.isfile(arquivo):
-                totalBytes += os.stat(arquivo).st_size
+        for arquivo in arquivos:
+            totalBytes += os.stat(arquivo).st_size
 
         # Label com o título da atividade
-        grid.attach(Gtk.Label(label="Efetuando o processamento de " + str(len(self.lista_arquivos)) +
-                              " vídeos - " + seconds_to_time(segundosTotal) + " (" + to_human_size(totalBytes) + ")", halign=Gtk.Align.START), 0, 0, 6, 1)
+        grid.attach(Gtk.Label(label="Efetuando o processamento de " + str(len(arquivos)) + " vídeos em " + str(len(self.jobs)) +
+                              " jobs - " + seconds_to_time(self.segundosTotal) + " (" + to_human_size(totalBytes) + ")", halign=Gtk.Align.START), 0, 0, 6, 1)
 
         # Progresso total
         self.progressBarTotal = Gtk.ProgressBar(show_text=True)
@@ -77,181 +71,152 @@ class VideoProgressDialog(Gtk.Dialog):
         self.labelProgressoTotal = Gtk.Label(halign=Gtk.Align.START)
         grid.attach(self.labelProgressoTotal, 0, 2, 6, 1)
 
-        # Progresso da conversão do arquivo
-        self.progressBarArquivo = Gtk.ProgressBar(show_text=True)
-        grid.attach(self.progressBarArquivo, 0, 3, 6, 1)
+        # Lista com o progresso de cada arquivo, com uma linha para cada saída dos jobs com várias saídas
+        self.storeJobs = Gtk.ListStore(str, str, int, str)
+        self.linhasJobs = []
+        for job in self.jobs:
+            for destino, estado, fracao, tamanho in job.get_progresso_saidas():  # @UnusedVariable
+                self.storeJobs.append([os.path.basename(destino), FfmpegJob.DESCRICAO_ESTADOS[estado], 0, ""])
+                self.linhasJobs.append(job)
+
+        self.treeviewJobs = Gtk.TreeView(model=self.storeJobs)
+        self.treeviewJobs.append_column(Gtk.TreeViewColumn("Destino", Gtk.CellRendererText(), text=0))
+        self.treeviewJobs.append_column(Gtk.TreeViewColumn("Estado", Gtk.CellRendererText(), text=1))
+        self.treeviewJobs.append_column(Gtk.TreeViewColumn("Progresso", Gtk.CellRendererProgress(), value=2))
+        self.treeviewJobs.append_column(Gtk.TreeViewColumn("Detalhes", Gtk.CellRendererText(), text=3))
+        self.treeviewJobs.connect("row-activated", self.do_cancela_job)
+
+        scrolledwindow = Gtk.ScrolledWindow()
+        scrolledwindow.set_hexpand(True)
+        scrolledwindow.set_vexpand(True)
+        scrolledwindow.add(self.treeviewJobs)
+        grid.attach(scrolledwindow, 0, 3, 6, 1)
 
-        # Título do arquivo
-        self.labelProgressoArquivo = Gtk.Label(halign=Gtk.Align.START)
-        grid.attach(self.labelProgressoArquivo, 0, 4, 6, 1)
+        grid.attach(Gtk.Label(label="Clique duas vezes em um arquivo para cancelar o seu processamento.", halign=Gtk.Align.START), 0, 4, 6, 1)
 
         self.get_content_area().pack_start(grid, True, True, 0)
         self.show_all()
 
-        thread = Thread(target=self.processa_videos)
-        thread.daemon = True
-        thread.start()
+        # As atualizações do progresso são agrupadas, evitando sobrecarregar o loop do GTK
+        self.progresso = ProgressAggregator(self.update_progess, get_atualizacoes_progresso())
+
+        self.scheduler = JobScheduler(self.jobs, get_qtd_jobs_paralelos(), get_qtd_jobs_io(), self.on_progresso_job, self.on_fim_jobs, gJournal.registrar)
+        self.scheduler.iniciar()
+
+    def destroy(self):
+        # Os workers ainda em execução podem notificar o progresso após a destruição da tela, essas atualizações são descartadas
+        self.progresso.parar()
+        Gtk.Dialog.destroy(self)
+
+    def on_progresso_job(self, job):  # @UnusedVariable
+        self.progresso.update()
 
-    def update_progess(self, tituloBarraTotal, tituloLabelTotal, tituloLabelAtual, progressoArquivo, progressoTotal):
-        # Atualiza os contadores do arquivo atual e progresso total
-        self.progressBarTotal.set_text(tituloBarraTotal)
-        self.labelProgressoTotal.set_text(tituloLabelTotal)
-        self.labelProgressoArquivo.set_text(tituloLabelAtual)
+    def on_fim_jobs(self):
+        self.failed = self.scheduler.get_qtd_falhas() > 0
+        self.progresso.update()
 
-        # Atualiza o progress bar da conversão do arquivo
-        self.progressBarArquivo.set_fraction(progressoArquivo)  # O processo deve ser entre 0.0 e 1.0
+        # Fecha a tela apenas se o processamento não foi interrompido pelo usuário
+        if not self.scheduler.interrompido:
+            GLib.idle_add(self.fechar)
+
+    def fechar(self):
+        if not self.progresso.parado:
+            self.close()
+        return False
+
+    def do_cancela_job(self, treeview, path, column):  # @UnusedVariable
+        job = self.linhasJobs[path.get_indices()[0]]
+        debug("Cancelando o processamento do arquivo " + job.destino)
+        self.scheduler.cancelar_job(job)
+
+    def update_progess(self):
+        segundosConcluidos = 0
+        executando = 0
+
+        # Atualiza o progresso de cada arquivo
+        idx = 0
+        for job in self.jobs:
+            segundosConcluidos += job.get_segundos_concluidos()
+            if job.estado == FfmpegJob.EXECUTANDO:
+                executando += 1
+
+            for destino, estado, fracao, tamanho in job.get_progresso_saidas():  # @UnusedVariable
+                detalhes = ""
+                if tamanho:
+                    detalhes = to_human_size(tamanho)
+                if job.atualizado:
+                    detalhes = detalhes + " - sem alterações"
+                if job.speed is not None and estado == FfmpegJob.EXECUTANDO:
+                    detalhes = detalhes + " - " + str(job.fps) + " fps, " + str(job.speed) + "x"
+
+                row = self.storeJobs[idx]
+                row[1] = FfmpegJob.DESCRICAO_ESTADOS[estado]
+                row[2] = int(fracao * 100)
+                row[3] = detalhes
+                idx += 1
+
+        # Atualiza o progresso total
+        progressoTotal = min(segundosConcluidos / self.segundosTotal, 1.0) if self.segundosTotal > 0 else 0.0
         self.progressBarTotal.set_fraction(progressoTotal)  # O processo deve ser entre 0.0 e 1.0
+        self.progressBarTotal.set_text("[" + seconds_to_time(segundosConcluidos) + " / " + seconds_to_time(self.segundosTotal) + "]")
+        self.labelProgressoTotal.set_text("Em execução: " + str(executando) + " - Concluídos: " + str(self.scheduler.get_qtd_concluidos()) + " / " + str(len(self.jobs)))
 
         return False
 
-    def processa_videos(self):
-        # Constante com os textos exibidos pelo ffmpeg
-        DURATION = "Duration:"
-        FRAME = "frame="
-        TIME = "time="
-        NA = "N/A"
-        ultimaLinha = None
 
-        global gProcessoFfmpeg
+class ProgressAggregator(object):
+    """
+    Mantém apenas o último estado do progresso e o envia ao loop do GTK no máximo N vezes por segundo,
+    utilizando uma única chamada pendente (idle ou timeout) por vez
+    """
 
-        for arquivo in self.lista_arquivos:
-            try:
-                if not os.path.isfile(arquivo) and self.arquivoDestino is None:
-                    debug("Ignorando arquivo inexistente: " + arquivo)
-                    self.failed = True
-                    continue
-
-                # Extrai a extensão do video
-                nome = os.path.basename(arquivo)
-                extensao = nome[nome.rfind(".") + 1:]
-
-                # Utilizar a extensão apenas se o sufixo não foi especificado
-                if self.sufixoArquivo is None:
-                    sufixoArquivo = extensao
-                else:
-                    sufixoArquivo = self.sufixoArquivo
-
-                # Cria o nome do arquivo de destino
-                novoArquivo =  os.path.dirname(arquivo) + os.sep + nome[:nome.rfind(".")] + sufixoArquivo
-                novoArquivo = novoArquivo.replace("${EXTENSAO}", extensao)
-                if self.arquivoDestino is not None:
-                    novoArquivo = self.arquivoDestino
-
-                # Monta os parâmetros do ffmpeg
-                args = [get_caminho_ffmpeg(), "-hide_banner"]
-                args.extend(self.parametrosFfmpeg)
-
-                # Substitui as variáveis nos parâmetros
-                for idx, val in enumerate(args):  # @UnusedVariable
-                    args[idx] = args[idx].replace("${ORIGEM}", arquivo)
-                    args[idx] = args[idx].replace("${DESTINO}", novoArquivo)
-                    args[idx] = args[idx].replace("${EXTENSAO}", extensao)
-
-                # Cria o diretório, se não existir
-                directory = os.path.dirname(novoArquivo)
-                if not os.path.exists(directory):
-                    debug("Criando o diretório " + directory)
-                    os.makedirs(directory)
-
-                # Verifica se o vídeo de destino existe
-                if os.path.isfile(novoArquivo):
-                    debug("Removendo arquivo de destino existente: " + novoArquivo)
-                    os.remove(novoArquivo)
-
-                maxSecs = 0
-                curSecs = 0
-
-                # Checa se o usuário interrompeu a conversão
-                if self.mustStop:
-                    return None
-
-                # Efetua a conversão do arquivo de video
-                debug("Executando aplicação: " + ' '.join(args))
-
-                gProcessoFfmpeg = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, universal_newlines=True)
-
-                # Inicia o processo e itera entre as linhas recebidas no stdout
-                for line in iter(gProcessoFfmpeg.stdout.readline, ''):
-                    ultimaLinha = line
-                    if DURATION in line:
-                        # Essa linha contém o tamanho total do vídeo
-                        try:
-                            if NA in line:
-                                maxSecs = self.segundosTotal
-                            else:
-                                tmp = line[line.find(DURATION):]
-                                tmp = tmp[tmp.find(" ") + 1:]
-                                tmp = tmp[0: tmp.find(".")]
-                                x = time.strptime(tmp, '%H:%M:%S')
-                                maxSecs = datetime.timedelta(hours=x.tm_hour, minutes=x.tm_min, seconds=x.tm_sec).total_seconds()
-
-                            # Estatísticas da conversão total
-                            tituloBarraTotal = "[" + seconds_to_time(self.segundosConcluidos) + " / " + seconds_to_time(self.segundosTotal) + "]"
-
-                            tituloLabelTotal = "Original: " + os.path.basename(arquivo) + " - " + seconds_to_time(maxSecs)
-                            if os.path.isfile(novoArquivo):
-                                tituloLabelTotal = tituloLabelTotal + " (" + to_human_size(os.stat(arquivo).st_size) + ")"
-
-                            progressoTotal = (self.segundosConcluidos + curSecs) / self.segundosTotal  # Percentual do progresso
-                            progressoArquivo = curSecs / maxSecs
-
-                            tituloLabelAtual = "Destino: " + os.path.basename(novoArquivo) + " - " + seconds_to_time(curSecs)
-                            if os.path.isfile(novoArquivo):
-                                tituloLabelAtual = tituloLabelAtual + " (" + to_human_size(os.stat(novoArquivo).st_size) + ")"
-
-                            # Atualiza as estatísticas do total e o nome do arquivo de destino
-                            GLib.idle_add(self.update_progess, tituloBarraTotal, tituloLabelTotal, tituloLabelAtual, progressoArquivo, progressoTotal)
-
-                        except ValueError:
-                            debug("Falha ao converter o horário: " + tmp)
-
-                    elif line.startswith(FRAME) and TIME in line:
-                        try:
-                            # Captura o tempo da conversão (timestamp)
-                            tmp = line[line.find(TIME):]
-                            tmp = tmp[tmp.find("=") + 1: tmp.find(".")]
-                            x = time.strptime(tmp, '%H:%M:%S')
-                            curSecs = datetime.timedelta(hours=x.tm_hour, minutes=x.tm_min, seconds=x.tm_sec).total_seconds()
-                        except ValueError:
-                            debug("Falha ao converter o horário: " + tmp)
-
-                    # Atualiza o progresso da conversão do arquivo de destino
-                    if curSecs > 0 and maxSecs > 0:
-                        progressoTotal = (self.segundosConcluidos + curSecs) / self.segundosTotal  # Percentual do progresso
-                        progressoArquivo = curSecs / maxSecs
-                        tituloBarraTotal = "[" + seconds_to_time(self.segundosConcluidos + curSecs) + " / " + seconds_to_time(self.segundosTotal) + "]"
-
-                        if os.path.isfile(novoArquivo):
-                            tituloLabelAtual = "Destino: " + os.path.basename(novoArquivo) + " - " + seconds_to_time(curSecs) + " (" + to_human_size(os.stat(novoArquivo).st_size) + ")"
-                        GLib.idle_add(self.update_progess, tituloBarraTotal, tituloLabelTotal, tituloLabelAtual, progressoArquivo, progressoTotal)
-
-                # Ao final do arquivo, incrementa o tempo ao tempo de concluídos
-                self.segundosConcluidos = self.segundosConcluidos + curSecs
-
-                # Finaliza o processo do ffmpeg
-                gProcessoFfmpeg.stdout.close()
-                exitCode = gProcessoFfmpeg.wait()
-                # Verifica o error code do processo
-                self.failed = self.failed or exitCode != 0
-                if self.failed:
-                    debug("Mensagem de erro: " + ultimaLinha)
-
-                if os.path.isfile(arquivo):
-                    debug("Vídeo original: " + arquivo + " (" + to_human_size(os.stat(arquivo).st_size) + ")")
-
-                if os.path.isfile(novoArquivo):
-                    debug("Vídeo processado: " + novoArquivo + " (" + to_human_size(os.stat(novoArquivo).st_size) + ")")
-
-            except Exception as e:
-                debug("Falha ao processar o arquivo de vídeo " + arquivo + " : " + str(e))
-                self.failed = True
-
-        self.close()
+    def __init__(self, callback, atualizacoesPorSegundo):
+        self.callback = callback
+        self.intervalo = 1.0 / max(1, atualizacoesPorSegundo)
+        self.lock = Lock()
+        self.estado = None
+        self.pendente = False
+        self.parado = False
+        self.ultimoEnvio = 0
+
+    def update(self, *estado):
+        with self.lock:
+            if self.parado:
+                return
+            self.estado = estado
+            if self.pendente:
+                return
+            self.pendente = True
+            espera = self.ultimoEnvio + self.intervalo - time.time()
+
+        if espera > 0:
+            GLib.timeout_add(int(espera * 1000), self.envia)
+        else:
+            GLib.idle_add(self.envia)
+
+    def envia(self):
+        with self.lock:
+            estado = self.estado
+            self.pendente = False
+            self.ultimoEnvio = time.time()
+            if self.parado:
+                return False
+
+        self.callback(*estado)
+        return False
+
+    def parar(self):
+        """
+        Descarta as atualizações pendentes e as recebidas a partir de agora (ex: após a destruição da tela)
+        """
+
+        with self.lock:
+            self.parado = True
 
 
 class ExtrairDialog(Gtk.Dialog):
     """
-    Dialog utilizada para solicitar ao usuário o tempo de início e fim que será extraído do video
+    Dialog utilizada para solicitar ao usuário os intervalos (tempo de início e fim) que serão extraídos dos vídeos
     """
 
     editInicio = None
@@ -259,11 +224,11 @@ class ExtrairDialog(Gtk.Dialog):
     duracaoVideo = None
 
     def __init__(self, parent, startPosition, duracaoVideo):
-        Gtk.Dialog.__init__(self, "Seção a ser extraída do vídeo", parent, 0,
+        Gtk.Dialog.__init__(self, "Seções a serem extraídas dos vídeos", parent, 0,
                             (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
                              Gtk.STOCK_OK, Gtk.ResponseType.OK))
 
-        self.set_size_request(350, 150)
+        self.set_size_request(450, 350)
         self.set_border_width(10)
 
         self.duracaoVideo = duracaoVideo
@@ -278,7 +243,7 @@ class ExtrairDialog(Gtk.Dialog):
         self.editInicio = Gtk.Entry()
         self.editInicio.set_text(startPosition)
         box.pack_end(self.editInicio, True, True, 0)
-        topBox.pack_start(box, True, True, 0)
+        topBox.pack_start(box, False, False, 0)
 
         # Fim
         box = Gtk.Box()
@@ -286,7 +251,34 @@ class ExtrairDialog(Gtk.Dialog):
         self.editFim = Gtk.Entry()
         self.editFim.set_text(duracaoVideo)
         box.pack_end(self.editFim, True, True, 0)
-        topBox.pack_start(box, True, True, 0)
+        topBox.pack_start(box, False, False, 0)
+
+        # Lista de intervalos, extraídos de cada vídeo em uma única leitura do arquivo
+        button = Gtk.Button(label="Adicionar intervalo à lista")
+        button.connect("clicked", self.do_adiciona_intervalo)
+        topBox.pack_start(button, False, False, 0)
+
+        self.store = Gtk.ListStore(str, str)
+        treeview = Gtk.TreeView(model=self.store)
+        treeview.append_column(Gtk.TreeViewColumn("Início", Gtk.CellRendererText(), text=0))
+        treeview.append_column(Gtk.TreeViewColumn("Fim", Gtk.CellRendererText(), text=1))
+        treeview.set_tooltip_text("Clique duas vezes em um intervalo para removê-lo da lista")
+        treeview.connect("row-activated", self.do_remove_intervalo)
+
+        scrolledwindow = Gtk.ScrolledWindow()
+        scrolledwindow.set_vexpand(True)
+        scrolledwindow.add(treeview)
+        topBox.pack_start(scrolledwindow, True, True, 0)
+
+        # Modo de extração
+        box = Gtk.Box()
+        box.pack_start(Gtk.Label(label="Modo de extração:", halign=Gtk.Align.START), True, True, 6)
+        self.comboModo = Gtk.ComboBoxText()
+        for modo in MODOS_EXTRACAO:
+            self.comboModo.append_text(modo)
+        self.comboModo.set_active(0)
+        box.pack_end(self.comboModo, True, True, 0)
+        topBox.pack_start(box, False, False, 0)
 
         self.get_content_area().pack_start(topBox, True, True, 0)
         self.show_all()
@@ -306,15 +298,29 @@ class ExtrairDialog(Gtk.Dialog):
         if time_to_seconds(start) >= time_to_seconds(end):
             return show_message('Valores inválidos:', 'O tempo final deve ser maior do que o tempo inicial.')
 
-        if time_to_seconds(start) >= time_to_seconds(self.duracaoVideo) or time_to_seconds(end) >= time_to_seconds(self.duracaoVideo):
+        if time_to_seconds(start) >= time_to_seconds(self.duracaoVideo) or time_to_seconds(end) > time_to_seconds(self.duracaoVideo):
             return show_message('Valores inválidos:', "Os valores devem ser menor do que " + self.duracaoVideo)
 
         return Gtk.ResponseType.OK
 
+    def do_adiciona_intervalo(self, widget):  # @UnusedVariable
+        if self.do_valida_campos() is not None:
+            self.store.append([self.editInicio.get_text().strip(), self.editFim.get_text().strip()])
+
+            # O próximo intervalo inicia, por padrão, no fim do intervalo adicionado
+            self.editInicio.set_text(self.editFim.get_text().strip())
+            self.editFim.set_text(self.duracaoVideo)
+
+    def do_remove_intervalo(self, treeview, path, column):  # @UnusedVariable
+        self.store.remove(self.store.get_iter(path))
+
     def show_and_get_info(self):
         while self.run() == Gtk.ResponseType.OK:
-            if self.do_valida_campos() is not None:
-                resp = {"inicio":self.editInicio.get_text().strip(), "fim":self.editFim.get_text().strip()}
+            # Sem intervalos na lista, é extraído o intervalo informado nos campos
+            if len(self.store) > 0 or self.do_valida_campos() is not None:
+                intervalos = [(row[0], row[1]) for row in self.store] or [(self.editInicio.get_text().strip(), self.editFim.get_text().strip())]
+                resp = {"intervalos": [(time_to_seconds(inicio), time_to_seconds(fim)) for inicio, fim in intervalos],
+                        "modo": self.comboModo.get_active_text()}
                 self.destroy()
                 return resp
 
@@ -402,6 +408,95 @@ class CropDialog(Gtk.Dialog):
         return None
 
 
+class TransformarDialog(Gtk.Dialog):
+    """
+    Dialog utilizado para combinar o recorte de uma região, a rotação e o redimensionamento em uma única conversão
+    """
+
+    def __init__(self, parent, width, height):
+        Gtk.Dialog.__init__(self, "Transformações do vídeo", parent, 0,
+                            (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+                             Gtk.STOCK_OK, Gtk.ResponseType.OK))
+
+        self.set_size_request(450, 250)
+        self.set_border_width(10)
+
+        debug("Solicitação das transformações do video ao usuário.")
+
+        grid = Gtk.Grid()
+        grid.set_column_spacing(6)
+        grid.set_row_spacing(6)
+
+        # Recorte
+        self.checkRecorte = Gtk.CheckButton(label="1. Extrair a região (largura, altura, posição horizontal e vertical):")
+        grid.attach(self.checkRecorte, 0, 0, 4, 1)
+
+        self.spinsRecorte = []
+        for idx, (valor, maximo) in enumerate(((width, width), (height, height), (0, width), (0, height))):
+            spin = Gtk.SpinButton()
+            spin.set_adjustment(Gtk.Adjustment(valor, 0, maximo, 10, 100, 0))
+            spin.set_numeric(True)
+            grid.attach(spin, idx, 1, 1, 1)
+            self.spinsRecorte.append(spin)
+
+        # Rotação
+        self.checkRotacao = Gtk.CheckButton(label="2. Rotacionar:")
+        grid.attach(self.checkRotacao, 0, 2, 4, 1)
+
+        self.comboRotacao = Gtk.ComboBoxText()
+        for rotacao in ROTACOES:
+            self.comboRotacao.append_text(rotacao[0])
+        self.comboRotacao.set_active(0)
+        grid.attach(self.comboRotacao, 0, 3, 4, 1)
+
+        # Redimensionamento
+        self.checkEscala = Gtk.CheckButton(label="3. Redimensionar para a resolução (ex: 1280x720, ou 1280x-2 para manter a proporção):")
+        grid.attach(self.checkEscala, 0, 4, 4, 1)
+
+        self.editEscala = Gtk.Entry()
+        self.editEscala.set_text(str(width) + "x" + str(height))
+        grid.attach(self.editEscala, 0, 5, 4, 1)
+
+        self.get_content_area().pack_start(grid, True, True, 0)
+        self.show_all()
+
+    def get_filtros(self):
+        """
+        Retorna a cadeia de filtros com as transformações selecionadas, ou None se os valores forem inválidos
+        """
+
+        filtros = VideoFilterChain()
+
+        if self.checkRecorte.get_active():
+            filtros.recortar(*[spin.get_value_as_int() for spin in self.spinsRecorte])
+
+        if self.checkRotacao.get_active():
+            filtros.rotacionar(self.comboRotacao.get_active_text())
+
+        if self.checkEscala.get_active():
+            m = re.match("^(-?[0-9]+)x(-?[0-9]+)$", self.editEscala.get_text().strip())
+            if m is None:
+                show_message("Resolução inválida", "É necessário informar uma resolução no formato 800x600.")
+                return None
+            filtros.redimensionar(int(m.group(1)), int(m.group(2)))
+
+        if filtros.is_vazio():
+            show_message('Campo obrigatório não informado:', 'É necessário selecionar ao menos uma transformação.')
+            return None
+
+        return filtros
+
+    def show_and_get_info(self):
+        while self.run() == Gtk.ResponseType.OK:
+            filtros = self.get_filtros()
+            if filtros is not None:
+                self.destroy()
+                return filtros
+
+        self.destroy()
+        return None
+
+
 class DeshakeDialog(Gtk.Dialog):
     """
     Dialog utilizado para solicitar ao usuário os parâmetros do de-shake
@@ -472,6 +567,159 @@ class DeshakeDialog(Gtk.Dialog):
         return None
 
 
+class ConverterDialog(Gtk.Dialog):
+    """
+    Dialog utilizada para selecionar os formatos de destino da conversão. Com vários formatos selecionados, cada vídeo
+    é lido e decodificado uma única vez para gerar todos os formatos.
+    """
+
+    def __init__(self, parent, formatos, selecionado):
+        Gtk.Dialog.__init__(self, "Selecione os novos formatos do video", parent, 0,
+                            (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+                             Gtk.STOCK_OK, Gtk.ResponseType.OK))
+
+        self.set_size_request(350, 150)
+        self.set_border_width(10)
+
+        topBox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+
+        self.checkFormatos = []
+        for formato in formatos:
+            check = Gtk.CheckButton(label=formato)
+            check.set_active(formato == selecionado)
+            topBox.pack_start(check, True, True, 0)
+            self.checkFormatos.append(check)
+
+        self.get_content_area().pack_start(topBox, True, True, 0)
+        self.show_all()
+
+    def show_and_get_info(self):
+        while self.run() == Gtk.ResponseType.OK:
+            formatos = [check.get_label() for check in self.checkFormatos if check.get_active()]
+            if formatos:
+                self.destroy()
+                return formatos
+
+            show_message('Campo obrigatório não informado:', 'É necessário selecionar ao menos um formato.')
+
+        self.destroy()
+        return None
+
+
+class RotacionarDialog(Gtk.Dialog):
+    """
+    Dialog utilizada para selecionar a rotação dos vídeos, exibindo se cada arquivo será rotacionado apenas pelos
+    metadados de rotação (sem recodificação) ou se será recodificado
+    """
+
+    def __init__(self, parent, arquivos):
+        Gtk.Dialog.__init__(self, "Informe a rotação que será aplicada aos vídeos", parent, 0,
+                            (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+                             Gtk.STOCK_OK, Gtk.ResponseType.OK))
+
+        self.set_size_request(600, 350)
+        self.set_border_width(10)
+        self.arquivos = arquivos
+
+        topBox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+
+        self.comboRotacao = Gtk.ComboBoxText()
+        for rotacao in ROTACOES:
+            self.comboRotacao.append_text(rotacao[0])
+        self.comboRotacao.set_active(0)
+        self.comboRotacao.connect("changed", self.do_atualiza_modos)
+        topBox.pack_start(self.comboRotacao, False, False, 0)
+
+        self.checkMetadados = Gtk.CheckButton(label="Rotacionar sem recodificar quando possível (metadados de rotação)")
+        self.checkMetadados.set_active(True)
+        self.checkMetadados.connect("toggled", self.do_atualiza_modos)
+        topBox.pack_start(self.checkMetadados, False, False, 0)
+
+        # Modo utilizado para cada arquivo
+        self.store = Gtk.ListStore(str, str)
+        treeview = Gtk.TreeView(model=self.store)
+        treeview.append_column(Gtk.TreeViewColumn("Arquivo", Gtk.CellRendererText(), text=0))
+        treeview.append_column(Gtk.TreeViewColumn("Modo", Gtk.CellRendererText(), text=1))
+
+        scrolledwindow = Gtk.ScrolledWindow()
+        scrolledwindow.set_vexpand(True)
+        scrolledwindow.add(treeview)
+        topBox.pack_start(scrolledwindow, True, True, 0)
+
+        self.get_content_area().pack_start(topBox, True, True, 0)
+        self.do_atualiza_modos(None)
+        self.show_all()
+
+    def do_atualiza_modos(self, widget):  # @UnusedVariable
+        rotacao = ROTACOES[self.comboRotacao.get_active()]
+        self.store.clear()
+        for arquivo in self.arquivos:
+            self.store.append([os.path.basename(arquivo), get_modo_rotacao(arquivo, rotacao, self.checkMetadados.get_active())])
+
+    def show_and_get_info(self):
+        resp = None
+        if self.run() == Gtk.ResponseType.OK:
+            resp = {"rotacao": ROTACOES[self.comboRotacao.get_active()], "metadados": self.checkMetadados.get_active()}
+
+        self.destroy()
+        return resp
+
+
+class RemuxDialog(Gtk.Dialog):
+    """
+    Dialog utilizada para selecionar o container da troca de formato, exibindo quais streams de cada arquivo serão
+    copiados e quais serão recodificados
+    """
+
+    def __init__(self, parent, arquivos, infos):
+        Gtk.Dialog.__init__(self, "Informe o container dos vídeos", parent, 0,
+                            (Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+                             Gtk.STOCK_OK, Gtk.ResponseType.OK))
+
+        self.set_size_request(700, 350)
+        self.set_border_width(10)
+        self.arquivos = arquivos
+        self.infos = infos
+
+        topBox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+
+        self.comboFormato = Gtk.ComboBoxText()
+        for formato in FORMATOS_REMUX:
+            self.comboFormato.append_text(formato)
+        self.comboFormato.set_active(0)
+        self.comboFormato.connect("changed", self.do_atualiza_streams)
+        topBox.pack_start(self.comboFormato, False, False, 0)
+
+        # Tratamento dos streams de cada arquivo
+        self.store = Gtk.ListStore(str, str)
+        treeview = Gtk.TreeView(model=self.store)
+        treeview.append_column(Gtk.TreeViewColumn("Arquivo", Gtk.CellRendererText(), text=0))
+        treeview.append_column(Gtk.TreeViewColumn("Streams", Gtk.CellRendererText(), text=1))
+
+        scrolledwindow = Gtk.ScrolledWindow()
+        scrolledwindow.set_vexpand(True)
+        scrolledwindow.add(treeview)
+        topBox.pack_start(scrolledwindow, True, True, 0)
+
+        self.get_content_area().pack_start(topBox, True, True, 0)
+        self.do_atualiza_streams(None)
+        self.show_all()
+
+    def do_atualiza_streams(self, widget):  # @UnusedVariable
+        formato = FORMATOS_REMUX[self.comboFormato.get_active()]
+        self.store.clear()
+        for arquivo in self.arquivos:
+            self.store.append([os.path.basename(arquivo), get_descricao_remux(self.infos.get(arquivo), formato)])
+
+    def show_and_get_info(self):
+        resp = None
+        if self.run() == Gtk.ResponseType.OK:
+            resp = FORMATOS_REMUX[self.comboFormato.get_active()]
+
+        self.destroy()
+        return resp
+
+
 class InputDialog(Gtk.Dialog):
     """
     Dialog de solicitação de dados em um campo de texto ou combo
@@ -570,13 +818,25 @@ class ConcatenarDialog(Gtk.Dialog):
         flowbox.add(Gtk.Label(label="Codec do novo arquivo:", halign=Gtk.Align.START))
 
         self.comboCodec = Gtk.ComboBoxText()
-        for codec in CODECS_VIDEO:
+        for codec in get_codecs_video():
             self.comboCodec.append_text(codec)
         self.comboCodec.set_active(0)
         flowbox.add(self.comboCodec)
 
         self.grid.attach(flowbox, 0, 7, 3, 1)
 
+        # Modo de concatenação
+        flowbox = Gtk.FlowBox()
+        flowbox.add(Gtk.Label(label="Modo:", halign=Gtk.Align.START))
+
+        self.comboModo = Gtk.ComboBoxText()
+        for modo in MODOS_CONCATENACAO:
+            self.comboModo.append_text(modo)
+        self.comboModo.set_active(0)
+        flowbox.add(self.comboModo)
+
+        self.grid.attach(flowbox, 3, 7, 3, 1)
+
         # Arquivo de destino
         box = Gtk.Box()
         box.pack_start(Gtk.Label(label="Arquivo a ser gerado:", halign=Gtk.Align.START), False, False, 4)
@@ -599,9 +859,11 @@ class ConcatenarDialog(Gtk.Dialog):
                 text = buf.get_text(buf.get_start_iter(),
                         buf.get_end_iter(),
                         True)
-                open(ARQUIVO_VIDEOS_CONCATENA, 'w').write(text)
+                # Lista dos arquivos, na ordem informada pelo usuário
+                arquivos = [linha[5:].strip().strip("'") for linha in text.splitlines() if linha.startswith("file ")]
 
-                resp = {"destino":self.editArquivoDestino.get_text(), "codec":self.comboCodec.get_active_text()}
+                resp = {"destino":self.editArquivoDestino.get_text(), "codec":self.comboCodec.get_active_text(),
+                        "modo":self.comboModo.get_active_text(), "arquivos":arquivos}
                 self.destroy()
 
                 return resp
@@ -645,8 +907,15 @@ class LogViewerDialog(Gtk.Dialog):
 
 class MainWindow(Gtk.Window):
     COLUNAS_GRID = ["Processar", "Arquivo", "Tamanho", "Detalhes"]
+
+    # Colunas ocultas da grid, com os valores já convertidos de cada vídeo
+    COLUNA_BYTES = 4
+    COLUNA_DURACAO = 5
+    COLUNA_INFO = 6
+    COLUNA_ARQUIVO = 7
     listaBotoes = []
     popupMenu = Gtk.Menu()
+    geracaoLeitura = 0
 
     def __init__(self):
         Gtk.Window.__init__(self, title="Video Tools - " + VERSAO_APLICACAO)
@@ -687,45 +956,59 @@ class MainWindow(Gtk.Window):
         self.buttonLerArquivos = self.create_icon_and_label_button("Atualizar", "view-refresh", False, self.do_load_file_list)
         grid.attach(self.buttonLerArquivos, 6, 1, 1, 1)
 
+        # Reprocessar os arquivos cujas saídas estão atualizadas
+        self.checkForcar = Gtk.CheckButton(label="Reprocessar tudo")
+        self.checkForcar.set_tooltip_text("Gera novamente os arquivos já gerados com os mesmos vídeos e parâmetros")
+        grid.attach(self.checkForcar, 6, 2, 1, 1)
+
         # Converter
         self.buttonConvert = self.create_icon_and_label_button("Converter", "video-x-generic", True, self.do_video_convert)
         grid.attach(self.buttonConvert, 6, 3, 1, 1)
 
+        # Trocar o container sem recodificar
+        self.buttonRemux = self.create_icon_and_label_button("Remux", "document-save-as", True, self.do_video_remux)
+        self.buttonRemux.set_tooltip_text("Troca o container dos vídeos copiando os streams, recodificando apenas os streams incompatíveis")
+        grid.attach(self.buttonRemux, 6, 4, 1, 1)
+
         # Redimensionar
         self.buttonResize = self.create_icon_and_label_button("Redimensionar", "view-restore", True, self.do_video_resize)
-        grid.attach(self.buttonResize, 6, 4, 1, 1)
+        grid.attach(self.buttonResize, 6, 5, 1, 1)
 
         # Rotacionar
         self.buttonRotate = self.create_icon_and_label_button("Rotacionar", "object-rotate-left", True, self.do_video_rotate)
-        grid.attach(self.buttonRotate, 6, 5, 1, 1)
+        grid.attach(self.buttonRotate, 6, 6, 1, 1)
 
         # Extrair intervalo
         self.buttonExtractInterval = self.create_icon_and_label_button("Extrair intervalo", "appointment-soon", True, self.do_video_extract_interval)
-        grid.attach(self.buttonExtractInterval, 6, 6, 1, 1)
+        grid.attach(self.buttonExtractInterval, 6, 7, 1, 1)
 
         # Extrair seção
         self.buttonExtractSection = self.create_icon_and_label_button("Extrair Região", "object-flip-horizontal", True, self.do_video_extract_region)
-        grid.attach(self.buttonExtractSection, 6, 7, 1, 1)
+        grid.attach(self.buttonExtractSection, 6, 8, 1, 1)
 
         # Concatenar
         self.buttonConcatenate = self.create_icon_and_label_button("Concatenar", "list-add", True, self.do_video_concatenate)
-        grid.attach(self.buttonConcatenate, 6, 8, 1, 1)
+        grid.attach(self.buttonConcatenate, 6, 9, 1, 1)
+
+        # Estabilizar, exibido apenas após a detecção do filtro vidstab no ffmpeg
+        self.buttonDeshake = self.create_icon_and_label_button("Estabilizar", "media-playlist-shuffle", True, self.do_video_deshake)
+        self.buttonDeshake.set_no_show_all(True)
+        grid.attach(self.buttonDeshake, 6, 10, 1, 1)
 
-        # Estabilizar
-        if "--enable-libvidstab" in get_ffmpeg_features():
-            self.buttonDeshake = self.create_icon_and_label_button("Estabilizar", "media-playlist-shuffle", True, self.do_video_deshake)
-            grid.attach(self.buttonDeshake, 6, 9, 1, 1)
+        # Transformações combinadas
+        self.buttonTransform = self.create_icon_and_label_button("Transformar", "applications-graphics", True, self.do_video_transform)
+        grid.attach(self.buttonTransform, 6, 11, 1, 1)
 
         # Logs
-        grid.attach(self.create_icon_and_label_button("Logs", "system-search", False, self.do_click_logs), 6, 11, 1, 1)
+        grid.attach(self.create_icon_and_label_button("Logs", "system-search", False, self.do_click_logs), 6, 12, 1, 1)
 
         # Sair
-        grid.attach(self.create_icon_and_label_button("Fechar", "window-close", False, self.do_click_close), 6, 12, 1, 1)
+        grid.attach(self.create_icon_and_label_button("Fechar", "window-close", False, self.do_click_close), 6, 13, 1, 1)
 
         # grid de arquivos
 
         # Cria o grid
-        self.store = Gtk.ListStore(bool, str, str, str)
+        self.store = Gtk.ListStore(bool, str, str, str, GObject.TYPE_INT64, float, GObject.TYPE_PYOBJECT, str)
 
         self.filtro = self.store.filter_new()
         # self.filtro.set_visible_func(self.do_filter_grid)
@@ -740,6 +1023,16 @@ class MainWindow(Gtk.Window):
         col1.set_sort_column_id(0)
         self.treeview.append_column(col1)
 
+        # As miniaturas são solicitadas apenas para as linhas visíveis, após a rolagem ou a alteração da lista
+        self.miniaturas = OrderedDict()
+        self.timerMiniaturas = None
+        self.geradorMiniaturas = ThumbnailGenerator(gCacheMiniaturas, QTD_THREADS_MINIATURAS, TAMANHO_FILA_MINIATURAS, self.notificar_miniatura)
+        rendererMiniatura = Gtk.CellRendererPixbuf()
+        rendererMiniatura.set_fixed_size(LARGURA_MINIATURA, ALTURA_MINIATURA)
+        colMiniatura = Gtk.TreeViewColumn("Miniatura", rendererMiniatura)
+        colMiniatura.set_cell_data_func(rendererMiniatura, self.do_exibe_miniatura)
+        self.treeview.append_column(colMiniatura)
+
         # Adiciona as demais COLUNAS_GRID
         for i, column_title in enumerate(self.COLUNAS_GRID):
             column = Gtk.TreeViewColumn(column_title, cellRenderer, text=i)
@@ -748,17 +1041,25 @@ class MainWindow(Gtk.Window):
             self.store.set_sort_func(i, compareTreeItem, None)
             column.set_sort_column_id(i)
 
+        # O tamanho é ordenado pela quantidade de bytes e não pelo texto exibido
+        self.treeview.get_column(3).set_sort_column_id(self.COLUNA_BYTES)
+
         self.treeview.connect("row-activated", self.on_tree_double_clicked)
 
         # Adiciona o treeview a um scrollwindow
         scrollableTreelist = Gtk.ScrolledWindow()
         scrollableTreelist.set_vexpand(True)
         scrollableTreelist.add(self.treeview)
-        grid.attach(scrollableTreelist, 0, 1, 6, 12)
+        grid.attach(scrollableTreelist, 0, 1, 6, 13)
+
+        # As linhas visíveis mudam com a rolagem, o redimensionamento da janela e a ordenação da lista
+        scrollableTreelist.get_vadjustment().connect("value-changed", self.agendar_miniaturas)
+        self.treeview.connect("size-allocate", self.agendar_miniaturas)
+        self.store.connect("rows-reordered", self.agendar_miniaturas)
 
         # Label de seleção dos arquivos
         self.label_status_copia = Gtk.Label(label="", halign=Gtk.Align.START)
-        grid.attach(self.label_status_copia, 0, 13, 7, 1)
+        grid.attach(self.label_status_copia, 0, 14, 7, 1)
 
         self.add(grid)
         self.do_atualiza_contador_selecao()
@@ -778,6 +1079,20 @@ class MainWindow(Gtk.Window):
 
         self.popupMenu.show_all()
 
+    def do_capacidades_detectadas(self):
+        """
+        Atualiza a janela ao final da detecção das capacidades do ffmpeg, executada em background
+        """
+
+        registrar_tempo_inicializacao("Detecção das capacidades do ffmpeg em background (" +
+                                      ("cache" if gCapacidadesFfmpeg.lidoDoCache else "ffmpeg") + ")", gCapacidadesFfmpeg.tempoDeteccao)
+        self.buttonDeshake.set_visible(is_filtro_disponivel("vidstabdetect"))
+        return False
+
+    def do_janela_exibida(self):
+        registrar_tempo_inicializacao("Exibição da janela")
+        return False
+
     def do_show_popup(self, tv, event):  # @UnusedVariable
         if event.button == 3:
             self.popupMenu.popup(None, None, None, None, 0, Gtk.get_current_event_time())
@@ -799,7 +1114,7 @@ class MainWindow(Gtk.Window):
     def do_marcar_nao_h265(self, widget):  # @UnusedVariable
         debug("MenuItem: Marcar videos não H265")
         for row in self.store:
-            if 'hevc' not in row[3]:
+            if row[self.COLUNA_INFO].video_codec != 'hevc':
                 row[0] = True
 
         self.do_atualiza_contador_selecao()
@@ -839,67 +1154,58 @@ class MainWindow(Gtk.Window):
         dialog.destroy()
 
     def do_video_convert(self, widget):  # @UnusedVariable
-        nome_codec = InputDialog(gMainWindow, 'Selecione o novo formato do video', VIDEO_H265, '|'.join(CODECS_VIDEO) + "|" + '|'.join(CODECS_AUDIO)).show_and_get_info()
-        if nome_codec is not None:
-            codec = get_codec_info(nome_codec)
-            sufixoArquivo = codec["sufixo"]
-
-            params = ["-i", "${ORIGEM}"]
-            params.extend(codec["params"])
-            params.append("${DESTINO}")
-
-            arquivos = self.listar_arquivos_selecionados()
-            segundosTotal = self.obter_total_segundos()
-
-            self.executa_ffmpeg("Conversão dos videos para o formato " + nome_codec, params, arquivos, segundosTotal, sufixoArquivo, None, True)
+        formatos = ConverterDialog(gMainWindow, get_codecs_video() + get_codecs_audio() + CODECS_IMAGEM, VIDEO_H265).show_and_get_info()
+        if formatos is None:
+            return
+
+        # Vídeos convertidos para um único formato podem ser divididos em segmentos convertidos em paralelo
+        modo = MODO_CONVERSAO_NORMAL
+        if len(formatos) == 1 and formatos[0] in get_codecs_video():
+            modo = InputDialog(gMainWindow, 'Selecione o modo de conversão', MODO_CONVERSAO_NORMAL, MODO_CONVERSAO_NORMAL + "|" + MODO_CONVERSAO_SEGMENTOS).show_and_get_info()
+            if modo is None:
+                return
+
+        titulo = "Conversão dos videos para o formato " + ", ".join(formatos)
+        if modo == MODO_CONVERSAO_SEGMENTOS:
+            titulo = "Conversão dos videos em segmentos para o formato " + formatos[0]
+
+        arquivos = self.listar_arquivos_selecionados()
+        jobs = criar_jobs_conversao(formatos, arquivos, self.obter_infos(arquivos), modo)
+        self.executa_jobs(titulo, jobs, True)
+
+    def do_video_remux(self, widget):  # @UnusedVariable
+        arquivos = self.listar_arquivos_selecionados()
+        infos = self.obter_infos(arquivos)
+
+        # Apenas os streams incompatíveis com o container são recodificados
+        formato = RemuxDialog(gMainWindow, arquivos, infos).show_and_get_info()
+        if formato is not None:
+            self.executa_jobs("Trocando o container dos vídeos para " + formato, criar_jobs_remux(arquivos, infos, formato), True)
 
     def do_video_concatenate(self, widget):  # @UnusedVariable
-
-        # Remove o arquivo temporário da lista de arquivos
-        if os.path.isfile(ARQUIVO_VIDEOS_CONCATENA):
-            os.remove(ARQUIVO_VIDEOS_CONCATENA)
-
         info = ConcatenarDialog(gMainWindow, self.listar_arquivos_selecionados(), self.editOrigem.get_text()).show_and_get_info()
         if info is not None:
-            aquivoDestino = info["destino"]
-            codec = get_codec_info(info["codec"])
+            arquivos = info["arquivos"]
 
-            params = ["-f", "concat", "-safe", "0", "-i", ARQUIVO_VIDEOS_CONCATENA]
-            params.extend(codec["params"])
-            params.append("${DESTINO}")
-
-            print(str(params))
-            segundosTotal = self.obter_total_segundos()
-            self.executa_ffmpeg("Concatenação de vídeos", params, None, segundosTotal, None, aquivoDestino, True)
+            # Copia os streams quando os vídeos forem compatíveis, recodificando apenas os vídeos diferentes
+            jobs = criar_jobs_concatenacao(arquivos, self.obter_infos(arquivos), info["destino"], get_codec_info(info["codec"]), info["modo"])
+            self.executa_jobs("Concatenação de vídeos", jobs, True)
 
         # Remove o arquivo temporário da lista de arquivos
         if os.path.isfile(ARQUIVO_VIDEOS_CONCATENA):
             os.remove(ARQUIVO_VIDEOS_CONCATENA)
 
     def do_video_extract_interval(self, widget):  # @UnusedVariable
-        listaArquivosSelecionados = self.listar_arquivos_selecionados()
+        arquivos = self.listar_arquivos_selecionados()
 
-        if len(listaArquivosSelecionados) is not 1:
-            return show_message("Falha na seleção de arquivos", "Essa operação só é permitida para um arquivo por vez.")
-
-        # Localiza o tamanho total do video selecionado
-        for row in self.store:
-            if row[0]:
-                duracaoVideo = row[3][10:18]
+        # Os intervalos podem ser informados até o fim do vídeo mais longo
+        duracaoVideo = seconds_to_time(max([row[self.COLUNA_DURACAO] for row in self.store if row[0]] or [0]))
 
         info = ExtrairDialog(gMainWindow, "00:00:00", duracaoVideo).show_and_get_info()
         if info is not None:
-            ini = info["inicio"]
-            fim = info["fim"]
-
-            temp = seconds_to_time(time_to_seconds(fim) - time_to_seconds(ini))
-
-            params = ["-i", "${ORIGEM}", "-ss", ini, "-t", temp, "-strict", "-2", "${DESTINO}"]
-
-            listaArquivosSelecionados = self.listar_arquivos_selecionados()
-            segundosTotal = self.obter_total_segundos()
-
-            self.executa_ffmpeg("Extrair um intervalo do vídeo", params, listaArquivosSelecionados, segundosTotal, "_section.${EXTENSAO}", None, True)
+            # Os intervalos de cada vídeo são extraídos em uma única leitura; o corte inteligente recodifica apenas as bordas
+            jobs = criar_jobs_extracao_intervalos(arquivos, self.obter_infos(arquivos), info["intervalos"], info["modo"])
+            self.executa_jobs("Extrair intervalos dos vídeos", jobs, True)
 
     def do_video_extract_region(self, widget):  # @UnusedVariable
         listaArquivosSelecionados = self.listar_arquivos_selecionados()
@@ -913,11 +1219,10 @@ class MainWindow(Gtk.Window):
         # Localiza a resolução do video selecionado
         for row in self.store:
             if row[0]:
-                m = re.search("([0-9]{2,}x[0-9]{2,})", row[3])
-                if m is not None:
-                    temp = m.group(0)
-                    width = temp[:temp.find("x")]
-                    height = temp[temp.find("x") + 1:]
+                info = row[self.COLUNA_INFO]
+                if info.get_resolucao() is not None:
+                    width = info.width
+                    height = info.height
                     break
 
         info = CropDialog(gMainWindow, int(width), int(height)).show_and_get_info()
@@ -926,9 +1231,8 @@ class MainWindow(Gtk.Window):
             params = ["-i", "${ORIGEM}", "-vf", "crop=" + str(info["w"]) + ":" + str(info["h"]) + ":" + str(info["x"]) + ":" + str(info["y"]), "-strict", "-2", "${DESTINO}"]
 
             listaArquivosSelecionados = self.listar_arquivos_selecionados()
-            segundosTotal = self.obter_total_segundos()
 
-            self.executa_ffmpeg("Extraindo a região do vídeo", params, listaArquivosSelecionados, segundosTotal, "_cropped.${EXTENSAO}", None, True)
+            self.executa_ffmpeg("Extraindo a região do vídeo", params, listaArquivosSelecionados, "_cropped.${EXTENSAO}", None, True)
 
     def do_video_deshake(self, widget):  # @UnusedVariable
         info = DeshakeDialog(gMainWindow).show_and_get_info()
@@ -936,31 +1240,21 @@ class MainWindow(Gtk.Window):
             intensity = info["intensity"]
             zoom = info["zoom"]
 
-            vetores = self.editOrigem.get_text() + os.sep + "transform_vectors.trf"
-
-            listaArquivosSelecionados = self.listar_arquivos_selecionados()
-            segundosTotal = self.obter_total_segundos()
-
-            # Step 1. Calculating the stabilization vectors.
-            params = ["-i", "${ORIGEM}", "-vf", "vidstabdetect=stepsize=6:shakiness=" + str(intensity) + ":result=" + vetores, "-f", "null", "-"]
-            self.executa_ffmpeg("Calculando vetores de estabilização", params, listaArquivosSelecionados, segundosTotal, None , None, False)
-
-            # Step 2. Transcoding the video with the data from Step 1 into a nice and smooth output video file.
-            params = ["-i", "${ORIGEM}", "-vf", "vidstabtransform=input=" + vetores + ":zoom=" + str(zoom) + ":smoothing=30,unsharp=5:5:0.8:3:3:0.4", "-strict", "-2", "${DESTINO}"]
-            self.executa_ffmpeg("Estabilizando o video", params, listaArquivosSelecionados, segundosTotal, "_stab.${EXTENSAO}" , None, True)
+            # Cada arquivo possui os seus vetores, e a análise de um arquivo é executada em paralelo com a estabilização de outro
+            jobs = criar_jobs_estabilizacao(self.listar_arquivos_selecionados(), intensity, zoom, self.obter_duracoes())
+            self.executa_jobs("Estabilizando o video", jobs, True)
 
     def do_video_resize(self, widget):  # @UnusedVariable
         width = 1280
         height = 720
 
-        # Localiza o tamanho total do video selecionado
+        # Localiza a resolução do primeiro video selecionado
         for row in self.store:
             if row[0]:
-                m = re.search("([0-9]{2,}x[0-9]{2,})", row[3])
-                if m is not None:
-                    temp = m.group(0)
-                    width = temp[:temp.find("x")]
-                    height = temp[temp.find("x") + 1:]
+                info = row[self.COLUNA_INFO]
+                if info.get_resolucao() is not None:
+                    width = info.width
+                    height = info.height
                     break
 
         info = InputDialog(gMainWindow, 'Informe a nova resolução do vídeo', str(width) + "x" + str(height), None).show_and_get_info()
@@ -972,87 +1266,157 @@ class MainWindow(Gtk.Window):
             width = info[:info.find("x")]
             height = info[info.find("x") + 1:]
 
-            params = ["-i", "${ORIGEM}", "-vf", "scale=w=" + width + ":h=" + height + "", "-q:a", "0", "-q:v", "0", "-strict", "-2", "${DESTINO}"]
-
-            listaArquivosSelecionados = self.listar_arquivos_selecionados()
-            segundosTotal = self.obter_total_segundos()
-
-            self.executa_ffmpeg("Recortar uma região do vídeo", params, listaArquivosSelecionados, segundosTotal, "_resized.${EXTENSAO}", None, True)
+            jobs = criar_jobs_redimensionamento(self.listar_arquivos_selecionados(), width, height, self.obter_duracoes())
+            self.executa_jobs("Recortar uma região do vídeo", jobs, True)
 
     def do_video_rotate(self, widget):  # @UnusedVariable
+        arquivos = self.listar_arquivos_selecionados()
 
-        opcoes = ["90 Graus sentido horário", "90 Graus sentido anti-horário", "180 Graus", "90 Graus sentido anti-horário com flip vertical", "90 Graus sentido horário com flip vertical", "Flip horizontal", "Flip vertical"]
-        filtro = ["transpose=1", "transpose=2", "transpose=2,transpose=2", "transpose=0", "transpose=3", "hflip", "vflip"]
-
-        info = InputDialog(gMainWindow, 'Informe a rotação que será aplicada aos vídeos', opcoes[0], "|".join(opcoes)).show_and_get_info()
+        # As rotações de 90 e 180 graus podem ser aplicadas apenas pelos metadados, sem recodificar o vídeo
+        info = RotacionarDialog(gMainWindow, arquivos).show_and_get_info()
         if info is not None:
-            for idx, item in enumerate(opcoes):
-                if item == info:
-                    params = ["-i", "${ORIGEM}", "-vf", filtro[idx], "-q:a", "0", "-q:v", "0", "-strict", "-2", "${DESTINO}"]
+            jobs = criar_jobs_rotacao(arquivos, info["rotacao"], self.obter_infos(arquivos), info["metadados"])
+            self.executa_jobs("Rotacionando o arquivo de vídeo", jobs, True)
 
-            listaArquivosSelecionados = self.listar_arquivos_selecionados()
-            segundosTotal = self.obter_total_segundos()
+    def do_video_transform(self, widget):  # @UnusedVariable
+        width = 1280
+        height = 720
 
-            self.executa_ffmpeg("Rotacionando o arquivo de vídeo", params, listaArquivosSelecionados, segundosTotal, "_rotated.${EXTENSAO}", None, True)
+        # Localiza a resolução do primeiro video selecionado
+        infos = {}
+        for row in self.store:
+            if row[0]:
+                infos[self.editOrigem.get_text() + os.sep + row[1]] = row[self.COLUNA_INFO]
+                if len(infos) == 1 and row[self.COLUNA_INFO] is not None and row[self.COLUNA_INFO].get_resolucao() is not None:
+                    width = row[self.COLUNA_INFO].width
+                    height = row[self.COLUNA_INFO].height
 
-    def do_load_file_list(self, widget):  # @UnusedVariable
-        global gListaArquivosOrigem
-        # Monta a lista de arquivos
-        gListaArquivosOrigem = [y for x in os.walk(self.editOrigem.get_text()) for y in glob(os.path.join(x[0], '*.*'))]
-        tamanho = 0
-        for arquivo in gListaArquivosOrigem:
-            tamanho = tamanho + os.stat(arquivo).st_size  # in bytes
+        filtros = TransformarDialog(gMainWindow, width, height).show_and_get_info()
+        if filtros is not None:
+            # Valida a cadeia de filtros com a resolução de cada vídeo antes de iniciar a conversão
+            for arquivo, info in infos.items():
+                erro = filtros.validar(info.width, info.height) if info is not None else "Resolução do vídeo desconhecida"
+                if erro is not None:
+                    return show_message("Transformação inválida", os.path.basename(arquivo) + ": " + erro)
+
+            params = ["-i", "${ORIGEM}", "-vf", filtros.get_filtro(), "-q:a", "0", "-q:v", "0", "-strict", "-2", "${DESTINO}"]
 
-        debug("Arquivos no diretório de origem: " + str(len(gListaArquivosOrigem)) + " (" + to_human_size(tamanho) + ")")
-        debug("Consulta da lista de arquivos de origem concluída, preenchendo a grid de arquivos")
+            self.executa_ffmpeg("Transformando o vídeo", params, self.listar_arquivos_selecionados(), "_transformed.${EXTENSAO}", None, True)
 
+    def do_load_file_list(self, widget):  # @UnusedVariable
+        # Uma nova leitura invalida os resultados de leituras anteriores ainda em andamento
+        self.geracaoLeitura += 1
         self.store.clear()
-        posSrc = len(self.editOrigem.get_text()) + 1
-        for arquivo in gListaArquivosOrigem:
-
-            if self.is_video(arquivo) and os.stat(arquivo).st_size > 0:
-                detalhe = self.get_file_info(arquivo)
-                if detalhe:
-                    processar = False
-                    tamanho = to_human_size(os.stat(arquivo).st_size)
-                    arquivoAbr = arquivo[posSrc:]
-
-                    self.store.insert(0, [
-                        processar ,
-                        arquivoAbr,
-                        tamanho,
-                        detalhe
-                    ])
-
-        # Atualiza o contador
+        self.geradorMiniaturas.limpar()
+        self.buttonLerArquivos.set_sensitive(False)
         self.do_atualiza_contador_selecao()
-        debug("Grid de arquivos preenchida")
 
-    def get_file_info(self, arquivo):
-        pattern = re.compile("(Duration: [0-9]{2,}:[0-9]{2,}:[0-9]{2,})|(Video: [^\s]+)|([0-9]{2,}x[0-9]{2,})|([0-9|.]+ fps)|(Audio: [^\s]+)|([0-9]+ Hz)")
-        args = [get_caminho_ffmpeg(), "-hide_banner", "-i", arquivo]
+        thread = Thread(target=self.carrega_arquivos, args=(self.geracaoLeitura, self.editOrigem.get_text()))
+        thread.daemon = True
+        thread.start()
 
-        global gProcessoFfmpeg
-        gProcessoFfmpeg = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, universal_newlines=True)
+    def carrega_arquivos(self, geracao, diretorio):
+        """
+        Lê os arquivos do diretório em background, analisando os vídeos em paralelo e enviando as linhas para a grid em lotes
+        """
 
-        lines = ""
-        # Inicia o processo e concatena as linhas do output
-        for line in iter(gProcessoFfmpeg.stdout.readline, ''):
+        posSrc = len(diretorio) + 1
+        lote = []
+        ultimoEnvio = [time.time()]
+        lockLote = Lock()
 
-            # Considera apenas as linhas essenciais
-            if line.find("Stream #0") or line.find(" Duration:"):
-                lines = lines + line
+        def cancelado():
+            return geracao != self.geracaoLeitura
 
-        # Recupera o texto dos grupos da Regex
-        resp = ""
-        for m in pattern.finditer(lines):
-            resp = resp + m.group() + " "
+        def adiciona_linha(arquivo, stat, info):
+            with lockLote:
+                if info is not None:
+                    lote.append([False, arquivo[posSrc:], to_human_size(stat.st_size), info.get_descricao(), stat.st_size, info.duration, info, arquivo])
 
-        # Finaliza o processo do ffmpeg
-        gProcessoFfmpeg.stdout.close()
-        gProcessoFfmpeg.wait()
+                # Envia as linhas para a grid em lotes, evitando sobrecarregar o loop do GTK
+                if len(lote) >= TAMANHO_LOTE_GRID or time.time() - ultimoEnvio[0] >= INTERVALO_LOTE_GRID:
+                    GLib.idle_add(self.do_adiciona_linhas, geracao, list(lote))
+                    del lote[:]
+                    ultimoEnvio[0] = time.time()
 
-        return resp
+        if not analisar_diretorio(diretorio, adiciona_linha, cancelado):
+            return
+
+        with lockLote:
+            GLib.idle_add(self.do_adiciona_linhas, geracao, list(lote))
+        GLib.idle_add(self.do_finaliza_leitura, geracao)
+
+    def do_adiciona_linhas(self, geracao, linhas):
+        if geracao == self.geracaoLeitura:
+            for linha in linhas:
+                self.store.insert(0, linha)
+            self.do_atualiza_contador_selecao()
+            self.agendar_miniaturas()
+
+        return False
+
+    def do_finaliza_leitura(self, geracao):
+        if geracao == self.geracaoLeitura:
+            self.buttonLerArquivos.set_sensitive(True)
+            self.do_atualiza_contador_selecao()
+            debug("Grid de arquivos preenchida")
+
+        return False
+
+    def do_exibe_miniatura(self, column, cell, model, treeiter, data):  # @UnusedVariable
+        # O GTK executa essa função também para as linhas fora da tela, que apenas exibem as miniaturas já carregadas.
+        # Os arquivos cujas miniaturas não puderam ser geradas são registrados com False.
+        cell.set_property("pixbuf", self.miniaturas.get(model.get_value(treeiter, self.COLUNA_ARQUIVO)) or None)
+
+    def agendar_miniaturas(self, *args):  # @UnusedVariable
+        # Agrupa as solicitações durante a rolagem da lista
+        if self.timerMiniaturas is None:
+            self.timerMiniaturas = GLib.timeout_add(INTERVALO_SOLICITACAO_MINIATURAS, self.do_solicita_miniaturas)
+
+    def do_solicita_miniaturas(self):
+        """
+        Solicita as miniaturas das linhas visíveis que ainda não foram carregadas
+        """
+
+        self.timerMiniaturas = None
+        intervalo = self.treeview.get_visible_range()
+        if not intervalo:
+            return False
+
+        inicio, fim = intervalo[-2:]
+        itens = []
+        for pos in range(inicio.get_indices()[0], fim.get_indices()[0] + 1):
+            row = self.store[pos]
+            arquivo = row[self.COLUNA_ARQUIVO]
+            miniatura = self.miniaturas.pop(arquivo, None)
+            if miniatura is not None:
+                self.miniaturas[arquivo] = miniatura
+            else:
+                itens.append((arquivo, row[self.COLUNA_DURACAO]))
+
+        self.geradorMiniaturas.solicitar(itens)
+        return False
+
+    def notificar_miniatura(self, arquivo, caminho):
+        """
+        Carrega a miniatura gerada, executado nas threads de geração das miniaturas
+        """
+
+        pixbuf = None
+        if caminho is not None:
+            try:
+                pixbuf = GdkPixbuf.Pixbuf.new_from_file(caminho)
+            except GLib.Error as e:
+                debug("Falha ao carregar a miniatura " + caminho + " : " + str(e))
+        GLib.idle_add(self.do_miniatura_gerada, arquivo, pixbuf)
+
+    def do_miniatura_gerada(self, arquivo, pixbuf):
+        self.miniaturas[arquivo] = pixbuf if pixbuf is not None else False
+        while len(self.miniaturas) > TAMANHO_MEMORIA_MINIATURAS:
+            self.miniaturas.popitem(last=False)
+
+        self.treeview.queue_draw()
+        return False
 
     def do_atualiza_contador_selecao(self):
         qtdSelecionados = 0
@@ -1061,13 +1425,9 @@ class MainWindow(Gtk.Window):
 
         for row in self.store:
             if row[0]:
-                arquivo = self.editOrigem.get_text() + os.sep + row[1]
-                time = row[3][10:18]
-
-                if self.is_video(arquivo):
-                    qtdSelecionados += 1
-                    tamanhoTotal += os.stat(arquivo).st_size
-                    secs = secs + time_to_seconds(time)
+                qtdSelecionados += 1
+                tamanhoTotal += row[self.COLUNA_BYTES]
+                secs = secs + row[self.COLUNA_DURACAO]
 
         self.label_status_copia.set_text("Arquivos selecionados: " + str(qtdSelecionados) + " / " + str(len(self.store)) + " (" + to_human_size(tamanhoTotal) + ") - " + seconds_to_time(secs))
 
@@ -1075,16 +1435,9 @@ class MainWindow(Gtk.Window):
         for botao in self.listaBotoes:
             botao.set_sensitive(qtdSelecionados > 0)
 
-        self.buttonExtractInterval.set_sensitive(qtdSelecionados == 1)
         self.buttonExtractSection.set_sensitive(qtdSelecionados == 1)
         self.buttonConcatenate.set_sensitive(qtdSelecionados > 1)
 
-    def is_video(self, arquivo):
-        for ext in get_app_settings("extensoes_video").split('|'):
-            if arquivo.lower().endswith(ext.lower()):
-                return True
-        return False
-
     def listar_arquivos_selecionados(self):
         arquivos = []
         for row in self.store:
@@ -1092,48 +1445,86 @@ class MainWindow(Gtk.Window):
                 arquivos.append(self.editOrigem.get_text() + os.sep + row[1])
         return arquivos
 
-    def obter_total_segundos(self):
-        segundos = 0
+    def obter_duracoes(self):
+        """
+        Retorna a duração (em segundos) de cada arquivo selecionado
+        """
+
+        duracoes = {}
         for row in self.store:
             if row[0]:
-                segundos += time_to_seconds(row[3][10:18])
+                duracoes[self.editOrigem.get_text() + os.sep + row[1]] = row[self.COLUNA_DURACAO]
+        return duracoes
+
+    def obter_infos(self, arquivos):
+        """
+        Retorna as informações de cada arquivo, utilizando as informações da lista de arquivos ou analisando o arquivo
+        """
+
+        infos = {}
+        for row in self.store:
+            infos[self.editOrigem.get_text() + os.sep + row[1]] = row[self.COLUNA_INFO]
+
+        return dict((arquivo, infos[arquivo] if arquivo in infos else get_video_info(arquivo)) for arquivo in arquivos)
 
-        return segundos
+    def executa_ffmpeg(self, titulo, params, arquivos, sufixoArquivo, arquivoDestino, showCompletedMessage):
+        jobs = criar_jobs(params, arquivos, sufixoArquivo, arquivoDestino, self.obter_duracoes())
+        self.executa_jobs(titulo, jobs, showCompletedMessage)
 
-    def executa_ffmpeg(self, titulo, params, arquivos, segundosTotal , sufixoArquivo, arquivoDestino, showCompletedMessage):
+    def executa_jobs(self, titulo, jobs, showCompletedMessage):
 
-        # Salva o STDOUT para o caso do ffmpeg ser interrompido
-        savedStdout = sys.stdout
+        for job in jobs:
+            job.forcar = self.checkForcar.get_active()
 
-        # Efetua o processamento dos arquivos
-        dialogVideo = VideoProgressDialog(gMainWindow, arquivos, titulo, params, sufixoArquivo, arquivoDestino, segundosTotal)
+        # Efetua o processamento dos arquivos, registrando o andamento para permitir retomar o lote após uma interrupção
+        gJournal.iniciar_lote(titulo, jobs)
+        dialogVideo = VideoProgressDialog(gMainWindow, titulo, jobs)
         dialogVideo.run()
 
-        # Força a interrupção da conversão caso o usuário pressione cancel
-        dialogVideo.mustStop = True
+        # Força a interrupção dos jobs em execução caso o usuário pressione cancel, sem aguardar o término dos workers
+        dialogVideo.scheduler.cancelar()
+        dialogVideo.destroy()
+        gJournal.finalizar_lote()
+        gCacheSaidas.salvar()
+
         if dialogVideo.failed:
-            dialogVideo.destroy()
-            sys.stdout = savedStdout
             return show_message("Falha na conversão!", "Ocorreram falhas durante o processamento de pelo menos uma video, verifique o log para mais informações.")
 
-        global gProcessoFfmpeg
-        if gProcessoFfmpeg is not None:
-            try:
-                gProcessoFfmpeg.kill()
-                debug("O processo do ffmpeg foi interrompido pelo usuário.")
-            except OSError:
-                debug("O processo do ffmpeg foi finalizado com sucesso.")
-
-        dialogVideo.destroy()
         debug("Processamento dos vídeos finalizada")
 
-        # Retorna o STDOUT original
-        sys.stdout = savedStdout
-
         if showCompletedMessage:
             show_message("Concluído!", "Processamento dos vídeos concluída com sucesso!")
             self.do_load_file_list(None)
 
+    def do_retomar_lote(self, lote):
+        """
+        Pergunta ao usuário se o lote interrompido na última execução deve ser retomado
+        """
+
+        mensagem = "O processamento \"" + lote["titulo"] + "\" foi interrompido com " + str(len(lote["jobs"]) + lote["naoRetomaveis"]) + " jobs pendentes."
+        if lote["naoRetomaveis"]:
+            mensagem = mensagem + " " + str(lote["naoRetomaveis"]) + " jobs utilizam arquivos temporários e deverão ser executados novamente pelo usuário."
+
+        dialog = Gtk.MessageDialog(self, 0, Gtk.MessageType.QUESTION, Gtk.ButtonsType.YES_NO, "Retomar o processamento?")
+        dialog.format_secondary_text(mensagem + "\nDeseja retomar o processamento?")
+        response = dialog.run()
+        dialog.destroy()
+
+        # Os arquivos gravados parcialmente são descartados
+        for parcial in lote["parciais"]:
+            if os.path.isfile(parcial):
+                debug("Removendo arquivo parcial: " + parcial)
+                os.remove(parcial)
+
+        jobs = [criar_job_registro(registro) for registro in lote["jobs"]]
+        if response == Gtk.ResponseType.YES and jobs:
+            debug("Retomando o processamento interrompido: " + lote["titulo"])
+            self.executa_jobs(lote["titulo"], jobs, True)
+        else:
+            gJournal.finalizar_lote()
+
+        return False
+
     def do_click_logs(self, widget):  # @UnusedVariable
         debug("Visualizando os logs")
         LogViewerDialog(gMainWindow).show_and_get_info()
@@ -1169,36 +1560,6 @@ class MainWindow(Gtk.Window):
         return button
 
 
-def seconds_to_time(secs):
-    """
-    Converte segundos para o formato HH:MM:SS
-    """
-
-    return time.strftime('%H:%M:%S', time.gmtime(secs))
-
-
-def time_to_seconds(time):
-    """
-    Converte do formato HH:MM:SS para segundos
-    """
-
-    ftr = [3600, 60, 1]
-    try:
-        return sum([a * b for a, b in zip(ftr, map(int, time.split(':')))])
-    except ValueError:
-        return 0
-
-
-def get_caminho_ffmpeg():
-    """
-    Retorna o caminho onde of FFMPEG está configurado
-    """
-
-    app = get_app_settings("caminho_ffmpeg")
-    return app if app is not None else "ffmpeg"
-
-
-
 def compareTreeItem(model, row1, row2, user_data):  # @UnusedVariable
     """
     Compara 2 ítens de uma tree
@@ -1230,97 +1591,23 @@ def show_message(titulo, msg):
     return None
 
 
-def indent_xml(elem, level=0):
+def registrar_tempo_inicializacao(fase, duracao=None):
     """
-    Formata um arquivo XML
+    Registra no log a duração de uma fase da inicialização (por padrão, desde o fim da fase anterior), exibindo-a
+    também na saída de erros com o parâmetro --startup-timing
     """
 
-    i = "\n" + level * "\t"
-    if len(elem):
-        if not elem.text or not elem.text.strip():
-            elem.text = i + "\t"
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-        for elem in elem:
-            indent_xml(elem, level + 1)
-        if not elem.tail or not elem.tail.strip():
-            elem.tail = i
-    else:
-        if level and (not elem.tail or not elem.tail.strip()):
-            elem.tail = i
-
+    global gInicioFase
 
-def set_app_settings(xmlTag, value):
-    """
-    Salva uma configuração da aplicação
-    """
+    agora = time.time()
+    if duracao is None:
+        duracao = agora - gInicioFase
+        gInicioFase = agora
 
-    debug("Salvando configuração da aplicação: " + xmlTag + " = " + value)
-    if not os.path.isfile(ARQUIVO_XML_SETTINGS):
-        indent_and_save_xml(ET.Element('config'), ARQUIVO_XML_SETTINGS)
-
-    configTree = ET.parse(ARQUIVO_XML_SETTINGS, ET.XMLParser(remove_comments=False, strip_cdata=False))
-    root = configTree.getroot()
-
-    # Remove o nó se já existir
-    if configTree.find("./" + xmlTag) is not None:
-        root.remove(configTree.find("./" + xmlTag))
-
-    # Se o valor não for nulo, adicionar o novo nó
-    if value is not None and value.strip():
-        ET.SubElement(root, xmlTag).text = value
-
-    indent_and_save_xml(configTree.getroot(), ARQUIVO_XML_SETTINGS)
-
-
-def get_app_settings(xmlTag):
-    """
-    Recupera uma configuração da aplicação
-    """
-
-    nodeCaminho = ET.parse(ARQUIVO_XML_SETTINGS, ET.XMLParser(remove_comments=False, strip_cdata=False)).find("./" + xmlTag)
-    return None if nodeCaminho is None else nodeCaminho.text
-
-
-def indent_and_save_xml(rootNode, arquivoXml):
-    """
-    Formata e salva um arquivo XML
-    """
-
-    debug("Salvando o arquivo XML: " + arquivoXml)
-    indent_xml(rootNode)
-    prettyXml = ET.tostring(rootNode, encoding="UTF-8", method="xml", xml_declaration=True)
-    arquivo = open(arquivoXml, "wb")
-    arquivo.write(prettyXml)
-    arquivo.close()
-
-
-def debug(msg=''):
-    """
-    Loga uma mensagem
-    """
-
-    try:
-        linha = str(msg).strip()
-    except (UnicodeEncodeError):
-        linha = msg.encode("utf-8").strip()
-
-    gLogger.debug(linha)
-
-
-def to_human_size(nbytes):
-    """
-    Converte uma quantidade de bytes em formato de fácil visualização
-    """
-
-    human = nbytes
-    rank = 0
-    if nbytes != 0:
-        rank = int((math.log10(nbytes)) / 3)
-        rank = min(rank, len(UNIDADES) - 1)
-        human = nbytes / (1024.0 ** rank)
-    f = ('%.2f' % human).rstrip('0').rstrip('.')
-    return '%s %s' % (f, UNIDADES[rank])
+    mensagem = "Inicialização - " + fase + ": " + "%.1f ms" % (duracao * 1000)
+    debug(mensagem)
+    if gExibirTemposInicializacao:
+        print(mensagem, file=sys.stderr)
 
 
 def on_close(self, widget):  # @UnusedVariable
@@ -1328,93 +1615,41 @@ def on_close(self, widget):  # @UnusedVariable
     Fecha a aplicação, liberando o FileHandler do log
     """
 
+    gSettings.flush()
     logHandler.close()
     gLogger.removeHandler(logHandler)
     sys.exit()
 
 
-def get_codec_info(codec):
-    # Recupera os parâmtros do ffmpeg para conversão
-    resp = None
-    if VIDEO_H265 == codec:
-        resp = {"params":["-c:v", "libx265", "-acodec", "aac", "-strict", "-2"], "sufixo":"_H265.mp4"}
-    elif VIDEO_H264 == codec:
-        resp = {"params":["-c:v", "libx264", "-acodec", "aac", "-strict", "-2"], "sufixo":"_H264.mp4"}
-    elif VIDEO_VP8 == codec:
-        resp = {"params":["-c:v", "libvpx", "-b:v", "1M", "-c:a", "libvorbis"], "sufixo":"_VP8.webm"}
-    elif VIDEO_VP9 == codec:
-        resp = {"params":["-c:v", "libvpx-vp9", "-b:v", "2M", "-c:a", "libopus"], "sufixo":"_VP9.webm"}
-    elif AUDIO_MP3 == codec:
-        resp = {"params":["-vn", "-f", "mp3", "-ab", "192000"], "sufixo":"_MP3.mp3"}
-    elif AUDIO_FLAC == codec:
-        resp = {"params":[ "-vn", "-acodec", "flac"], "sufixo":"_FLAC.flac"}
-    elif AUDIO_AAC == codec:
-        resp = {"params":[ "-vn", "-acodec", "aac", "-strict", "-2"], "sufixo":"AAC.m4a"}
-    elif AUDIO_OGG == codec:
-        resp = {"params":["-vn", "-acodec", "libvorbis"], "sufixo":"_Vorbis.ogg"}
-    return resp
-
-
-def get_ffmpeg_features():
-    global gListaFfmpegFeatures
+# Constantes da interface gráfica
 
-    if gListaFfmpegFeatures is None:
-        gProcessoFfmpeg = subprocess.Popen([get_caminho_ffmpeg()], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, bufsize=1, universal_newlines=True)
+# Quantidade máxima de linhas e intervalo (em segundos) entre os envios de linhas para a grid durante a leitura
+TAMANHO_LOTE_GRID = 100
+INTERVALO_LOTE_GRID = 0.25
 
-        linhas = ""
-        for line in iter(gProcessoFfmpeg.stdout.readline, ''):
-            if "--" in line:
-                linhas = linhas + line
+# Threads de geração das miniaturas, quantidade máxima de miniaturas aguardando a geração e mantidas em memória
+QTD_THREADS_MINIATURAS = 2
+TAMANHO_FILA_MINIATURAS = 200
+TAMANHO_MEMORIA_MINIATURAS = 1000
 
-        gProcessoFfmpeg.stdout.close()
-        gProcessoFfmpeg.wait()
+# Intervalo (em milissegundos) para agrupar as solicitações de miniaturas durante a rolagem da lista
+INTERVALO_SOLICITACAO_MINIATURAS = 150
 
-        gListaFfmpegFeatures = []
-        pattern = re.compile("--enable-[^\s]+|disable-[^\s]+")
-        for m in pattern.finditer(linhas):
-            gListaFfmpegFeatures.append(m.group())
-
-    return gListaFfmpegFeatures
-
-# Constantes da aplicação
-
-
-# Versão da aplicação
-VERSAO_APLICACAO = "v1.0"
-
-
-# Constantes da aplicação
-UNIDADES = ['B', 'KB', 'MB', 'GB', 'TB', 'PB']
-DIR_APPLICATION = os.path.dirname(os.path.realpath(__file__))
-ARQUIVO_XML_SETTINGS = DIR_APPLICATION + os.sep + "settings.xml"
-ARQUIVO_LOG = DIR_APPLICATION + os.sep + "application.log"
-ARQUIVO_VIDEOS_CONCATENA = DIR_APPLICATION + os.sep + "videos_concatena.txt"
-
-# its win32, maybe there is win64 too?
-IS_WINDOWS = sys.platform.startswith('win')
-
-# Variáveis globais da aplicação
-# Nota: por convenção, as variáveis globais são camelCase e iniciam com um 'g'
-
-# Controle do ffmpeg
-gProcessoFfmpeg = None  # Representa a instância do processo do ffmpeg
-gListaFfmpegFeatures = None  # Dicionário com as features de compilação do ffmpeg
-
-gListaArquivosOrigem = None  # Lista de arquivos no diretório de origem
+# Exibe o tempo de cada fase da inicialização (parâmetro --startup-timing)
+gExibirTemposInicializacao = False
 
 # Remove o arquivo de log anterior e cria o logger
 if os.path.isfile(ARQUIVO_LOG):
     os.remove(ARQUIVO_LOG)
 
 logging.basicConfig(level=logging.DEBUG, format='%(asctime)-15s %(message)s')
-gLogger = logging.getLogger('-')
 
 logHandler = logging.FileHandler(ARQUIVO_LOG)
 gLogger.addHandler(logHandler)
 
 # Lê os parâmetros da aplicação
 try:
-    opts, args = getopt.getopt(sys.argv[1:], "h", [])
+    opts, args = getopt.getopt(sys.argv[1:], "h", ["startup-timing"])
 except getopt.GetoptError:
     print('videotools.py -h (help)')
     sys.exit(2)
@@ -1422,25 +1657,21 @@ for opt, arg in opts:
     if opt == '-h':
         print("\nPrograma para edição de arquivos de vídeo")
         print("\nUso: videotools.py -h (help)")
+        print("     videotools.py --startup-timing (exibe o tempo de cada fase da inicialização)")
+        print("     videotools.py <" + "|".join(videocli.COMANDOS) + "> ... (linha de comando, sem interface gráfica)")
         print("\nExemplo: ./videotools.py -d\"\n")
         sys.exit()
+    elif opt == '--startup-timing':
+        gExibirTemposInicializacao = True
 
-# Força UTF-8 por padrão
-if sys.version_info < (3, 0):
-    reload(sys)
-    sys.setdefaultencoding("utf-8")
-
-# Cria as configurações padrão da aplicação
-if not os.path.isfile(ARQUIVO_XML_SETTINGS):
-    set_app_settings("dir_origem", os.path.expanduser('~'))
-    set_app_settings("extensoes_video", "wmv|avi|mpg|3gp|mov|m4v|mts|mp4|webm")
-    set_app_settings("caminho_ffmpeg", "ffmpeg")
+inicializar_configuracoes()
+registrar_tempo_inicializacao("Carga dos módulos e das configurações")
 
 gMainWindow = None
 # Verifica a presença do ffmpeg
-if not spawn.find_executable(get_caminho_ffmpeg()):
+if not is_ffmpeg_disponivel(get_caminho_ffmpeg()):
     info = InputDialog(gMainWindow, 'Informe o caminho para o ffmpeg', '', None).show_and_get_info()
-    if info is None or not spawn.find_executable(info):
+    if info is None or not is_ffmpeg_disponivel(info):
         print("Não foi possível encontrar o aplicativo necessário ffmpeg.")
         print("Verifique a configuração do caminho do ffmpeg no arquivo settings.xml")
         print("A configuração atual é: " + get_caminho_ffmpeg())
@@ -1448,35 +1679,7 @@ if not spawn.find_executable(get_caminho_ffmpeg()):
     else:
         set_app_settings("caminho_ffmpeg", info)
 
-# Codecs de Video
-VIDEO_H265 = "Video H265"
-VIDEO_H264 = "Video H264"
-VIDEO_VP8 = "Video VP8"
-VIDEO_VP9 = "Video VP9"
-CODECS_VIDEO = []
-
-if "--enable-libx264" in get_ffmpeg_features():
-    CODECS_VIDEO.append(VIDEO_H264)
-
-if "--enable-libx265" in get_ffmpeg_features():
-    CODECS_VIDEO.append(VIDEO_H265)
-
-if "--enable-libvpx" in get_ffmpeg_features():
-    CODECS_VIDEO.append(VIDEO_VP8)
-    CODECS_VIDEO.append(VIDEO_VP9)
-
-# Codecs de Audio
-AUDIO_MP3 = "Extrair audio - MP3"
-AUDIO_AAC = "Extrair audio - AAC"
-AUDIO_FLAC = "Extrair audio - FLAC"
-AUDIO_OGG = "Extrair audio - Ogg Vorbis"
-CODECS_AUDIO = [AUDIO_AAC, AUDIO_FLAC]
-
-if "--enable-libmp3lame" in get_ffmpeg_features():
-    CODECS_AUDIO.append(AUDIO_MP3)
-
-if "--enable-libvorbis" in get_ffmpeg_features():
-    CODECS_AUDIO.append(AUDIO_OGG)
+registrar_tempo_inicializacao("Verificação do ffmpeg")
 
 # Calling GObject.threads_init() is not needed for PyGObject 3.10.2+
 GObject.threads_init()
@@ -1484,5 +1687,17 @@ GObject.threads_init()
 # Monta a UI
 gMainWindow = MainWindow()
 gMainWindow.connect('delete-event', on_close)
+registrar_tempo_inicializacao("Criação da janela")
+
 gMainWindow.show_all()
+GLib.idle_add(gMainWindow.do_janela_exibida)
+
+# As capacidades do ffmpeg são detectadas (ou lidas do cache) em background, sem atrasar a exibição da janela
+gCapacidadesFfmpeg.iniciar_deteccao(lambda: GLib.idle_add(gMainWindow.do_capacidades_detectadas))
+
+# Oferece retomar o lote interrompido na última execução
+loteInterrompido = gJournal.get_lote_pendente()
+if loteInterrompido is not None:
+    GLib.idle_add(gMainWindow.do_retomar_lote, loteInterrompido)
+
 Gtk.main()